@@ -0,0 +1,272 @@
+"""
+Нагрузочные замеры основных операций базы.
+
+    python -m benchmarks.bench                        # 1k и 100k строк, все форматы
+    python -m benchmarks.bench --sizes 1000,100000,1000000 --formats binary
+    python -m benchmarks.bench --save-baseline        # запомнить результаты
+    python -m benchmarks.bench --compare              # сравнить с сохранёнными
+
+Каждый формат и размер таблицы замеряется в отдельном процессе, запущенном
+во временном каталоге: база создаётся в его data/ и удаляется после замера,
+пиковая память (ru_maxrss) не смешивается между прогонами. Сеть не нужна.
+Пиковая память - максимум процесса с начала прогона формата и размера
+(case_peak_rss_mb): у каждой операции это пик всех операций до неё
+включительно, а не её собственный.
+
+Команды выполняются через engine.execute, как в консоли, и после каждой
+команды изменения сбрасываются на диск (end_command). Таблица - синтетическая
+(name:str, age:int, active:bool), данные одинаковы при каждом запуске.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+
+SIZES = (1_000, 100_000)
+FORMATS = ("log", "binary", "json")
+INSERT_BATCH = 1_000
+# Сколько раз повторяется точечная операция (по ID) для квантилей задержки.
+POINT_QUERIES = 200
+SCAN_QUERIES = 5
+# Допустимое ухудшение относительно базовых результатов (доля).
+TOLERANCE = 0.2
+
+# Метрика -> больше значит лучше. Остальные метрики сравниваются как время.
+HIGHER_IS_BETTER = {"ops_per_s": True, "rows_per_s": True}
+
+
+# --- замер в дочернем процессе ---
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты.
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def _rows(size: int) -> List[str]:
+    rng = random.Random(size)
+    rows = []
+    for i in range(size):
+        active = "true" if rng.random() < 0.5 else "false"
+        rows.append(f'("user{i}", {rng.randint(18, 90)}, {active})')
+    return rows
+
+
+def _measure(commands: List[str], rows: int) -> dict:
+    """Выполняет команды по одной со сбросом после каждой и меряет задержки."""
+    from src.primitive_db.engine import end_command, execute
+    from src.primitive_db.metrics import metrics
+
+    before = dict(metrics.counters)
+    latencies = []
+    started = time.perf_counter()
+    for command in commands:
+        began = time.perf_counter()
+        execute(command)
+        end_command()
+        latencies.append(time.perf_counter() - began)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    counters = {name: metrics.counters[name] - before.get(name, 0)
+                for name in ("rows_scanned", "storage_bytes_read",
+                             "storage_bytes_written", "wal_bytes_written")}
+    return {
+        "ops": len(commands),
+        "ops_per_s": len(commands) / elapsed,
+        "rows_per_s": rows / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "case_peak_rss_mb": _peak_rss_mb(),
+        **counters,
+    }
+
+
+def run_case(fmt: str, size: int) -> Dict[str, dict]:
+    """Все операции над одной таблицей; вызывается в каталоге будущей базы."""
+    from src.primitive_db.decorators import set_assume_yes
+    from src.primitive_db.engine import end_command, execute
+    from src.primitive_db.tables import table_manager
+    from src.primitive_db.utils import table_size
+
+    set_assume_yes(True)
+    execute("create_table bench name:str age:int active:bool")
+    execute(f"convert_table bench {fmt}")
+    end_command()
+
+    values = _rows(size)
+    rng = random.Random(0)
+    point_ids = [rng.randint(1, size) for _ in range(POINT_QUERIES)]
+    results = {}
+    results["insert"] = _measure(
+        [f"insert into bench values {', '.join(values[i:i + INSERT_BATCH])}"
+         for i in range(0, size, INSERT_BATCH)],
+        size,
+    )
+    results["insert"]["disk_bytes"] = table_size("bench")
+    results["select_id"] = _measure(
+        [f"select from bench where ID = {i}" for i in point_ids], len(point_ids)
+    )
+    results["select_scan"] = _measure(
+        [f"select from bench where age = {18 + n} and active = true limit 10"
+         for n in range(SCAN_QUERIES)],
+        size * SCAN_QUERIES,
+    )
+    results["count"] = _measure(
+        [f"count bench where age > {30 + n}" for n in range(SCAN_QUERIES)],
+        size * SCAN_QUERIES,
+    )
+    results["update_id"] = _measure(
+        [f'update bench set name = "renamed{i}" where ID = {i}' for i in point_ids],
+        len(point_ids),
+    )
+    results["update_scan"] = _measure(
+        ['update bench set name = "old" where age = 90'], size
+    )
+    results["delete_id"] = _measure(
+        [f"delete from bench where ID = {i}" for i in sorted(set(point_ids))],
+        len(set(point_ids)),
+    )
+    results["delete_id"]["disk_bytes"] = table_size("bench")
+    table_manager.close()
+    return results
+
+
+def _child(fmt: str, size: int, output: str) -> None:
+    sys.path.insert(0, str(ROOT))
+    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+        results = run_case(fmt, size)
+    Path(output).write_text(json.dumps(results), encoding="utf-8")
+
+
+# --- запуск и сравнение ---
+
+def run_all(sizes, formats) -> Dict[str, dict]:
+    results = {}
+    for size in sizes:
+        for fmt in formats:
+            with tempfile.TemporaryDirectory(prefix="primitive_db_bench_") as tmp:
+                output = Path(tmp) / "result.json"
+                env = dict(os.environ, PYTHONPATH=str(ROOT))
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench", "--child",
+                     fmt, str(size), str(output)],
+                    cwd=tmp, env=env, check=True,
+                )
+                for operation, metrics in json.loads(output.read_text()).items():
+                    key = f"{fmt}/{size}/{operation}"
+                    results[key] = metrics
+                    _print_result(key, metrics)
+    return results
+
+
+def _print_result(key: str, metrics: dict) -> None:
+    rss = metrics.get("case_peak_rss_mb")
+    disk = metrics.get("disk_bytes")
+    print(
+        f"{key:<28} {metrics['ops_per_s']:>10.0f} оп/с {metrics['rows_per_s']:>11.0f} "
+        f"строк/с  p50 {metrics['p50_ms']:>8.2f} мс  p99 {metrics['p99_ms']:>8.2f} мс"
+        + (f"  пик RSS прогона {rss:.0f} МБ" if rss is not None else "")
+        + (f"  диск {disk} Б" if disk is not None else ""),
+        flush=True,
+    )
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            tolerance: float) -> List[str]:
+    """Замеры, ухудшившиеся относительно базовых больше чем на tolerance."""
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for name in ("rows_per_s", "p50_ms", "p99_ms", "case_peak_rss_mb",
+                     "disk_bytes"):
+            old, new = base.get(name), metrics.get(name)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            worse = -change if HIGHER_IS_BETTER.get(name) else change
+            if worse > tolerance:
+                regressions.append(
+                    f"{key} {name}: {old:.2f} -> {new:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.bench", description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="размеры таблиц через запятую (по умолчанию %(default)s)")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help="форматы хранения через запятую "
+                             "(по умолчанию %(default)s)")
+    parser.add_argument("--save-baseline", nargs="?", const=str(BASELINE_FILE),
+                        metavar="FILE", help="сохранить результаты как базовые")
+    parser.add_argument("--compare", nargs="?", const=str(BASELINE_FILE),
+                        metavar="FILE", help="сравнить с базовыми результатами")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="допустимое ухудшение, доля (по умолчанию %(default)s)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="сохранить результаты в JSON")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        fmt, size, output = args.child
+        _child(fmt, int(size), output)
+        return 0
+
+    if args.compare and not Path(args.compare).exists():
+        print(f"Нет базовых результатов {args.compare}: сначала запустите "
+              "с --save-baseline.", file=sys.stderr)
+        return 2
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = args.formats.split(",")
+    results = run_all(sizes, formats)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(report, indent=4), encoding="utf-8")
+            print(f"Результаты сохранены в {path}.")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"Ухудшения больше {args.tolerance:.0%}:")
+            print("\n".join(f"  {line}" for line in regressions))
+            return 1
+        print(f"Ухудшений больше {args.tolerance:.0%} относительно {args.compare} нет.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
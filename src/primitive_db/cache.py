@@ -0,0 +1,134 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.primitive_db.constants import (
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    ID_FIELD,
+)
+
+
+def _approx_size(rows: List[dict]) -> int:
+    """Приблизительный объём результата в байтах (список, словари и значения)."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        size += sum(sys.getsizeof(v) for v in row.values())
+    return size
+
+
+class _Entry:
+    __slots__ = ("table", "rows", "ids", "predicate", "size", "created")
+
+    def __init__(self, table, rows, predicate):
+        self.table = table
+        self.rows = rows
+        self.ids = {row.get(ID_FIELD) for row in rows}
+        self.predicate = predicate
+        self.size = _approx_size(rows)
+        self.created = time.monotonic()
+
+
+class QueryCache:
+    """
+    Кэш результатов select с вытеснением LRU и временем жизни (TTL).
+    Ограничен числом записей и приблизительным объёмом в байтах.
+
+    Инвалидация по условию: при записи в таблицу удаляются только те
+    результаты, чьё условие выполняется для изменённых строк (в старой
+    или новой версии) или которые содержат изменённые строки.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: Optional[float] = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {
+            "hits": 0, "misses": 0, "evictions": 0,
+            "expired": 0, "invalidations": 0, "too_large": 0,
+        }
+
+    def get(self, key: tuple, load: Callable[[], List[dict]],
+            predicate: Optional[Callable[[dict], bool]] = None) -> List[dict]:
+        """
+        Результат из кэша или load(). key[0] - имя таблицы.
+        predicate - скомпилированное условие запроса (None - все строки).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._drop(key)
+            self.stats["expired"] += 1
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.rows
+
+        self.stats["misses"] += 1
+        rows = load()
+        entry = _Entry(key[0], rows, predicate)
+        if entry.size > self.max_bytes:
+            self.stats["too_large"] += 1
+            return rows
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        return rows
+
+    def invalidate(self, table: str, rows: Optional[Iterable[dict]] = None) -> None:
+        """
+        Сбрасывает результаты таблицы, которые могли измениться.
+        rows - изменённые строки (новые, удалённые, старые и новые версии
+        обновлённых); если не заданы, сбрасывается всё по таблице.
+        """
+        rows = None if rows is None else list(rows)
+        changed_ids = None if rows is None else {r.get(ID_FIELD) for r in rows}
+        for key, entry in list(self._entries.items()):
+            if entry.table != table:
+                continue
+            if rows is None or self._affected(entry, rows, changed_ids):
+                self._drop(key)
+                self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def summary(self) -> Dict[str, object]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _affected(entry: _Entry, rows: List[dict], changed_ids: set) -> bool:
+        if entry.ids & changed_ids:
+            return True
+        if entry.predicate is None:
+            return True
+        return any(entry.predicate(row) for row in rows)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl is not None and time.monotonic() - entry.created > self.ttl
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.stats["evictions"] += 1
@@ -0,0 +1,138 @@
+import socket
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from src.primitive_db.constants import PIPELINE_WINDOW, SERVER_HOST, SERVER_PORT
+
+
+class Client:
+    """
+    Клиент сервера базы.
+
+        with Client() as db:
+            print(db.execute("list_tables"))
+            outputs = db.pipeline(['insert into users values ("a", 1)'] * 100)
+
+    pipeline отправляет команды пачками по window штук, не дожидаясь
+    ответов на каждую, и возвращает их вывод в том же порядке.
+    Ограничение пачки не даёт клиенту и серверу заблокировать друг друга,
+    когда ни один из них не читает, пока пишет.
+    """
+
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT,
+                 unix_path: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        if unix_path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(unix_path)
+        else:
+            self._sock = socket.create_connection((host, port), timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+
+    def execute(self, command: str) -> str:
+        """Выполняет одну команду и возвращает её вывод."""
+        return self.pipeline([command])[0]
+
+    def pipeline(self, commands: Iterable[str],
+                 window: int = PIPELINE_WINDOW) -> List[str]:
+        commands = list(commands)
+        outputs: List[str] = []
+        for start in range(0, len(commands), window):
+            batch = commands[start:start + window]
+            payload = "".join(c.replace("\n", " ") + "\n" for c in batch)
+            self._sock.sendall(payload.encode("utf-8"))
+            outputs.extend(self._read_response() for _ in batch)
+        return outputs
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _read_response(self) -> str:
+        header = self._file.readline()
+        if not header:
+            raise ConnectionError("сервер закрыл соединение")
+        size = int(header)
+        data = self._file.read(size)
+        if len(data) != size:
+            raise ConnectionError("сервер закрыл соединение")
+        return data.decode("utf-8")
+
+
+def _percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def load_test(command: str = "list_tables", clients: int = 4,
+              requests: int = 1000, pipeline: int = PIPELINE_WINDOW,
+              host: str = SERVER_HOST, port: int = SERVER_PORT,
+              unix_path: Optional[str] = None) -> dict:
+    """
+    Нагрузочный тест: clients потоков, каждый со своим соединением,
+    отправляет requests команд пачками по pipeline штук.
+    В команде можно использовать {i} - сквозной номер запроса клиента
+    и {client} - номер клиента.
+    Печатает и возвращает пропускную способность и задержки пачек.
+    """
+    latencies: List[float] = []
+    completed = [0]
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def worker(number: int) -> None:
+        commands = [command.format(i=i + 1, client=number) for i in range(requests)]
+        own = []
+        done = 0
+        try:
+            with Client(host, port, unix_path) as client:
+                for start in range(0, requests, pipeline):
+                    batch = commands[start:start + pipeline]
+                    began = time.perf_counter()
+                    client.pipeline(batch, pipeline)
+                    own.append((time.perf_counter() - began) * 1000)
+                    done += len(batch)
+        except OSError as exc:
+            with lock:
+                errors.append(str(exc))
+        with lock:
+            latencies.extend(own)
+            completed[0] += done
+
+    threads = [threading.Thread(target=worker, args=(n + 1,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    total = completed[0]
+    result = {
+        "requests": total,
+        "seconds": elapsed,
+        "rate": total / elapsed,
+        "p50_ms": _percentile(latencies, 0.5),
+        "p99_ms": _percentile(latencies, 0.99),
+        "errors": errors,
+    }
+    print(
+        f"Клиентов: {clients}, запросов: {total}, конвейер: {pipeline}\n"
+        f"Время: {elapsed:.3f} с, {result['rate']:.0f} запросов/с\n"
+        f"Задержка пачки: p50 {result['p50_ms']:.2f} мс, "
+        f"p99 {result['p99_ms']:.2f} мс"
+    )
+    for error in errors:
+        print(f"Ошибка: {error}")
+    return result
@@ -0,0 +1,286 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.primitive_db.constants import ID_FIELD
+from src.primitive_db.query import coerce_literal, compile_value_test, native_value
+
+# NumPy не обязателен: без него работают чистые циклы. Он загружается при
+# первом вычислении по колоночному снимку, а не при запуске программы.
+np = None
+_numpy_loaded = False
+
+
+def _numpy():
+    """Модуль NumPy или None, если он не установлен."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def _bits(flags: Iterable[bool], size: int) -> int:
+    """Упаковывает последовательность флагов в битовое множество (int)."""
+    buf = bytearray((size + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _positions(mask: int) -> List[int]:
+    """Номера установленных битов по возрастанию."""
+    return [i for i, bit in enumerate(reversed(bin(mask)[2:])) if bit == "1"]
+
+
+class IntColumn:
+    """int-столбец: значения в array('q'), пустые ячейки отмечены битом valid."""
+
+    def __init__(self):
+        self.values = array("q")
+        self._valid: List[bool] = []
+
+    def append(self, value) -> None:
+        ok = isinstance(value, int) and not isinstance(value, bool)
+        self.values.append(value if ok else 0)
+        self._valid.append(ok)
+
+    def freeze(self) -> None:
+        self.valid = _bits(self._valid, len(self.values))
+        del self._valid
+
+    def get(self, pos: int):
+        return self.values[pos] if self.valid >> pos & 1 else None
+
+    def test_mask(self, test) -> int:
+        return _bits((test(v) for v in self.values), len(self.values)) & self.valid
+
+
+class BoolColumn:
+    """bool-столбец: два битовых множества - истинные и заполненные ячейки."""
+
+    def __init__(self):
+        self._true: List[bool] = []
+        self._valid: List[bool] = []
+
+    def append(self, value) -> None:
+        self._true.append(value is True)
+        self._valid.append(isinstance(value, bool))
+
+    def freeze(self) -> None:
+        size = len(self._valid)
+        self.size = size
+        self.true = _bits(self._true, size)
+        self.valid = _bits(self._valid, size)
+        del self._true, self._valid
+
+    def get(self, pos: int):
+        if not self.valid >> pos & 1:
+            return None
+        return bool(self.true >> pos & 1)
+
+    def test_mask(self, test) -> int:
+        mask = 0
+        if test(True):
+            mask |= self.true
+        if test(False):
+            mask |= self.valid & ~self.true
+        return mask
+
+
+class StrColumn:
+    """
+    str-столбец со словарным кодированием: каждое значение хранится один раз,
+    в колонке лежат коды. Условие проверяется по словарю, а не по строкам.
+    """
+
+    def __init__(self):
+        self.codes = array("l")
+        self.dictionary: List[Optional[str]] = []
+        self._lookup: Dict[Optional[str], int] = {}
+
+    def append(self, value) -> None:
+        value = None if value is None else str(value)
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        self.codes.append(code)
+
+    def freeze(self) -> None:
+        null = self._lookup.get(None)
+        if null is None:
+            self.valid = (1 << len(self.codes)) - 1
+        else:
+            self.valid = _bits((c != null for c in self.codes), len(self.codes))
+        del self._lookup
+
+    def get(self, pos: int):
+        return self.dictionary[self.codes[pos]]
+
+    def test_mask(self, test) -> int:
+        matching = {
+            code for code, value in enumerate(self.dictionary)
+            if value is not None and test(value)
+        }
+        if _numpy() is not None:
+            codes = np.frombuffer(self.codes, dtype=f"i{self.codes.itemsize}")
+            return _np_to_bits(np.isin(codes, list(matching)))
+        return _bits((c in matching for c in self.codes), len(self.codes))
+
+
+_COLUMN_TYPES = {"int": IntColumn, "bool": BoolColumn, "str": StrColumn}
+
+
+def _np_to_bits(flags) -> int:
+    packed = np.packbits(flags.astype(np.uint8), bitorder="little")
+    return int.from_bytes(packed.tobytes(), "little")
+
+
+def _np_int_mask(column: IntColumn, node, col_type: str) -> Optional[int]:
+    """Векторное вычисление условия над int-столбцом через NumPy."""
+    values = np.frombuffer(column.values, dtype=np.int64)
+    kind, name = node[0], node[1]
+    if kind == "cmp":
+        literal = coerce_literal(name, node[3], col_type)
+        flags = {
+            "=": values == literal, "!=": values != literal,
+            "<": values < literal, "<=": values <= literal,
+            ">": values > literal, ">=": values >= literal,
+        }[node[2]]
+    elif kind == "in":
+        flags = np.isin(values, [coerce_literal(name, v, col_type) for v in node[2]])
+    elif kind == "between":
+        low = coerce_literal(name, node[2], col_type)
+        high = coerce_literal(name, node[3], col_type)
+        flags = (values >= low) & (values <= high)
+    else:
+        return None
+    return _np_to_bits(flags) & column.valid
+
+
+class ColumnarTable:
+    """
+    Колоночное представление таблицы для просмотров и агрегатов.
+    Строится из строк-словарей один раз и не изменяется: при любой записи
+    в таблицу пул таблиц выбрасывает его и строит заново при следующем запросе.
+
+    Условия вычисляются в битовые маски (int), где бит i - строка i.
+    Если установлен NumPy, int-столбцы сравниваются векторно.
+    Пустые ячейки (None) подходят под условие так же, как в
+    query.compile_where: только если проверка верна для None (!=).
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]], rows: Iterable[dict]):
+        self.types = dict(columns)
+        self.columns = {name: _COLUMN_TYPES[t]() for name, t in columns}
+        size = 0
+        for row in rows:
+            for name, col_type in columns:
+                self.columns[name].append(native_value(row.get(name), col_type))
+            size += 1
+        for column in self.columns.values():
+            column.freeze()
+        self.size = size
+        self.all = (1 << size) - 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def mask(self, node) -> int:
+        """Битовая маска строк, подходящих под дерево условия."""
+        if node is None:
+            return self.all
+        kind = node[0]
+        if kind == "and":
+            return self.mask(node[1]) & self.mask(node[2])
+        if kind == "or":
+            return self.mask(node[1]) | self.mask(node[2])
+        if kind == "not":
+            return self.all & ~self.mask(node[1])
+
+        name = node[1]
+        if name not in self.columns:
+            raise ValueError(f'столбца "{name}" нет в таблице')
+        column, col_type = self.columns[name], self.types[name]
+        test = compile_value_test(node, col_type)
+        mask = None
+        if _numpy() is not None and isinstance(column, IntColumn):
+            mask = _np_int_mask(column, node, col_type)
+        if mask is None:
+            mask = column.test_mask(test)
+        if test(None):
+            mask |= self.all & ~column.valid
+        return mask
+
+    def ids(self, mask: int) -> List[int]:
+        """ID строк из маски в порядке таблицы."""
+        ids = self.columns[ID_FIELD]
+        return [ids.get(pos) for pos in _positions(mask)]
+
+    def count(self, mask: int) -> int:
+        return mask.bit_count()
+
+    def aggregate(self, func: str, column: Optional[str], mask: int,
+                  group_by: Optional[str] = None) -> Dict:
+        """
+        Агрегат count/sum/min/max/avg по строкам маски.
+        Возвращает {ключ группы: значение}; без group by ключ - None.
+        """
+        if column is not None and column not in self.columns:
+            raise ValueError(f'столбца "{column}" нет в таблице')
+        if group_by is not None and group_by not in self.columns:
+            raise ValueError(f'столбца "{group_by}" нет в таблице')
+
+        if group_by is None:
+            return {None: self._aggregate_all(func, column, mask)}
+
+        keys = self.columns[group_by]
+        values = self.columns[column] if column else None
+        groups: Dict = {}
+        for pos in _positions(mask):
+            value = values.get(pos) if values else 1
+            if value is None:
+                groups.setdefault(keys.get(pos), [])
+                continue
+            groups.setdefault(keys.get(pos), []).append(value)
+        return {key: _reduce(func, vals) for key, vals in groups.items()}
+
+    def _aggregate_all(self, func: str, column: Optional[str], mask: int):
+        if func == "count" and column is None:
+            return self.count(mask)
+        target = self.columns[column]
+        if isinstance(target, IntColumn):
+            mask &= target.valid
+            if _numpy() is not None and func != "count":
+                flags = np.unpackbits(
+                    np.frombuffer(mask.to_bytes((self.size + 7) // 8, "little"),
+                                  dtype=np.uint8),
+                    bitorder="little",
+                )[:self.size].astype(bool)
+                selected = np.frombuffer(target.values, dtype=np.int64)[flags]
+                if not len(selected):
+                    return None
+                result = {"sum": selected.sum, "min": selected.min,
+                          "max": selected.max, "avg": selected.mean}[func]()
+                return result.item()
+        values = [target.get(pos) for pos in _positions(mask)]
+        return _reduce(func, [v for v in values if v is not None])
+
+
+def _reduce(func: str, values: list):
+    if func == "count":
+        return len(values)
+    if not values:
+        return None
+    if func == "sum":
+        return sum(values)
+    if func == "min":
+        return min(values)
+    if func == "max":
+        return max(values)
+    return sum(values) / len(values)
@@ -1,11 +1,88 @@
+import os
 from pathlib import Path
 
 PROJECT_ROOT = Path.cwd()
 DATA_DIR = PROJECT_ROOT / "data"
 META_FILE = DATA_DIR / "db_meta.json"
 FILE_EXT = ".json"
+WAL_FILE = DATA_DIR / "db_wal.log"
+# Формат хранения новых таблиц: "log" (журнал строк), "binary" (двоичный
+# журнал по схеме таблицы) или "json" (весь файл). Формат существующей
+# таблицы меняет команда convert_table.
+STORAGE_BACKEND = "log"
 
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+# Когда сбрасывать изменённые таблицы из памяти на диск:
+# "command" - после каждой команды, "interval" - не чаще раза
+# в FLUSH_INTERVAL_MS миллисекунд, "exit" - только при выходе.
+FLUSH_POLICIES = {"command", "interval", "exit"}
+FLUSH_POLICY = "command"
+FLUSH_INTERVAL_MS = 1000
+
+# Сколько строк команда import проверяет и записывает за один раз.
+IMPORT_BATCH_SIZE = 1000
+
+# Таблицы больше этого размера полный просмотр читает с диска потоком,
+# не загружая их в память целиком.
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# Полный просмотр с условием и агрегаты используют колоночный снимок таблицы
+# (array/битовые маски, NumPy - если установлен), начиная с этого числа строк.
+COLUMNAR_SCAN = True
+COLUMNAR_MIN_ROWS = 1000
+
+# Статистика таблиц (для оценок explain): число различных значений столбца
+# оценивается HyperLogLog-скетчем из STATS_SKETCH_REGISTERS регистров
+# (степень двойки; 128 регистров - погрешность около 9%).
+STATS_SKETCH_REGISTERS = 128
+
+# Полный просмотр с условием большой двоичной таблицы, читаемой с диска,
+# делится на диапазоны по PARALLEL_SCAN_CHUNK_ROWS строк и проверяется
+# в PARALLEL_SCAN_WORKERS процессах ("process") или потоках ("thread").
+# Таблицы меньше PARALLEL_SCAN_MIN_ROWS строк просматриваются в одном процессе.
+PARALLEL_SCAN = True
+PARALLEL_SCAN_EXECUTOR = "process"
+PARALLEL_SCAN_WORKERS = os.cpu_count() or 1
+PARALLEL_SCAN_MIN_ROWS = 100_000
+PARALLEL_SCAN_CHUNK_ROWS = 50_000
+
+# После сброса изменений WAL очищается контрольной точкой, когда вырастает
+# больше этого размера (и всегда при выходе).
+WAL_CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+# Блокировки для одновременной работы нескольких процессов с одной базой
+# (fcntl.flock, файлы в LOCK_DIR). Ожидание дольше LOCK_TIMEOUT_SECONDS
+# завершает команду ошибкой, занятая блокировка опрашивается раз в LOCK_POLL_SECONDS.
+LOCK_DIR = DATA_DIR / ".locks"
+LOCK_TIMEOUT_SECONDS = 10
+LOCK_POLL_SECONDS = 0.005
+
+# Метрики (команда stats): квантили задержки считаются по последним
+# METRICS_SAMPLES замерам каждой команды. profile off печатает PROFILE_TOP функций.
+METRICS_SAMPLES = 10_000
+PROFILE_TOP = 20
+
+# Сервер (project serve): адрес по умолчанию и размер чтения из сокета.
+# Клиент отправляет конвейером не больше PIPELINE_WINDOW команд до чтения ответов.
+# Команды сервера выполняются по очереди, поэтому блокировку другого процесса
+# (например, открытую транзакцию в консоли) сервер ждёт не дольше
+# SERVER_LOCK_TIMEOUT_SECONDS, а не LOCK_TIMEOUT_SECONDS.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 5455
+SERVER_READ_CHUNK = 64 * 1024
+SERVER_LOCK_TIMEOUT_SECONDS = 0.5
+PIPELINE_WINDOW = 64
+
+# Сколько форм команд (с литералами, заменёнными метками) хранит кэш разбора.
+PARSE_CACHE_SIZE = 1024
+
+# Кэш результатов select: не больше CACHE_MAX_ENTRIES записей и примерно
+# CACHE_MAX_BYTES байт, запись живёт CACHE_TTL_SECONDS секунд (None - без срока).
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+CACHE_TTL_SECONDS = 300
+
+# Сколько строк select выводит одной таблицей (и одной страницей в режиме paging).
+PAGE_SIZE = 100
 
 ID_FIELD = "ID"
 VALID_TYPES = {"int", "str", "bool"}
@@ -14,6 +91,8 @@ MSG = {
     "table_exists": 'Ошибка: Таблица "{name}" уже существует.',
     "table_not_exists": 'Ошибка: Таблица "{name}" не существует.',
     "created_table": 'Таблица "{name}" успешно создана со столбцами: {cols}',
+    "table_analyzed": 'Статистика таблицы "{name}" пересчитана: {rows} записей.',
+    "table_partitioned": 'Строки таблицы "{name}" раскладываются по сегментам: {spec}.',
     "dropped_table": 'Таблица "{name}" успешно удалена.',
     "record_added": 'Запись с ID={id} успешно добавлена в таблицу "{name}".',
     "no_records_found": 'Записей, соответствующих условию,'
@@ -23,21 +102,79 @@ MSG = {
     "syntax_error": "Ошибка: некорректный синтаксис.",
     "invalid_json": "Ошибка: файл {path} поврежден или не является корректным JSON.",
     "table_file_invalid": "Ошибка: файл данных таблицы {name} поврежден.",
+    "column_not_exists": 'Ошибка: столбца "{column}" нет в таблице "{name}".',
+    "index_created": 'Индекс {kind} по столбцу "{column}" таблицы "{name}" '
+                     'создан ({size} записей).',
+    "records_added": 'Добавлено записей: {count} в таблицу "{name}" '
+                     '({rate:.0f} строк/с).',
+    "imported": 'Импортировано записей: {count} в таблицу "{name}", '
+                'пропущено: {skipped} ({rate:.0f} строк/с).',
+    "exported": 'Выгружено записей: {count} из таблицы "{name}" в {path} '
+                '({rate:.0f} строк/с).',
+    "wal_recovered": "Восстановлено транзакций из журнала: {count}.",
+    "txn_begin": "Транзакция начата. Изменения будут записаны при commit.",
+    "txn_commit": "Транзакция зафиксирована, операций записи: {count}.",
+    "txn_rollback": "Транзакция отменена.",
+    "txn_forbidden": "Ошибка: команда {command} недоступна внутри транзакции.",
+    "server_started": "Сервер базы данных слушает {address}. Остановка - Ctrl+C.",
+    "server_stopped": "Сервер остановлен. Запросов: {requests}, "
+                      "соединений: {connections} ({rate:.0f} запросов/с).",
+    "server_unsupported": "Ошибка: команда {command} недоступна в режиме сервера.",
+    "server_command_failed": "Произошла непредвиденная ошибка: {error}",
+    "batch_unsupported": "Ошибка: команда {command} недоступна в пакетном режиме.",
+    "table_converted": 'Таблица "{name}" переведена в формат {fmt}: '
+                       '{before} -> {after} байт.',
+    "stats_exported": "Метрики выгружены в {path} ({fmt}).",
+    "stats_reset": "Метрики сброшены.",
+    "profile_on": "Профилирование включено: команды выполняются под cProfile.",
+    "profile_off": "Профилирование выключено.",
+    "profile_saved": "Полный профиль сохранён в {path}.",
+    "table_altered": 'Схема таблицы "{name}" изменена (версия {version}): {cols}.',
+    "table_compacted": 'Таблица "{name}" сжата: {before} -> {after} байт.',
 }
 
 HELP_TEXT = """
 ***Процесс работы с таблицей***
 Функции:
 create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу
+create_table ... partition by range(ID, N)|hash(<столбец>, K) - с сегментами
 list_tables - показать список всех таблиц
 drop_table <имя_таблицы> - удалить таблицу
+alter_table <имя_таблицы> add <столбец:тип> [default <значение>] - добавить столбец
+alter_table <имя_таблицы> drop <столбец> - удалить столбец
+alter_table <имя_таблицы> rename <столбец> <новое_имя> - переименовать столбец
 
 ***Операции с данными***
-insert into <имя_таблицы> values (...)
-select from <имя_таблицы> [where ...]
-update <имя_таблицы> set ... where ...
+insert into <имя_таблицы> values (...)[, (...), ...]
+import <имя_таблицы> <файл.csv|файл.jsonl> [--batch N] - загрузить записи из файла
+select from <имя_таблицы> [where ...] [limit N] [offset M]
+select from <т1> join <т2> on <т1>.<столбец> = <т2>.<столбец> [where ...]
+explain select from <имя_таблицы> [where ...] - как выполняется select
+update <имя_таблицы> set <столбец> = <значение|столбец + N>[, ...] where ...
 delete from <имя_таблицы> where ...
 info <имя_таблицы>
+analyze <имя_таблицы> - пересчитать статистику таблицы
+create_index <имя_таблицы> <столбец> [hash|sorted] - создать индекс
+export <имя_таблицы> <файл> [csv|jsonl] - выгрузить таблицу в файл
+paging on|off - постраничный вывод select
+cache_stats - статистика кэша select
+lock_stats - ожидания блокировок между процессами
+stats [reset|export <файл> [jsonl|prom]] - задержки команд и счётчики
+profile on|off [файл] - профилировать команды (cProfile)
+compact <имя_таблицы> - переписать файл таблицы, оставив только живые записи
+convert_table <имя_таблицы> json|log|binary - сменить формат хранения таблицы
+
+Транзакции:
+begin - начать транзакцию (изменения копятся в памяти)
+commit - записать все изменения транзакции одним сбросом
+rollback - отменить изменения транзакции
+
+Агрегаты:
+count <имя_таблицы> [where ...] [group by <столбец>]
+sum|min|max|avg <имя_таблицы> <столбец> [where ...] [group by <столбец>]
+
+Условия where: =, !=, <, <=, >, >=, and, or, not, in (...), between .. and .., like
+Пример: where age >= 18 and name like "Ser%"
 
 Общие команды:
 exit - выход из программы
@@ -1,43 +1,288 @@
-from typing import List, Tuple
+import time
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
-from prettytable import PrettyTable
-
-from src.primitive_db.constants import DATA_DIR, FILE_EXT, ID_FIELD, MSG, VALID_TYPES
-from src.primitive_db.decorators import (
-    confirm_action,
-    create_cacher,
-    handle_db_errors,
-    log_time,
+from src.primitive_db.cache import QueryCache
+from src.primitive_db.constants import (
+    COLUMNAR_MIN_ROWS,
+    COLUMNAR_SCAN,
+    ID_FIELD,
+    IMPORT_BATCH_SIZE,
+    MSG,
+    PAGE_SIZE,
+    PARALLEL_SCAN,
+    PARALLEL_SCAN_WORKERS,
+    VALID_TYPES,
+)
+from src.primitive_db.decorators import confirm_action, handle_db_errors
+from src.primitive_db.indexes import INDEX_KINDS
+from src.primitive_db.join import build_hash, join_rows, qualify, split_where
+from src.primitive_db.locks import data_lock
+from src.primitive_db.metrics import COUNTERS, metrics
+from src.primitive_db.partitions import SEPARATOR, partition_spec
+from src.primitive_db.query import (
+    _getter,
+    coerce_literal,
+    compile_set,
+    compile_where,
+    convert_value,
+    plan,
+)
+from src.primitive_db.schema import alter_columns, schema_applied, schema_changes
+from src.primitive_db.storage import BACKENDS
+from src.primitive_db.table_stats import distinct, estimate_rows, new_stats
+from src.primitive_db.tables import table_manager
+from src.primitive_db.utils import (
+    compact_table,
+    create_table_file,
+    read_import_rows,
+    remove_table_files,
+    set_table_columns,
+    storage_report,
+    table_format,
+    table_size,
+    write_export_rows,
+)
+from src.primitive_db.utils import (
+    convert_table as convert_table_file,
 )
-from src.primitive_db.utils import load_table_data, save_table_data
 
-cache_select, invalidate_cache = create_cacher()
+query_cache = QueryCache()
+
+MAX_REPORTED_ERRORS = 10
+AGGREGATES = ("count", "sum", "min", "max", "avg")
+EXPORT_FORMATS = ("csv", "jsonl")
+METRICS_FORMATS = ("jsonl", "prom")
+
+_output = {"paging": False}
+
+def _columns(metadata: dict, table_name: str) -> List[Tuple[str, str]]:
+    """Список (столбец, тип) таблицы, включая ID."""
+    return metadata[table_name]["columns"]
+
+
+def _iter_rows(metadata: dict, table_name: str, where) -> Iterator[dict]:
+    """
+    Строки, подходящие под условие where (дерево из parser.parse_where), по одной.
+    Условие компилируется один раз; планировщик выбирает поиск по ID
+    или по индексу, если это возможно, иначе выполняется полный просмотр:
+    параллельный по диапазонам для большой двоичной таблицы на диске,
+    колоночный для большой таблицы в памяти.
+    """
+    if not where:
+        return _counted(table_manager.iter_rows(table_name), None)
+    col_types = dict(_columns(metadata, table_name))
+    predicate = compile_where(where, col_types)
+    indexes = metadata[table_name]["indexes"]
+    path, arg = _access_path(metadata, table_name, where)
+    if path == "parallel":
+        return table_manager.scan(table_name, where, col_types)
+    if path == "columnar":
+        snapshot = table_manager.columnar(table_name, _columns(metadata, table_name))
+        ids = snapshot.ids(snapshot.mask(where))
+        metrics.add("rows_scanned", len(table_manager.rows(table_name)))
+        metrics.add("rows_returned", len(ids))
+        return (table_manager.row(table_name, i) for i in ids)
+    if path == "scan":
+        # Секционированная таблица на диске читается без лишних сегментов.
+        return _counted(table_manager.iter_rows(table_name, where), predicate)
+    return _counted(_candidates(table_name, col_types, indexes, path, arg), predicate)
+
+
+def _access_path(metadata: dict, table_name: str, where) -> Tuple[str, object]:
+    """
+    Способ доступа для условия (query.plan), полный просмотр уточняется:
+    "parallel" - параллельный по диапазонам двоичной таблицы на диске,
+    "columnar" - по колоночному снимку большой таблицы в памяти.
+    """
+    if not where:
+        return "scan", None
+    path, arg = plan(
+        where, dict(_columns(metadata, table_name)),
+        metadata[table_name]["indexes"],
+        lambda: table_manager.statistics(table_name)["rows"],
+        lambda: _last_id(metadata, table_name),
+    )
+    if path == "scan" and _use_parallel(table_name):
+        return "parallel", None
+    if path == "scan" and _use_columnar(table_name):
+        return "columnar", None
+    return path, arg
+
+
+def _counted(rows: Iterable[dict], predicate) -> Iterator[dict]:
+    """Строки, подходящие под predicate (None - все), со счётом в метриках."""
+    scanned = returned = 0
+    try:
+        for row in rows:
+            scanned += 1
+            if predicate is None or predicate(row):
+                returned += 1
+                yield row
+    finally:
+        metrics.add("rows_scanned", scanned)
+        metrics.add("rows_returned", returned)
+
+
+def _use_columnar(table_name: str) -> bool:
+    return (
+        COLUMNAR_SCAN
+        and not table_manager.streams(table_name)
+        and len(table_manager.rows(table_name)) >= COLUMNAR_MIN_ROWS
+    )
+
+
+def _use_parallel(table_name: str) -> bool:
+    return (
+        PARALLEL_SCAN
+        and table_manager.streams(table_name)
+        and table_manager.supports_partial_read(table_name)
+    )
+
+
+def _candidates(table_name: str, col_types: dict, indexes: dict,
+                path: str, arg) -> Iterable[dict]:
+    """Строки-кандидаты для выбранного планировщиком способа доступа."""
+    if path == "id":
+        return table_manager.rows_by_id(table_name, sorted(set(arg)))
+    if path == "id_range":
+        return table_manager.rows_by_id(table_name, list(range(arg[0], arg[1] + 1)))
+    if path in ("index", "index_range"):
+        column = arg[0]
+        index = table_manager.index(
+            table_name, column, indexes[column], col_types[column]
+        )
+        if path == "index_range":
+            # В порядке ID, как при полном просмотре: limit и offset
+            # не должны зависеть от выбранного плана.
+            return sorted(index.range(*arg[1]), key=lambda row: row[ID_FIELD])
+        found = {}
+        for value in arg[1]:
+            for row in index.lookup(value):
+                found[row[ID_FIELD]] = row
+        return [found[i] for i in sorted(found)]
+    return table_manager.iter_rows(table_name)
+
+
+def _find_rows(metadata: dict, table_name: str, where_clause) -> List[dict]:
+    return list(_iter_rows(metadata, table_name, where_clause))
+
+
+def set_paging(enabled: bool) -> None:
+    """Включает постраничный вывод select с ожиданием Enter между страницами."""
+    _output["paging"] = enabled
+    print(f"Постраничный вывод {'включен' if enabled else 'выключен'}.")
+
+
+def _pretty_table(field_names: List[str]):
+    """Таблица для вывода; prettytable загружается при первом выводе."""
+    from prettytable import PrettyTable
 
-def _convert_value_by_type(value: str, type_name: str):
+    table = PrettyTable()
+    table.field_names = field_names
+    return table
+
+
+def _print_rows(columns: List[str], rows: Iterable[dict]) -> None:
+    """
+    Печатает строки таблицами по PAGE_SIZE строк, не собирая весь результат.
+    В режиме paging перед каждой следующей страницей ждёт Enter (q - прервать).
+    """
+    for number, page in enumerate(_render_pages(columns, rows)):
+        if number and _output["paging"]:
+            answer = input("-- Enter - следующая страница, q - выход --").strip()
+            if answer.lower() == "q":
+                return
+        print(page)
+
+
+def _render_pages(columns: List[str], rows: Iterable[dict]) -> Iterator[str]:
+    """Текст таблиц по PAGE_SIZE строк (для пустого результата - одна пустая)."""
+    rows = iter(rows)
+    page = list(islice(rows, PAGE_SIZE))
+    while True:
+        table = _pretty_table(columns)
+        for row in page:
+            table.add_row([row.get(c) for c in columns])
+        yield table.get_string()
+        page = list(islice(rows, PAGE_SIZE))
+        if not page:
+            return
+
+
+def _last_id(metadata: dict, table_name: str) -> int:
+    """Наибольший выданный ID: по счётчику next_id, без чтения таблицы."""
+    next_id = metadata[table_name].get("next_id")
+    if next_id is None:
+        return table_manager.max_id(table_name)
+    return next_id - 1
+
+
+def _next_ids(metadata: dict, table_name: str, count: int = 1) -> List[int]:
+    """
+    Выдаёт count следующих ID из счётчика next_id в метаданных таблицы.
+    Для таблиц без счётчика он один раз вычисляется по данным.
+    """
+    table_meta = metadata[table_name]
+    new_id = table_meta.get("next_id")
+    if new_id is None:
+        new_id = table_manager.max_id(table_name) + 1
+    ids = []
+    while len(ids) < count:
+        if table_manager.row(table_name, new_id) is None:
+            ids.append(new_id)
+        new_id += 1
+    table_meta["next_id"] = new_id
+    table_manager.touch_metadata()
+    return ids
+
+
+def _build_record(columns: List[Tuple[str, str]], values: List) -> dict:
     """
-    Конвертор.
+    Собирает запись из значений в порядке столбцов (без ID).
+    При несоответствии количества или типа значений бросает ValueError.
     """
-    if type_name == "int":
-        return int(value)
-    if type_name == "str":
-        return value
-    if type_name == "bool":
-        val = value.lower()
-        if val in ("true", "1"):
-            return True
-        if val in ("false", "0"):
-            return False
-        raise ValueError(f"значение {value} не является bool")
-    raise ValueError(f"неподдерживаемый тип {type_name}")
+    if len(values) != len(columns) - 1:
+        raise ValueError(
+            "количество значений не соответствует количеству столбцов."
+        )
+    record = {}
+    for (col_name, col_type), val in zip(columns[1:], values):
+        val = str(val).strip('"').strip("'").strip()
+        try:
+            record[col_name] = convert_value(val, col_type)
+        except ValueError:
+            raise ValueError(f"{col_name} должен быть {col_type}") from None
+    return record
+
+
+def _insert_records(metadata: dict, table_name: str, records: List[dict]) -> List[int]:
+    """Назначает ID проверенным записям одним проходом и добавляет их в таблицу."""
+    ids = _next_ids(metadata, table_name, len(records))
+    for record, new_id in zip(records, ids):
+        record[ID_FIELD] = new_id
+    table_manager.insert(table_name, records)
+    query_cache.invalidate(table_name, records)
+    return ids
+
 
 @handle_db_errors
-def create_table(metadata: dict, table_name: str, columns: List[str]) -> dict:
+def create_table(metadata: dict, table_name: str, columns: List[str],
+                 partition: Optional[Tuple[str, str, int]] = None) -> dict:
     """
     Создаёт таблицу с заданными столбцами.
+    partition - (range|hash, столбец, N): строки раскладываются по сегментам.
     """
+    table_manager.lock_for_write(table_name)
     if table_name in metadata:
         print(MSG["table_exists"].format(name=table_name))
         return metadata
+    # Символ SEPARATOR отделяет номер сегмента в именах файлов.
+    if SEPARATOR in table_name:
+        print(f"Некорректное имя таблицы: {table_name}")
+        return metadata
 
     parsed_columns: List[Tuple[str, str]] = []
     for col in columns:
@@ -52,10 +297,23 @@ def create_table(metadata: dict, table_name: str, columns: List[str]) -> dict:
         parsed_columns.append((name.strip(), type_name))
 
     full_columns = [(ID_FIELD, "int")] + parsed_columns
-    metadata[table_name] = full_columns
+    table_meta = {"columns": full_columns, "indexes": {}, "next_id": 1,
+                  "stats": new_stats(full_columns)}
+    if partition is not None:
+        try:
+            table_meta["partition"] = partition_spec(*partition, full_columns)
+        except ValueError as exc:
+            print(f"Ошибка: {exc}.")
+            return metadata
+    metadata[table_name] = table_meta
+    for segment in table_manager.segments(table_name):
+        create_table_file(segment, full_columns)
 
     cols_str = ", ".join(f"{c}:{t}" for c, t in full_columns)
     print(MSG["created_table"].format(name=table_name, cols=cols_str))
+    part = table_manager.partitioning(table_name)
+    if part is not None:
+        print(MSG["table_partitioned"].format(name=table_name, spec=part.describe()))
     return metadata
 
 
@@ -65,14 +323,24 @@ def drop_table(metadata: dict, table_name: str) -> dict:
     """
     Удаляет таблицу.
     """
+    if table_manager.in_transaction:
+        print(MSG["txn_forbidden"].format(command="drop_table"))
+        return metadata
+    table_manager.lock_for_write(table_name)
     if table_name not in metadata:
         print(MSG["table_not_exists"].format(name=table_name))
         return metadata
 
+    segments = table_manager.segments(table_name)
     del metadata[table_name]
-    table_path = (DATA_DIR / table_name).with_suffix(FILE_EXT)
-    table_path.unlink(missing_ok=True)
-    invalidate_cache(table_name)
+    table_manager.forget(table_name)
+    # В WAL не должно остаться изменений удаляемой таблицы: иначе при
+    # восстановлении они попали бы в новую таблицу с тем же именем.
+    table_manager.checkpoint()
+    with table_manager.locks.exclusive(data_lock(table_name)):
+        for segment in segments:
+            remove_table_files(segment)
+    query_cache.invalidate(table_name)
     print(MSG["dropped_table"].format(name=table_name))
     return metadata
 
@@ -88,67 +356,387 @@ def list_tables(metadata: dict) -> None:
 
 
 @handle_db_errors
-@log_time
 def insert(metadata: dict, table_name: str, values: List[str]) -> None:
     """
     Добавляет запись в таблицу.
     Автоматически генерирует ID. Проверяет соответствие типов данных.
     """
+    table_manager.lock_for_write(table_name)
     if table_name not in metadata:
         print(MSG["table_not_exists"].format(name=table_name))
         return
 
-    columns = metadata[table_name]
-    if len(values) != len(columns) - 1:
-        print("Ошибка: количество значений не соответствует количеству столбцов.")
+    try:
+        record = _build_record(_columns(metadata, table_name), values)
+    except ValueError as exc:
+        print(f"Ошибка: {exc}")
         return
 
-    record = {}
-    for (col_name, col_type), val in zip(columns[1:], values):
-        val = str(val).strip('"').strip("'").strip()
+    new_id, = _insert_records(metadata, table_name, [record])
+    print(MSG["record_added"].format(id=new_id, name=table_name))
+
+
+@handle_db_errors
+def insert_many(metadata: dict, table_name: str, values_list: List[List[str]]) -> None:
+    """
+    Добавляет несколько записей одной командой.
+    Сначала проверяются все кортежи: если хотя бы один некорректен,
+    не добавляется ничего.
+    """
+    table_manager.lock_for_write(table_name)
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    start = time.monotonic()
+    columns = _columns(metadata, table_name)
+    records = []
+    for number, values in enumerate(values_list, 1):
         try:
-            record[col_name] = _convert_value_by_type(val, col_type)
-        except ValueError:
-            print(f"Ошибка: {col_name} должен быть {col_type}")
+            records.append(_build_record(columns, values))
+        except ValueError as exc:
+            print(f"Ошибка в кортеже {number}: {exc}")
             return
 
-    data = load_table_data(table_name)
-    new_id = max((r.get(ID_FIELD, 0) for r in data), default=0) + 1
-    record[ID_FIELD] = new_id
-    data.append(record)
-    save_table_data(table_name, data)
-    invalidate_cache(table_name)
-    print(MSG["record_added"].format(id=new_id, name=table_name))
+    _insert_records(metadata, table_name, records)
+    elapsed = max(time.monotonic() - start, 1e-9)
+    print(MSG["records_added"].format(
+        count=len(records), name=table_name, rate=len(records) / elapsed
+    ))
 
 
 @handle_db_errors
-@log_time
-def select(metadata: dict, table_name: str, where_clause=None) -> None:
+def import_file(metadata: dict, table_name: str, filepath: str,
+                batch_size: int = IMPORT_BATCH_SIZE) -> None:
     """
-    Выводит записи таблицы. Фильтрует по условию where_clause, если задано.
+    Загружает записи из CSV или JSONL.
+    Файл читается потоково; каждая пачка из batch_size строк проверяется,
+    получает ID одним проходом и записывается на диск одной операцией.
+    Некорректные строки пропускаются с сообщением о номере строки.
     """
+    table_manager.lock_for_write(table_name)
     if table_name not in metadata:
         print(MSG["table_not_exists"].format(name=table_name))
         return
 
-    def predicate(row):
-        if not where_clause:
-            return True
-        col, val = where_clause
-        val = str(val).strip('"').strip("'")
-        return str(row.get(col)) == val
+    start = time.monotonic()
+    columns = _columns(metadata, table_name)
+    names = [c for c, _ in columns[1:]]
+    imported = 0
+    skipped = 0
+    rows = read_import_rows(filepath, names)
+    while batch := list(islice(rows, batch_size)):
+        records = []
+        for line_no, values in batch:
+            try:
+                records.append(_build_record(columns, values))
+            except ValueError as exc:
+                skipped += 1
+                if skipped <= MAX_REPORTED_ERRORS:
+                    print(f"Строка {line_no}: {exc}")
+        if records:
+            _insert_records(metadata, table_name, records)
+            table_manager.flush(table_name)
+            imported += len(records)
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    print(MSG["imported"].format(
+        count=imported, name=table_name, skipped=skipped, rate=imported / elapsed
+    ))
+
 
-    key = (table_name, str(where_clause))
+@handle_db_errors
+def select(metadata: dict, table_name: str, where_clause=None,
+           limit: Optional[int] = None, offset: int = 0,
+           join: Optional[Tuple[str, str, str]] = None) -> None:
+    """
+    Выводит записи таблицы. Фильтрует по условию where_clause, если задано.
+    limit и offset ограничивают вывод; строки идут потоком от хранилища
+    до вывода, поэтому полный результат в памяти не собирается.
+    join - (другая таблица, столбец этой таблицы, столбец другой) для
+    select from a join b on a.x = b.y.
+    """
+    if join is not None:
+        _select_join(metadata, table_name, join, where_clause, limit, offset)
+        return
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    stop = None if limit is None else offset + limit
     def load():
-        return [row for row in load_table_data(table_name) if predicate(row)]
-    result = cache_select(key, load)
+        return list(islice(
+            _iter_rows(metadata, table_name, where_clause), offset, stop
+        ))
+    if where_clause or limit is not None:
+        key = (table_name, str(where_clause), limit, offset,
+               table_manager.version(table_name))
+        predicate = None
+        if where_clause:
+            predicate = compile_where(
+                where_clause, dict(_columns(metadata, table_name))
+            )
+        result = query_cache.get(key, load, predicate)
+    else:
+        result = islice(_iter_rows(metadata, table_name, None), offset, None)
 
-    table = PrettyTable()
-    columns = [c for c, _ in metadata[table_name]]
-    table.field_names = columns
-    for row in result:
-        table.add_row([row.get(c) for c in columns])
-    print(table)
+    _print_rows([c for c, _ in _columns(metadata, table_name)], result)
+
+
+def _select_join(metadata: dict, left: str, join: Tuple[str, str, str],
+                 where_clause, limit: Optional[int], offset: int) -> None:
+    """
+    Соединение таблиц по равенству столбцов. Если у одной стороны столбец
+    соединения - ID или по нему есть индекс, её строки ищутся по значению
+    напрямую. Иначе из меньшей стороны строится хеш-таблица, а строки
+    большей проходят через неё потоком. Условия where, касающиеся одной
+    таблицы, проверяются до соединения. Строки выводятся по порядку ID левой
+    таблицы, затем правой: если поток идёт по правой таблице, результат
+    сортируется целиком.
+    """
+    right, left_column, right_column = join
+    keys = {left: left_column, right: right_column}
+    for table_name, column in keys.items():
+        if table_name not in metadata:
+            print(MSG["table_not_exists"].format(name=table_name))
+            return
+        if column not in dict(_columns(metadata, table_name)):
+            print(MSG["column_not_exists"].format(column=column, name=table_name))
+            return
+    if left == right:
+        print("Ошибка: соединение таблицы с самой собой не поддерживается.")
+        return
+    types = {t: dict(_columns(metadata, t)) for t in keys}
+    if types[left][left_column] != types[right][right_column]:
+        print(f"Ошибка: столбцы {left}.{left_column} и {right}.{right_column} "
+              "разных типов.")
+        return
+    columns = {f"{t}.{c}": col_type for t in keys for c, col_type in types[t].items()}
+    try:
+        own, rest = split_where(
+            qualify(where_clause, types) if where_clause else None, keys
+        )
+        residual = compile_where(rest, columns) if rest else None
+    except ValueError as exc:
+        print(f"Ошибка: {exc}.")
+        return
+
+    getters = {t: _getter(keys[t], types[t][keys[t]]) for t in keys}
+    lookups = {t: _join_lookup(metadata, t, keys[t], types[t], own[t]) for t in keys}
+    small, large = sorted(keys, key=_join_size)
+    if lookups[large] or lookups[small]:
+        inner = large if lookups[large] else small
+        found = lookups[inner]
+
+        def lookup(value):
+            return sorted(found(value), key=lambda row: row[ID_FIELD])
+    else:
+        inner = small
+        hashed = build_hash(_iter_rows(metadata, small, own[small]), getters[small])
+
+        def lookup(value):
+            return hashed.get(value, ())
+    probe = right if inner == left else left
+
+    def combine(probe_row: dict, match: dict) -> dict:
+        pair = {probe: probe_row, inner: match}
+        return {f"{t}.{c}": pair[t].get(c) for t in keys for c in types[t]}
+
+    rows = join_rows(
+        _iter_rows(metadata, probe, own[probe]), getters[probe], lookup, combine
+    )
+    if residual:
+        rows = filter(residual, rows)
+    if probe != left:
+        ids = f"{left}.{ID_FIELD}", f"{right}.{ID_FIELD}"
+        rows = sorted(rows, key=lambda row: (row[ids[0]], row[ids[1]]))
+    stop = None if limit is None else offset + limit
+    _print_rows(list(columns), islice(rows, offset, stop))
+
+
+def _join_lookup(metadata: dict, table_name: str, column: str, types: dict,
+                 where) -> Optional[Callable[[object], List[dict]]]:
+    """Поиск строк стороны соединения по значению через ID или индекс."""
+    if where is not None:
+        # Отфильтровать сторону и построить хеш-таблицу дешевле.
+        return None
+    if column == ID_FIELD:
+        def by_id(value):
+            row = table_manager.row(table_name, value)
+            return [] if row is None else [row]
+        return by_id
+    kind = metadata[table_name]["indexes"].get(column)
+    if kind is None:
+        return None
+    return table_manager.index(table_name, column, kind, types[column]).lookup
+
+
+def _join_size(table_name: str) -> Tuple[bool, int]:
+    """
+    Ключ для выбора меньшей стороны: число строк таблицы в памяти;
+    таблицы, читаемые с диска потоком, больше любой из них.
+    """
+    if table_manager.streams(table_name):
+        return True, table_manager.size(table_name)
+    return False, len(table_manager.rows(table_name))
+
+
+@handle_db_errors
+def explain(metadata: dict, table_name: str, where_clause=None,
+            limit: Optional[int] = None, offset: int = 0,
+            join: Optional[Tuple[str, str, str]] = None) -> None:
+    """
+    Выполняет select и вместо строк выводит, как он выполнялся: способ
+    доступа, оценку числа строк по статистике и фактическое число, время
+    загрузки таблицы, отбора строк и построения таблиц вывода.
+    Кэш результатов не используется, строки не печатаются.
+    """
+    if join is not None:
+        print("Ошибка: explain для select с join не поддерживается.")
+        return
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+    columns = _columns(metadata, table_name)
+    if where_clause:
+        compile_where(where_clause, dict(columns))
+
+    started = time.perf_counter()
+    # select с условием или limit сверяет версию таблицы для ключа кэша.
+    if where_clause or limit is not None:
+        table_manager.version(table_name)
+    loaded = time.perf_counter()
+    path = _describe_path(metadata, table_name, where_clause)
+    scanned, returned = (metrics.counters["rows_scanned"],
+                         metrics.counters["rows_returned"])
+    stop = None if limit is None else offset + limit
+    rows = list(islice(_iter_rows(metadata, table_name, where_clause), offset, stop))
+    filtered = time.perf_counter()
+    pages = sum(1 for _ in _render_pages([c for c, _ in columns], rows))
+    rendered = time.perf_counter()
+
+    stats = table_manager.statistics(table_name)
+    estimate = estimate_rows(stats, where_clause, dict(columns))
+    print(
+        f"Способ доступа: {path}\n"
+        f"Оценка по статистике: {estimate} из {stats['rows']} строк\n"
+        f"Фактически: просмотрено "
+        f"{metrics.counters['rows_scanned'] - scanned:.0f}, подошло "
+        f"{metrics.counters['rows_returned'] - returned:.0f}, выведено "
+        f"{len(rows)} ({pages} стр.)\n"
+        f"Время: загрузка {(loaded - started) * 1000:.2f} мс, "
+        f"отбор {(filtered - loaded) * 1000:.2f} мс, "
+        f"вывод {(rendered - filtered) * 1000:.2f} мс"
+    )
+
+
+def _describe_path(metadata: dict, table_name: str, where) -> str:
+    """Способ доступа _iter_rows для условия словами."""
+    path, arg = _access_path(metadata, table_name, where)
+    if path == "id":
+        return f"поиск по {ID_FIELD} ({len(set(arg))} значений)"
+    if path == "id_range":
+        return f"перебор диапазона {ID_FIELD} {arg[0]}..{arg[1]}"
+    if path in ("index", "index_range"):
+        kind = metadata[table_name]["indexes"][arg[0]]
+        if path == "index":
+            return f'индекс {kind} по "{arg[0]}" ({len(arg[1])} значений)'
+        return f'диапазон по индексу {kind} "{arg[0]}"'
+    if path == "parallel":
+        text = f"параллельный просмотр файла ({PARALLEL_SCAN_WORKERS} рабочих)"
+    elif path == "columnar":
+        text = "колоночный просмотр снимка в памяти"
+    elif not table_manager.streams(table_name):
+        return "полный просмотр в памяти"
+    else:
+        text = "полный просмотр потоком с диска"
+    part = table_manager.partitioning(table_name)
+    if part is not None:
+        segments = table_manager.segments(table_name, where)
+        text += f", сегментов {len(segments)} из {len(part.numbers)}"
+    return text
+
+
+@handle_db_errors
+def analyze(metadata: dict, table_name: str) -> None:
+    """Пересчитывает статистику таблицы по её строкам."""
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+    table_manager.lock_for_write(table_name)
+    stats = table_manager.analyze(table_name)
+    print(MSG["table_analyzed"].format(name=table_name, rows=stats["rows"]))
+    _print_stats(metadata, table_name, stats)
+
+
+def _print_stats(metadata: dict, table_name: str, stats: dict) -> None:
+    print("Статистика столбцов:")
+    for column, _ in _columns(metadata, table_name):
+        values = stats["columns"].get(column, {})
+        line = f"- {column}: ~{distinct(stats, column)} различных"
+        if "min" in values:
+            line += f", min {values['min']}, max {values['max']}"
+        print(line)
+
+
+@handle_db_errors
+def aggregate(metadata: dict, table_name: str, func: str,
+              column: Optional[str] = None, where=None,
+              group_by: Optional[str] = None) -> None:
+    """
+    Считает count/sum/min/max/avg по колоночному снимку таблицы.
+    Строки-словари при этом не просматриваются и не создаются.
+    """
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    columns = _columns(metadata, table_name)
+    col_types = dict(columns)
+    if column is not None and column not in col_types:
+        print(MSG["column_not_exists"].format(column=column, name=table_name))
+        return
+    if func in ("sum", "avg") and col_types[column] == "str":
+        print(f"Ошибка: {func} применим только к столбцам int и bool.")
+        return
+
+    snapshot = table_manager.columnar(table_name, columns)
+    result = snapshot.aggregate(func, column, snapshot.mask(where), group_by)
+    label = f"{func}({column or '*'})"
+    if group_by is None:
+        print(f"{label} = {result[None]}")
+        return
+    keys = sorted(result, key=lambda k: (k is None, k))
+    _print_rows(
+        [group_by, label], ({group_by: k, label: result[k]} for k in keys)
+    )
+
+
+@handle_db_errors
+def export(metadata: dict, table_name: str, filepath: str,
+           fmt: Optional[str] = None) -> None:
+    """
+    Выгружает таблицу в CSV или JSONL. Строки пишутся в файл по мере
+    чтения, ни таблица, ни результат целиком в памяти не собираются.
+    """
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    fmt = (fmt or Path(filepath).suffix.lstrip(".")).lower()
+    if fmt not in EXPORT_FORMATS:
+        print(f"Некорректное значение: {fmt}. Доступно: csv, jsonl")
+        return
+
+    start = time.monotonic()
+    columns = [c for c, _ in _columns(metadata, table_name)]
+    count = write_export_rows(
+        filepath, fmt, columns, table_manager.iter_rows(table_name)
+    )
+    elapsed = max(time.monotonic() - start, 1e-9)
+    print(MSG["exported"].format(
+        count=count, name=table_name, path=filepath, rate=count / elapsed
+    ))
 
 
 @handle_db_errors
@@ -156,30 +744,39 @@ def update(metadata, table_name, set_clause, where_clause):
     """
     Обновляет записи в таблице по условию.
     """
+    table_manager.lock_for_write(table_name)
     if table_name not in metadata:
         print(f'Ошибка: Таблица "{table_name}" не существует.')
         return
 
-    data = load_table_data(table_name)
-    set_column, set_value = set_clause
-    where_column, where_value = where_clause
-    where_value = str(where_value).strip('"').strip("'")
-    set_value = str(set_value).strip('"').strip("'")
+    try:
+        assign = compile_set(set_clause, dict(_columns(metadata, table_name)))
+    except ValueError as exc:
+        print(f"Ошибка: {exc}.")
+        return
 
-    updated_count = 0
-    for row in data:
-        if str(row.get(where_column)) == where_value:
-            row[set_column] = set_value
-            updated_count += 1
-            print(
-                f'Запись с ID={row["ID"]} в таблице "{table_name}" успешно обновлена.'
-            )
+    matched = 0
+    updated = []
+    old_versions = []
+    for row in _find_rows(metadata, table_name, where_clause):
+        matched += 1
+        changes = assign(row)
+        print(MSG["record_updated"].format(id=row[ID_FIELD], name=table_name))
+        # Строки, в которых значения уже такие, не переписываются.
+        if all(row.get(column) == value for column, value in changes.items()):
+            continue
+        old_versions.append(dict(row))
+        row.update(changes)
+        updated.append(row)
 
-    if updated_count == 0:
+    if not matched:
         print(f'Записей, соответствующих условию, не найдено в таблице "{table_name}".')
+        return
+    if not updated:
+        return
 
-    save_table_data(table_name, data)
-    invalidate_cache(table_name)
+    table_manager.update(table_name, updated)
+    query_cache.invalidate(table_name, old_versions + updated)
 
 
 @handle_db_errors
@@ -188,15 +785,12 @@ def delete(metadata, table_name, where_clause):
     """
     Удаляет записи из таблицы по условию.
     """
+    table_manager.lock_for_write(table_name)
     if table_name not in metadata:
         print(f'Ошибка: Таблица "{table_name}" не существует.')
         return
 
-    data = load_table_data(table_name)
-    column, value = where_clause
-    value = str(value).strip('"').strip("'")
-
-    to_delete = [row for row in data if str(row.get(column)) == value]
+    to_delete = _find_rows(metadata, table_name, where_clause)
 
     if not to_delete:
         print(f'Записей, соответствующих условию, не найдено в таблице "{table_name}".')
@@ -205,8 +799,8 @@ def delete(metadata, table_name, where_clause):
     for row in to_delete:
         print(f'Запись с ID={row["ID"]} успешно удалена из таблицы "{table_name}".')
 
-    data = [row for row in data if str(row.get(column)) != value]
-    save_table_data(table_name, data)
+    table_manager.delete(table_name, [row[ID_FIELD] for row in to_delete])
+    query_cache.invalidate(table_name, to_delete)
 
 
 @handle_db_errors
@@ -218,12 +812,314 @@ def info(metadata, table_name):
         print(f'Ошибка: Таблица "{table_name}" не существует.')
         return
 
-    data = load_table_data(table_name)
+    data = table_manager.rows(table_name)
+    columns = _columns(metadata, table_name)
     columns_str = ", ".join(
-    f"{col_name}:{col_type}" for col_name, col_type in metadata[table_name]
+    f"{col_name}:{col_type}" for col_name, col_type in columns
     )
+    segments = table_manager.segments(table_name)
+    fmt, path = table_format(segments[0])
+    files = path.name if len(segments) == 1 else f"{len(segments)} сегментов"
     print(
         f"Таблица: {table_name}\n"
         f"Столбцы: {columns_str}\n"
-        f"Количество записей: {len(data)}"
+        f"Количество записей: {len(data)}\n"
+        f"Хранение: {fmt} ({files}, {table_manager.size(table_name)} байт)"
     )
+    part = table_manager.partitioning(table_name)
+    if part is not None:
+        counts = Counter(part.of_row(row) for row in data)
+        print(f"Секционирование: {part.describe()}")
+        for number, segment in zip(part.numbers, segments):
+            print(f"- {segment}: {counts[number]} записей, "
+                  f"{table_size(segment)} байт")
+    if data:
+        print("Сравнение форматов на текущих строках:")
+        for name, size, read_ms in storage_report(list(data), columns):
+            mark = " (текущий)" if name == fmt else ""
+            print(f"- {name}{mark}: {size} байт, чтение {read_ms:.1f} мс")
+
+    _print_stats(metadata, table_name, table_manager.statistics(table_name))
+
+    indexes = metadata[table_name]["indexes"]
+    if not indexes:
+        print("Индексы: нет")
+        return
+    print("Индексы:")
+    col_types = dict(columns)
+    for column, kind in indexes.items():
+        index = table_manager.index(table_name, column, kind, col_types[column])
+        print(
+            f"- {column} ({kind}): {index.distinct()} значений, "
+            f"{len(index)} записей"
+        )
+
+
+@handle_db_errors
+def alter_table(metadata: dict, table_name: str, op: str, column: str,
+                col_type: Optional[str] = None, new_name: Optional[str] = None,
+                default: Optional[str] = None) -> dict:
+    """
+    Меняет схему таблицы: add - добавить столбец (со значением по умолчанию
+    для старых строк), drop - удалить, rename - переименовать.
+    Файл таблицы не переписывается: старые строки приводятся к новой схеме
+    при чтении, а compact перепишет их позже.
+    """
+    if table_manager.in_transaction:
+        print(MSG["txn_forbidden"].format(command="alter_table"))
+        return metadata
+    table_manager.lock_for_write(table_name)
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return metadata
+    if op == "add":
+        if col_type not in VALID_TYPES:
+            print(f"Некорректное значение: {column}:{col_type}")
+            return metadata
+        if default is not None:
+            default = coerce_literal(column, default, col_type)
+
+    # Несброшенные строки записываются ещё в старой схеме.
+    table_manager.flush(table_name)
+    table_meta = metadata[table_name]
+    try:
+        columns = alter_columns(table_meta, op, column, col_type, new_name, default)
+    except ValueError as exc:
+        print(f"Ошибка: {exc}.")
+        return metadata
+    indexes = table_meta["indexes"]
+    if column in indexes and op != "add":
+        kind = indexes.pop(column)
+        if op == "rename":
+            indexes[new_name] = kind
+    # Статистика будет построена заново по строкам в новой схеме.
+    table_meta.pop("stats", None)
+    with table_manager.locks.exclusive(data_lock(table_name)):
+        for segment in table_manager.segments(table_name):
+            set_table_columns(segment, columns)
+    query_cache.invalidate(table_name)
+    print(MSG["table_altered"].format(
+        name=table_name, version=table_meta["schema_version"],
+        cols=", ".join(f"{c}:{t}" for c, t in columns),
+    ))
+    return metadata
+
+
+@handle_db_errors
+def create_index(metadata: dict, table_name: str, column: str,
+                 kind: str = "hash") -> dict:
+    """
+    Создаёт индекс по столбцу. Определение хранится в метаданных,
+    сам индекс строится в памяти при первом обращении к таблице.
+    """
+    table_manager.lock_for_write(table_name)
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return metadata
+
+    col_types = dict(_columns(metadata, table_name))
+    if column not in col_types:
+        print(MSG["column_not_exists"].format(column=column, name=table_name))
+        return metadata
+    if kind not in INDEX_KINDS:
+        print(f"Некорректное значение: {kind}. Доступно: hash, sorted")
+        return metadata
+
+    metadata[table_name]["indexes"][column] = kind
+    index = table_manager.index(table_name, column, kind, col_types[column])
+    print(MSG["index_created"].format(
+        column=column, name=table_name, kind=kind, size=len(index)
+    ))
+    return metadata
+
+
+def cache_stats() -> None:
+    """Выводит статистику кэша результатов select."""
+    stats = query_cache.summary()
+    print(
+        f"Записей в кэше: {stats['entries']} "
+        f"(~{stats['bytes']} байт, лимит {query_cache.max_bytes})\n"
+        f"Попадания: {stats['hits']}, промахи: {stats['misses']}, "
+        f"доля попаданий: {stats['hit_rate']:.1%}\n"
+        f"Вытеснено (LRU): {stats['evictions']}, "
+        f"устарело (TTL): {stats['expired']}, "
+        f"сброшено при записи: {stats['invalidations']}, "
+        f"не помещено (слишком большие): {stats['too_large']}"
+    )
+
+
+@handle_db_errors
+def convert_table(metadata: dict, table_name: str, fmt: str) -> None:
+    """
+    Переводит таблицу в другой формат хранения (json, log или binary).
+    Файл переписывается целиком, в нём остаются только живые строки.
+    """
+    if table_manager.in_transaction:
+        print(MSG["txn_forbidden"].format(command="convert_table"))
+        return
+    if fmt not in BACKENDS:
+        print(f"Некорректное значение: {fmt}. Форматы: {', '.join(BACKENDS)}")
+        return
+    table_manager.lock_for_write(table_name)
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    table_manager.checkpoint()
+    before, after = _rewrite_table(metadata, table_name, convert_table_file, fmt)
+    print(MSG["table_converted"].format(
+        name=table_name, fmt=fmt, before=before, after=after
+    ))
+
+
+def lock_stats() -> None:
+    """Выводит статистику блокировок между процессами."""
+    stats = table_manager.locks.stats
+    if not stats:
+        print("Блокировки ещё не запрашивались.")
+        return
+    table = _pretty_table(["Ресурс", "Чтение", "Запись", "Ожиданий",
+                           "Ожидание, мс", "Макс., мс", "Таймауты"])
+    for name, item in sorted(stats.items()):
+        table.add_row([
+            name, item["shared"], item["exclusive"], item["contended"],
+            f"{item['wait_ms']:.1f}", f"{item['max_wait_ms']:.1f}",
+            item["timeouts"],
+        ])
+    print(table)
+
+
+@handle_db_errors
+def stats(action: Optional[str] = None, filepath: Optional[str] = None,
+          fmt: Optional[str] = None) -> None:
+    """
+    Без аргументов выводит задержки команд и счётчики метрик.
+    reset - обнуляет их, export - выгружает в файл: jsonl дописывает
+    снимок одной строкой, prom - перезаписывает файл в текстовом
+    формате Prometheus.
+    """
+    cache = query_cache.summary()
+    extra = {"query_cache_hits": cache["hits"], "query_cache_misses": cache["misses"]}
+    if action == "reset":
+        metrics.reset()
+        print(MSG["stats_reset"])
+        return
+    if action == "export":
+        fmt = fmt or ("prom" if Path(filepath).suffix == ".prom" else "jsonl")
+        if fmt not in METRICS_FORMATS:
+            formats = ", ".join(METRICS_FORMATS)
+            print(f"Некорректное значение: {fmt}. Форматы: {formats}")
+            return
+        if fmt == "prom":
+            Path(filepath).write_text(metrics.to_prometheus(extra), encoding="utf-8")
+        else:
+            with open(filepath, "a", encoding="utf-8") as file:
+                file.write(metrics.to_jsonl(extra))
+        print(MSG["stats_exported"].format(path=filepath, fmt=fmt))
+        return
+
+    commands = metrics.commands()
+    if commands:
+        table = _pretty_table(["Команда", "Вызовов", "p50, мс", "p95, мс",
+                               "p99, мс", "Макс., мс", "Всего, мс"])
+        for item in commands:
+            table.add_row([
+                item["command"], item["count"],
+                *(f"{item[key]:.2f}" for key in ("p50_ms", "p95_ms", "p99_ms",
+                                                   "max_ms", "total_ms")),
+            ])
+        print(table)
+    counters = _pretty_table(["Показатель", "Значение"])
+    counters.align["Показатель"] = "l"
+    for name, label in COUNTERS.items():
+        value = metrics.counters.get(name, 0)
+        counters.add_row([label, f"{value:.3f}" if name.endswith("_seconds")
+                          else int(value)])
+    hits = metrics.counters["parse_cache_hits"]
+    parsed = hits + metrics.counters["parse_cache_misses"]
+    if parsed:
+        counters.add_row(["Кэш разбора: доля попаданий", f"{hits / parsed:.1%}"])
+    counters.add_row(["Кэш select: доля попаданий", f"{cache['hit_rate']:.1%}"])
+    print(counters)
+
+
+@handle_db_errors
+def profile(enabled: bool, filepath: Optional[str] = None) -> None:
+    """
+    profile on - следующие команды выполняются под cProfile (профиль
+    накапливается), profile off - вывести самые затратные функции
+    и, если указан файл, сохранить в него полный профиль.
+    """
+    if enabled:
+        metrics.profile_start()
+        print(MSG["profile_on"])
+        return
+    report = metrics.profile_stop(filepath)
+    print(MSG["profile_off"])
+    if report:
+        print(report.rstrip())
+    if filepath and report:
+        print(MSG["profile_saved"].format(path=filepath))
+
+
+@handle_db_errors
+def compact(metadata, table_name):
+    """
+    Переписывает файл таблицы, оставляя только живые записи.
+    Таблицы в старом JSON-формате при этом переводятся в журнал строк.
+    """
+    if table_manager.in_transaction:
+        print(MSG["txn_forbidden"].format(command="compact"))
+        return
+    table_manager.lock_for_write(table_name)
+    if table_name not in metadata:
+        print(MSG["table_not_exists"].format(name=table_name))
+        return
+
+    table_manager.checkpoint()
+    before, after = _rewrite_table(metadata, table_name, compact_table)
+    print(MSG["table_compacted"].format(name=table_name, before=before, after=after))
+
+
+def _rewrite_table(metadata: dict, table_name: str, rewrite: Callable,
+                   *args) -> Tuple[int, int]:
+    """
+    Переписывает файл таблицы (compact, convert_table) в текущей схеме:
+    изменения alter_table применяются к строкам и больше не нужны.
+    """
+    changes = schema_changes(metadata[table_name])
+    before = after = 0
+    with table_manager.locks.exclusive(data_lock(table_name)):
+        for segment in table_manager.segments(table_name):
+            sizes = rewrite(segment, *args, _columns(metadata, table_name),
+                            changes.upgrade if changes else None)
+            before, after = before + sizes[0], after + sizes[1]
+    if changes:
+        schema_applied(metadata[table_name])
+        table_manager.touch_metadata()
+    return before, after
+
+
+@handle_db_errors
+def begin() -> None:
+    """
+    Начинает транзакцию: изменения копятся в памяти до commit
+    и записываются одним сбросом (всё или ничего).
+    """
+    table_manager.begin()
+    print(MSG["txn_begin"])
+
+
+@handle_db_errors
+def commit() -> None:
+    """Записывает изменения транзакции на диск."""
+    count = table_manager.commit()
+    print(MSG["txn_commit"].format(count=count))
+
+
+@handle_db_errors
+def rollback() -> None:
+    """Отменяет изменения транзакции."""
+    for table_name in table_manager.rollback():
+        query_cache.invalidate(table_name)
+    print(MSG["txn_rollback"])
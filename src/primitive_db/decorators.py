@@ -1,6 +1,5 @@
-import time
 from functools import wraps
-from typing import Callable, Tuple
+from typing import Callable
 
 
 def handle_db_errors(func: Callable) -> Callable:
@@ -21,6 +20,17 @@ def handle_db_errors(func: Callable) -> Callable:
     return wrapper
 
 
+_confirm = {"assume_yes": False}
+
+
+def set_assume_yes(enabled: bool) -> None:
+    """
+    Неинтерактивный режим (сервер, пакетное выполнение): опасные операции
+    выполняются без запроса подтверждения.
+    """
+    _confirm["assume_yes"] = enabled
+
+
 def confirm_action(action_name: str) -> Callable:
     """
     Фабрика декораторов для подтверждения опасных операций.
@@ -29,6 +39,8 @@ def confirm_action(action_name: str) -> Callable:
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
+            if _confirm["assume_yes"]:
+                return func(*args, **kwargs)
             confirmation = input(
                 f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
             ).strip().lower()
@@ -39,43 +51,3 @@ def confirm_action(action_name: str) -> Callable:
         return wrapper
     return decorator
 
-
-def log_time(func: Callable) -> Callable:
-    """
-    Декоратор для измерения времени выполнения функции.
-    Выводит время в консоль.
-    """
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start = time.monotonic()
-        result = func(*args, **kwargs)
-        end = time.monotonic()
-        print(f"Функция {func.__name__} выполнилась за {end - start:.3f} секунд.")
-        return result
-    return wrapper
-
-
-def create_cacher() -> Tuple[Callable, Callable]:
-    """
-    Возвращает функцию для кэширования результатов.
-    Использует замыкание для хранения кэша в словаре.
-    """
-    cache = {}
-    table_keys = {}
-
-    def cache_result(key, value_func):
-        if key in cache:
-            return cache[key]
-        result = value_func()
-        cache[key] = result
-        table, _ = key
-        table_keys.setdefault(table, []).append(key)
-        return result
-
-    def invalidate(table):
-        if table in table_keys:
-            for key in table_keys[table]:
-                cache.pop(key, None)
-            table_keys[table] = []
-
-    return cache_result, invalidate
@@ -1,18 +1,55 @@
+import re
 import shlex
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from src.primitive_db.constants import HELP_TEXT, META_FILE
+from src.primitive_db.constants import (
+    HELP_TEXT,
+    IMPORT_BATCH_SIZE,
+    META_FILE,
+    MSG,
+    PARSE_CACHE_SIZE,
+)
 from src.primitive_db.core import (
+    AGGREGATES,
+    aggregate,
+    alter_table,
+    analyze,
+    begin,
+    cache_stats,
+    commit,
+    compact,
+    convert_table,
+    create_index,
     create_table,
     delete,
     drop_table,
+    explain,
+    export,
+    import_file,
     info,
     insert,
+    insert_many,
     list_tables,
+    lock_stats,
+    profile,
+    rollback,
     select,
+    set_paging,
+    stats,
     update,
 )
-from src.primitive_db.parser import parse_set, parse_where
-from src.primitive_db.utils import load_metadata, save_metadata
+from src.primitive_db.decorators import set_assume_yes
+from src.primitive_db.locks import LockTimeout
+from src.primitive_db.metrics import metrics
+from src.primitive_db.parser import find_keyword, parse_set, parse_where
+from src.primitive_db.tables import table_manager
+
+
+class CommandError(ValueError):
+    """Синтаксическая ошибка команды; текст - сообщение для пользователя."""
 
 
 def print_help():
@@ -21,164 +58,633 @@ def print_help():
 
 def _safe_split_values(values_str: str):
     """
-    Берёт строку после ключевого слова values и возвращает список значений.
-    Учитывает кавычки (простейшая обработка).
+    Берёт строку после ключевого слова values и возвращает список кортежей
+    значений: "(1, 'a'), (2, 'b')" -> [["1", "'a'"], ["2", "'b'"]].
+    Запятые и скобки внутри кавычек не считаются разделителями.
+    Возвращает None, если значения не заключены в скобки.
     """
-    vs = values_str.strip()
-    if vs.startswith("(") and vs.endswith(")"):
-        inner = vs[1:-1].strip()
-    else:
+    tuples = []
+    current = None
+    part = []
+    quote = None
+    for ch in values_str.strip():
+        if quote:
+            part.append(ch)
+            if ch == quote:
+                quote = None
+        elif current is None:
+            if ch == "(":
+                current = []
+            elif not (ch == "," and tuples) and not ch.isspace():
+                return None
+        elif ch in "\"'":
+            quote = ch
+            part.append(ch)
+        elif ch == ",":
+            current.append("".join(part).strip())
+            part = []
+        elif ch == ")":
+            current.append("".join(part).strip())
+            tuples.append(current)
+            current = None
+            part = []
+        else:
+            part.append(ch)
+    if current is not None or quote or not tuples:
         return None
-    parts = [p.strip() for p in inner.split(",")]
-    return parts
+    return tuples
 
 
-def run():
-    print_help()
-    while True:
-        metadata = load_metadata(META_FILE)
+def _where_text(user_input: str):
+    """Текст условия после слова where (вне кавычек) или None, если его нет."""
+    pos = find_keyword(user_input, "where")
+    if pos < 0:
+        return None
+    return user_input[pos + len("where"):]
+
 
-        user_input = input(">>>Введите команду: ").strip()
-        if not user_input:
+def _parse_group_by(args):
+    """
+    Столбец из "group by <столбец>".
+    Возвращает (столбец или None, признак ошибки).
+    """
+    lowered = [a.lower() for a in args]
+    if "group" not in lowered:
+        return None, False
+    pos = lowered.index("group")
+    if pos + 2 >= len(args) or lowered[pos + 1] != "by":
+        return None, True
+    return args[pos + 2], False
+
+
+def _parse_limit_offset(args):
+    """
+    Ищет в команде "limit N" и "offset M".
+    Возвращает (limit, offset) или None, если значения некорректны.
+    """
+    lowered = [a.lower() for a in args]
+    result = {"limit": None, "offset": 0}
+    for keyword in result:
+        if keyword not in lowered:
             continue
+        pos = lowered.index(keyword)
+        if pos + 1 >= len(args) or not args[pos + 1].isdigit():
+            return None
+        result[keyword] = int(args[pos + 1])
+    return result["limit"], result["offset"]
+
+
+def _where(user_input: str, message: str, required: bool = False):
+    """Дерево условия where или None, если его нет; ошибка - CommandError."""
+    where_text = _where_text(user_input)
+    if where_text is None:
+        if required:
+            raise CommandError(message)
+        return None
+    where_clause = parse_where(where_text)
+    if not where_clause:
+        raise CommandError(message)
+    return where_clause
+
+
+# --- разбор команд ---
+# Каждая функция разбора получает слова команды (shlex) и исходную строку
+# и возвращает параметры для функции выполнения или бросает CommandError.
+
+def _parse_no_args(args, user_input):
+    if len(args) != 1:
+        raise CommandError(
+            f"Ошибка: команда {args[0].lower()} не принимает аргументов."
+        )
+    return ()
+
+
+def _parse_any(args, user_input):
+    return ()
+
+
+_PARTITION_RE = re.compile(
+    r"partition\s+by\s+(\w+)\s*\(\s*(\w+)\s*,\s*(\d+)\s*\)\s*$", re.IGNORECASE
+)
+
+
+def _parse_create_table(args, user_input):
+    if len(args) < 2:
+        raise CommandError(
+            "Ошибка: нужно указать имя таблицы."
+            "Пример: create_table users name:str age:int"
+        )
+    lowered = [a.lower() for a in args]
+    if "partition" not in lowered:
+        return args[1], args[2:]
+    match = _PARTITION_RE.search(user_input)
+    if not match:
+        raise CommandError(
+            "Ошибка: некорректный синтаксис. Примеры:\n"
+            "  create_table users name:str partition by range(ID, 10000)\n"
+            "  create_table users name:str partition by hash(name, 4)"
+        )
+    kind, column, size = match.groups()
+    return args[1], args[2:lowered.index("partition")], (
+        kind.lower(), column, int(size)
+    )
+
+
+def _table_arg(example: str) -> Callable:
+    def parse(args, user_input):
+        if len(args) != 2:
+            raise CommandError(f"Ошибка: нужно указать имя таблицы. Пример: {example}")
+        return (args[1],)
+    return parse
+
+
+def _parse_create_index(args, user_input):
+    if len(args) not in (3, 4):
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: create_index users age [hash|sorted]"
+        )
+    kind = args[3].lower() if len(args) == 4 else "hash"
+    return args[1], args[2], kind
+
+
+def _parse_alter_table(args, user_input):
+    usage = CommandError(
+        "Ошибка: некорректный синтаксис. Примеры:\n"
+        "  alter_table users add email:str default \"-\"\n"
+        "  alter_table users rename name full_name\n"
+        "  alter_table users drop age"
+    )
+    if len(args) < 4:
+        raise usage
+    table_name, op = args[1], args[2].lower()
+    rest = args[3:]
+    if rest[0].lower() == "column":
+        rest = rest[1:]
+    if op == "add" and rest and ":" in rest[0]:
+        column, col_type = rest[0].split(":", 1)
+        if len(rest) == 1:
+            return table_name, op, column, col_type
+        if len(rest) == 3 and rest[1].lower() == "default":
+            return table_name, op, column, col_type, None, rest[2]
+    elif op == "drop" and len(rest) == 1:
+        return table_name, op, rest[0]
+    elif op == "rename" and len(rest) == 2:
+        return table_name, op, rest[0], None, rest[1]
+    raise usage
+
+
+def _parse_convert_table(args, user_input):
+    if len(args) != 3:
+        raise CommandError(
+            "Ошибка: некорректный синтаксис. Пример: convert_table users binary"
+        )
+    return args[1], args[2].lower()
+
+
+def _parse_insert(args, user_input):
+    if len(args) < 4 or args[1].lower() != "into" or args[3].lower() != "values":
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: insert into users values (\"Sergei\", 28, true)"
+        )
+    split_point = user_input.lower().find("values")
+    values = _safe_split_values(user_input[split_point + len("values"):])
+    if values is None:
+        raise CommandError(
+            "Ошибка: значения должны быть в скобках."
+            "Пример: values (\"Sergei\", 28, true)"
+        )
+    return args[2], values
+
+
+def _parse_import(args, user_input):
+    batch_size = IMPORT_BATCH_SIZE
+    if len(args) == 5 and args[3] == "--batch" and args[4].isdigit():
+        batch_size = int(args[4])
+    elif len(args) != 3:
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: import users users.csv [--batch 1000]"
+        )
+    return args[1], args[2], max(batch_size, 1)
+
+
+_JOIN_ON_RE = re.compile(
+    r"\bon\s+(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)\s*$", re.IGNORECASE
+)
+
+
+def _parse_join(args, user_input) -> Tuple[str, str, str]:
+    """
+    "select from a join b on a.x = b.y" -> (b, x, y).
+    Столбцы в on можно указывать в любом порядке.
+    """
+    where_pos = find_keyword(user_input, "where")
+    head = user_input if where_pos < 0 else user_input[:where_pos]
+    for keyword in ("limit", "offset"):
+        pos = find_keyword(head, keyword)
+        head = head if pos < 0 else head[:pos]
+    match = _JOIN_ON_RE.search(head.rstrip())
+    left, right = args[2], args[4] if len(args) > 4 else None
+    if match and len(args) > 5 and args[5].lower() == "on":
+        table_a, column_a, table_b, column_b = match.groups()
+        if (table_a, table_b) == (left, right):
+            return right, column_a, column_b
+        if (table_a, table_b) == (right, left):
+            return right, column_b, column_a
+    raise CommandError(
+        "Ошибка: некорректный синтаксис."
+        "Пример: select from orders join users on orders.user_id = users.ID"
+    )
+
+
+def _parse_select(args, user_input):
+    if len(args) < 3 or args[1].lower() != "from":
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: select from users [where age = 28]"
+        )
+    join = None
+    if len(args) > 3 and args[3].lower() == "join":
+        join = _parse_join(args, user_input)
+    where_clause = _where(
+        user_input, "Ошибка: некорректное условие where. Пример: where age = 28"
+    )
+    page = _parse_limit_offset(args)
+    if page is None:
+        raise CommandError(
+            "Ошибка: некорректный limit или offset. Пример: limit 10 offset 20"
+        )
+    return (args[2], where_clause) + page + (join,)
+
+
+def _parse_explain(args, user_input):
+    if len(args) < 2 or args[1].lower() != "select":
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: explain select from users where age > 30"
+        )
+    return _parse_select(args[1:], user_input.split(maxsplit=1)[1])
+
+
+def _parse_aggregate(args, user_input):
+    func = args[0].lower()
+    column = None
+    if len(args) > 2 and args[2].lower() not in ("where", "group"):
+        column = args[2]
+    group_by, bad_group = _parse_group_by(args)
+    if len(args) < 2 or bad_group or (func != "count" and not column):
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: avg users age [where ...] [group by name]"
+        )
+    where_clause = _where(
+        user_input, "Ошибка: некорректное условие where. Пример: where age = 28"
+    )
+    return args[1], func, column, where_clause, group_by
+
+
+def _parse_export(args, user_input):
+    if len(args) not in (3, 4):
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: export users users.csv [csv|jsonl]"
+        )
+    return args[1], args[2], args[3] if len(args) == 4 else None
+
+
+def _parse_paging(args, user_input):
+    if len(args) != 2 or args[1].lower() not in ("on", "off"):
+        raise CommandError("Ошибка: некорректный синтаксис. Пример: paging on")
+    return (args[1].lower() == "on",)
+
+
+def _parse_stats(args, user_input):
+    words = [a.lower() for a in args[1:2]] + args[2:]
+    if not words:
+        return ()
+    if words == ["reset"]:
+        return ("reset",)
+    if words[0] == "export" and len(words) in (2, 3):
+        return "export", words[1], words[2].lower() if len(words) == 3 else None
+    raise CommandError(
+        "Ошибка: некорректный синтаксис. Пример: stats export metrics.prom [jsonl|prom]"
+    )
+
+
+def _parse_profile(args, user_input):
+    if len(args) not in (2, 3) or args[1].lower() not in ("on", "off") or (
+        len(args) == 3 and args[1].lower() == "on"
+    ):
+        raise CommandError(
+            "Ошибка: некорректный синтаксис. Пример: profile on, profile off [файл]"
+        )
+    return args[1].lower() == "on", args[2] if len(args) == 3 else None
+
+
+def _parse_update(args, user_input):
+    if (
+        len(args) < 6 or
+        args[2].lower() != "set" or
+        find_keyword(user_input, "where") < 0
+    ):
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: update users set age = 29 where name = \"Sergei\""
+        )
+    set_text = user_input[find_keyword(user_input, "set") + len("set"):
+                          find_keyword(user_input, "where")]
+    set_clause = parse_set(set_text)
+    where_clause = parse_where(_where_text(user_input) or "")
+    if not set_clause or not where_clause:
+        raise CommandError("Ошибка: некорректное условие set или where")
+    return args[1], set_clause, where_clause
+
+
+def _parse_delete(args, user_input):
+    if len(args) < 5 or args[1].lower() != "from" or args[3].lower() != "where":
+        raise CommandError(
+            "Ошибка: некорректный синтаксис."
+            "Пример: delete from users where ID = 1"
+        )
+    return args[2], _where(user_input, "Ошибка: некорректное условие where", True)
 
+
+# --- выполнение ---
+# Функции выполнения получают метаданные первым аргументом.
+
+def _without_metadata(func: Callable) -> Callable:
+    def runner(metadata, *params):
+        return func(*params)
+    return runner
+
+
+def _saving_metadata(func: Callable) -> Callable:
+    """Для DDL: изменённые метаданные сохраняются сразу."""
+    def runner(metadata, *params):
+        table_manager.save_metadata(META_FILE, func(metadata, *params))
+    return runner
+
+
+def _run_insert(metadata, table_name, values):
+    if len(values) == 1:
+        insert(metadata, table_name, values[0])
+    else:
+        insert_many(metadata, table_name, values)
+
+
+# Команда -> (разбор, выполнение).
+COMMANDS: Dict[str, Tuple[Callable, Optional[Callable]]] = {
+    "exit": (_parse_any, None),
+    "help": (_parse_any, _without_metadata(print_help)),
+    "begin": (_parse_no_args, _without_metadata(begin)),
+    "commit": (_parse_no_args, _without_metadata(commit)),
+    "rollback": (_parse_no_args, _without_metadata(rollback)),
+    "cache_stats": (_parse_any, _without_metadata(cache_stats)),
+    "lock_stats": (_parse_any, _without_metadata(lock_stats)),
+    "stats": (_parse_stats, _without_metadata(stats)),
+    "profile": (_parse_profile, _without_metadata(profile)),
+    "list_tables": (_parse_any, list_tables),
+    "create_table": (_parse_create_table, _saving_metadata(create_table)),
+    "drop_table": (_table_arg("drop_table users"), _saving_metadata(drop_table)),
+    "info": (_table_arg("info users"), info),
+    "create_index": (_parse_create_index, _saving_metadata(create_index)),
+    "compact": (_table_arg("compact users"), compact),
+    "convert_table": (_parse_convert_table, convert_table),
+    "alter_table": (_parse_alter_table, _saving_metadata(alter_table)),
+    "insert": (_parse_insert, _run_insert),
+    "import": (_parse_import, import_file),
+    "select": (_parse_select, select),
+    "explain": (_parse_explain, explain),
+    "analyze": (_table_arg("analyze users"), analyze),
+    "export": (_parse_export, export),
+    "paging": (_parse_paging, _without_metadata(set_paging)),
+    "update": (_parse_update, update),
+    "delete": (_parse_delete, delete),
+}
+COMMANDS.update({func: (_parse_aggregate, aggregate) for func in AGGREGATES})
+
+
+# --- кэш разбора ---
+# Команды одной формы (отличаются только литералами в кавычках и числами)
+# разбираются один раз: литералы заменяются метками \x01N\x01, разобранный
+# шаблон кэшируется вместе с функцией подстановки литералов в его параметры.
+# Если шаблон не разбирается (например, limit N требует числа),
+# форма запоминается как некэшируемая и команда разбирается как есть.
+
+_LITERAL_RE = re.compile(r"""("[^"]*"|'[^']*')|(?<![\w.\-])(-?\d+)(?![\w.])""")
+_SLOT_RE = re.compile("\x01(\\d+)\x01")
+_parse_cache: "OrderedDict[str, Optional[tuple]]" = OrderedDict()
+
+
+def _shape(line: str) -> Tuple[str, List[str]]:
+    """Шаблон команды и её литералы."""
+    if "\\" in line or "\x01" in line:
+        return line, []
+    literals: List[str] = []
+
+    def slot(match: re.Match) -> str:
+        marker = f"\x01{len(literals)}\x01"
+        quoted = match.group(1)
+        if quoted:
+            literals.append(quoted[1:-1])
+            return quoted[0] + marker + quoted[0]
+        literals.append(match.group(2))
+        return marker
+
+    return _LITERAL_RE.sub(slot, line), literals
+
+
+def _compile_bind(value) -> Optional[Callable[[List[str]], object]]:
+    """
+    Функция, подставляющая литералы вместо меток во вложенные параметры.
+    Строится один раз для шаблона: части без меток не обходятся при каждой
+    команде, а переиспользуются как есть. None - меток в значении нет.
+    """
+    if isinstance(value, str):
+        if "\x01" not in value:
+            return None
+        whole = _SLOT_RE.fullmatch(value)
+        if whole:
+            index = int(whole.group(1))
+            return lambda literals: literals[index]
+        return lambda literals: _SLOT_RE.sub(
+            lambda m: literals[int(m.group(1))], value
+        )
+    if isinstance(value, (tuple, list)):
+        parts = [_compile_bind(item) for item in value]
+        if not any(parts):
+            return None
+        kind, items = type(value), list(zip(value, parts))
+
+        def bind(literals: List[str]):
+            return kind(
+                item if part is None else part(literals) for item, part in items
+            )
+        return bind
+    return None
+
+
+def _parse(user_input: str) -> tuple:
+    try:
+        args = shlex.split(user_input)
+    except ValueError:
+        raise CommandError("Некорректное значение. Попробуйте снова.") from None
+    command = args[0].lower()
+    if command not in COMMANDS:
+        raise CommandError(f"Функции {command} нет. Попробуйте снова.")
+    parse, runner = COMMANDS[command]
+    return command, runner, parse(args, user_input)
+
+
+def prepare(user_input: str) -> tuple:
+    """
+    Разобранная команда (имя, функция выполнения, параметры) через кэш форм.
+    Синтаксическая ошибка - CommandError.
+    """
+    template, literals = _shape(user_input)
+    if template in _parse_cache:
+        _parse_cache.move_to_end(template)
+        statement = _parse_cache[template]
+        metrics.add(
+            "parse_cache_hits" if statement is not None else "parse_cache_misses"
+        )
+    else:
         try:
-            args = shlex.split(user_input)
-        except ValueError:
-            print("Некорректное значение. Попробуйте снова.")
-            continue
+            command, runner, params = _parse(template)
+            statement = command, runner, params, _compile_bind(params)
+        except CommandError:
+            statement = None
+        _parse_cache[template] = statement
+        if len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+        metrics.add("parse_cache_misses")
+    if statement is None:
+        return _parse(user_input)
+    command, runner, params, bind = statement
+    return command, runner, params if bind is None else bind(literals)
+
+
+def run():
+    print_help()
+    try:
+        _loop()
+    finally:
+        if table_manager.in_transaction:
+            rollback()
+        table_manager.close()
 
-        command = args[0].lower()
 
-        if command == "exit":
+def _loop():
+    while True:
+        end_command()
+        try:
+            user_input = input(">>>Введите команду: ").strip()
+        except EOFError:
+            break
+        if not execute(user_input):
             break
-        if command == "help":
-            print_help()
-            continue
 
-        if command == "list_tables":
-            list_tables(metadata)
-            continue
 
-        if command == "create_table":
-            if len(args) < 2:
-                print(
-                    "Ошибка: нужно указать имя таблицы."
-                    "Пример: create_table users name:str age:int"
-                )
-                continue
-            table_name = args[1]
-            columns = args[2:]
-            new_metadata = create_table(metadata, table_name, columns)
-            save_metadata(META_FILE, new_metadata)
-            continue
+def end_command() -> None:
+    """Сбрасывает изменения команды по политике пула таблиц."""
+    try:
+        table_manager.end_command()
+    except LockTimeout as exc:
+        # Изменения остались в памяти и будут записаны следующим сбросом.
+        print(f"Ошибка: не удалось записать изменения: {exc}")
 
-        if command == "drop_table":
-            if len(args) != 2:
-                print("Ошибка: нужно указать имя таблицы. Пример: drop_table users")
-                continue
-            table_name = args[1]
-            new_metadata = drop_table(metadata, table_name)
-            save_metadata(META_FILE, new_metadata)
-            continue
 
-        if command == "info":
-            if len(args) != 2:
-                print("Ошибка: нужно указать имя таблицы. Пример: info users")
-                continue
-            table_name = args[1]
-            info(metadata, table_name)
-            continue
+def execute(user_input: str) -> bool:
+    """
+    Разбирает и выполняет одну команду, печатая результат.
+    Возвращает False для команды exit.
+    """
+    user_input = user_input.strip()
+    if not user_input:
+        return True
+    try:
+        command, runner, params = prepare(user_input)
+    except CommandError as exc:
+        print(exc)
+        return True
+    if command == "exit":
+        return False
+    # Время команды - в метрики (stats); под profile on - ещё и в cProfile.
+    profiler = metrics.profiler
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        runner(table_manager.metadata(META_FILE), *params)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        metrics.observe(command, time.perf_counter() - started)
+    return True
 
-        if command == "insert":
-            if (
-                len(args) < 4 or
-                args[1].lower() != "into" or
-                args[3].lower() != "values"
-            ):
-                print(
-                    "Ошибка: некорректный синтаксис."
-                    "Пример: insert into users values (\"Sergei\", 28, true)"
-                    )
-                continue
-            table_name = args[2]
-            split_point = user_input.lower().find("values")
-            values_str = user_input[split_point + len("values") :]
-            values = _safe_split_values(values_str)
-            if values is None:
-                print(
-                    "Ошибка: значения должны быть в скобках."
-                    "Пример: values (\"Sergei\", 28, true)"
-                )
-                continue
-            insert(metadata, table_name, values)
-            continue
 
-        if command == "select":
-            if len(args) < 3 or args[1].lower() != "from":
-                print(
-                    "Ошибка: некорректный синтаксис."
-                    "Пример: select from users [where age = 28]"
-                )
-                continue
-            table_name = args[2]
-            if "where" in [a.lower() for a in args]:
-                where_index = next(
-                    i for i, a in enumerate(args) if a.lower() == "where"
-                )
-                where_clause_tokens = args[where_index + 1 : where_index + 4]
-                if len(where_clause_tokens) != 3:
-                    print("Ошибка: некорректное условие where. Пример: where age = 28")
-                    continue
-                where_clause = parse_where(where_clause_tokens)
-            else:
-                where_clause = None
-            select(metadata, table_name, where_clause)
-            continue
+# --- пакетный режим ---
 
-        if command == "update":
-            if (
-                len(args) < 6 or
-                args[2].lower() != "set" or
-                "where" not in [a.lower() for a in args]
-            ):
-                print(
-                    "Ошибка: некорректный синтаксис."
-                    "Пример: update users set age = 29 where name = \"Sergei\""
-                )
-                continue
-            table_name = args[1]
-            where_index = next(i for i, a in enumerate(args) if a.lower() == "where")
-            set_tokens = args[3:where_index]
-            where_tokens = args[where_index + 1 :]
-            if len(set_tokens) != 3 or len(where_tokens) != 3:
-                print("Ошибка: некорректное условие set или where")
-                continue
-            set_clause = parse_set(set_tokens)
-            where_clause = parse_where(where_tokens)
-            if not set_clause or not where_clause:
-                print("Ошибка: некорректное условие set или where")
-                continue
-            update(metadata, table_name, set_clause, where_clause)
-            continue
+# В пакетном режиме нет пользователя, который листал бы страницы.
+BATCH_UNSUPPORTED = {"paging"}
 
-        if command == "delete":
-            if len(args) < 5 or args[1].lower() != "from" or args[3].lower() != "where":
-                print(
-                    "Ошибка: некорректный синтаксис."
-                    "Пример: delete from users where ID = 1"
-                )
-                continue
-            table_name = args[2]
-            where_tokens = args[4:7]
-            if len(where_tokens) != 3:
-                print("Ошибка: некорректное условие where")
-                continue
-            where_clause = parse_where(where_tokens)
-            if not where_clause:
-                print("Ошибка: некорректное условие where")
+
+def run_batch(lines: Iterable[str]) -> None:
+    """
+    Выполняет команды из файла или stdin без справки и подтверждений.
+    Пустые строки и комментарии (-- или #) пропускаются, завершающая ";"
+    отбрасывается. В конце в stderr выводится общая пропускная способность
+    и статистика по видам команд.
+    """
+    set_assume_yes(True)
+    stats: Dict[str, List[float]] = {}
+    total = 0
+    started = time.perf_counter()
+    try:
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(("--", "#")):
                 continue
-            delete(metadata, table_name, where_clause)
-            continue
+            if line.endswith(";"):
+                line = line[:-1].rstrip()
+            command = line.split(maxsplit=1)[0].lower()
+            began = time.perf_counter()
+            if command in BATCH_UNSUPPORTED:
+                print(MSG["batch_unsupported"].format(command=command))
+                keep_going = True
+            else:
+                keep_going = execute(line)
+                end_command()
+            if not keep_going:
+                break
+            entry = stats.setdefault(command, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - began
+            total += 1
+    finally:
+        if table_manager.in_transaction:
+            rollback()
+        table_manager.close()
+    _print_batch_report(stats, total, time.perf_counter() - started)
+
 
-        print(f"Функции {command} нет. Попробуйте снова.")
+def _print_batch_report(stats: Dict[str, List[float]], total: int,
+                        elapsed: float) -> None:
+    elapsed = max(elapsed, 1e-9)
+    lines = [
+        f"Выполнено команд: {total} за {elapsed:.3f} с "
+        f"({total / elapsed:.0f} команд/с)",
+        f"Кэш разбора: попаданий {metrics.counters['parse_cache_hits']:.0f}, "
+        f"промахов {metrics.counters['parse_cache_misses']:.0f}",
+    ]
+    for command, (count, seconds) in sorted(
+        stats.items(), key=lambda item: -item[1][1]
+    ):
+        seconds = max(seconds, 1e-9)
+        lines.append(
+            f"  {command}: {count} шт., {seconds * 1000:.1f} мс, "
+            f"{seconds / count * 1e6:.0f} мкс/команда, {count / seconds:.0f} команд/с"
+        )
+    print("\n".join(lines), file=sys.stderr)
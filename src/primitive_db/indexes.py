@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List
+
+from src.primitive_db.constants import ID_FIELD
+from src.primitive_db.query import native_value
+
+
+class HashIndex:
+    """
+    Хеш-индекс по одному столбцу: значение -> строки с этим значением.
+    Ключом служит значение в родном типе столбца (native_value), а искомые
+    значения - литералы, приведённые к нему же (query.plan), как и при
+    сравнении в полном просмотре, поэтому поиск по индексу и без него
+    находит одни и те же строки.
+    """
+    kind = "hash"
+
+    def __init__(self, column: str, col_type: str):
+        self.column = column
+        self.col_type = col_type
+        self._buckets: Dict[object, Dict[int, dict]] = {}
+        self._keys: Dict[int, object] = {}
+
+    def build(self, rows: Iterable[dict]) -> "HashIndex":
+        for row in rows:
+            self.add(row)
+        return self
+
+    def key(self, row: dict):
+        return native_value(row.get(self.column), self.col_type)
+
+    def add(self, row: dict) -> None:
+        key = self.key(row)
+        row_id = row.get(ID_FIELD)
+        self._keys[row_id] = key
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+            self._new_key(key)
+        bucket[row_id] = row
+
+    def remove(self, row_id: int) -> None:
+        key = self._keys.pop(row_id, None)
+        if key is None:
+            return
+        bucket = self._buckets[key]
+        bucket.pop(row_id, None)
+        if not bucket:
+            del self._buckets[key]
+            self._drop_key(key)
+
+    def update(self, row: dict) -> None:
+        """Переносит строку в новую корзину, если значение столбца изменилось."""
+        row_id = row.get(ID_FIELD)
+        if row_id in self._keys and self._keys[row_id] == self.key(row):
+            self._buckets[self._keys[row_id]][row_id] = row
+            return
+        self.remove(row_id)
+        self.add(row)
+
+    def lookup(self, value) -> List[dict]:
+        """Строки, у которых значение столбца равно value, в порядке ID."""
+        bucket = self._buckets.get(value, {})
+        return [bucket[i] for i in sorted(bucket)]
+
+    def distinct(self) -> int:
+        return len(self._buckets)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _new_key(self, key) -> None:
+        pass
+
+    def _drop_key(self, key) -> None:
+        pass
+
+
+class SortedIndex(HashIndex):
+    """
+    Упорядоченный индекс: кроме корзин хранит отсортированный список ключей,
+    по которому бинарным поиском выбираются диапазоны значений.
+    Ключи сравниваются в родном типе (int - как числа), пустые - после всех.
+    """
+    kind = "sorted"
+
+    def __init__(self, column: str, col_type: str):
+        super().__init__(column, col_type)
+        self._order: List[tuple] = []
+
+    @staticmethod
+    def sort_key(key) -> tuple:
+        return (0, key) if key is not None else (1, None)
+
+    def range(self, low=None, high=None,
+              include_low: bool = True, include_high: bool = True) -> List[dict]:
+        """
+        Строки со значениями из [low, high] в порядке значений.
+        None - граница не задана; пустые значения в диапазон не входят.
+        """
+        start = 0
+        end = bisect_left(self._order, self.sort_key(None))
+        if low is not None:
+            bound = self.sort_key(low)
+            start = (bisect_left if include_low else bisect_right)(self._order, bound)
+        if high is not None:
+            bound = self.sort_key(high)
+            end = (bisect_right if include_high else bisect_left)(self._order, bound)
+        result = []
+        for _, key in self._order[start:end]:
+            bucket = self._buckets[key]
+            result.extend(bucket[i] for i in sorted(bucket))
+        return result
+
+    def _new_key(self, key) -> None:
+        insort(self._order, self.sort_key(key))
+
+    def _drop_key(self, key) -> None:
+        sort_key = self.sort_key(key)
+        pos = bisect_left(self._order, sort_key)
+        if pos < len(self._order) and self._order[pos] == sort_key:
+            del self._order[pos]
+
+
+INDEX_KINDS = {cls.kind: cls for cls in (HashIndex, SortedIndex)}
@@ -0,0 +1,108 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.primitive_db.query import conjuncts
+
+# Соединение двух таблиц: select from a join b on a.x = b.y [where ...].
+# Столбцы результата называются "<таблица>.<столбец>".
+
+
+def qualify(node, tables: Dict[str, Dict[str, str]]):
+    """
+    Заменяет имена столбцов в условии полными: "age" -> "users.age".
+    Имя без таблицы допустимо, если столбец есть только в одной из таблиц.
+    tables - таблица -> {столбец: тип}. Ошибка - ValueError.
+    """
+    kind = node[0]
+    if kind in ("and", "or"):
+        return (kind, qualify(node[1], tables), qualify(node[2], tables))
+    if kind == "not":
+        return ("not", qualify(node[1], tables))
+    return (kind, _qualified(node[1], tables)) + tuple(node[2:])
+
+
+def _qualified(column: str, tables: Dict[str, Dict[str, str]]) -> str:
+    if "." in column:
+        table, name = column.split(".", 1)
+        if name in tables.get(table, {}):
+            return column
+        raise ValueError(f'столбца "{column}" нет в соединяемых таблицах')
+    owners = [table for table, columns in tables.items() if column in columns]
+    if not owners:
+        raise ValueError(f'столбца "{column}" нет в соединяемых таблицах')
+    if len(owners) > 1:
+        raise ValueError(
+            f'столбец "{column}" есть в обеих таблицах, укажите {owners[0]}.{column}'
+        )
+    return f"{owners[0]}.{column}"
+
+
+def _tables(node) -> set:
+    kind = node[0]
+    if kind in ("and", "or"):
+        return _tables(node[1]) | _tables(node[2])
+    if kind == "not":
+        return _tables(node[1])
+    return {node[1].split(".", 1)[0]}
+
+
+def _unqualified(node):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return (kind, _unqualified(node[1]), _unqualified(node[2]))
+    if kind == "not":
+        return ("not", _unqualified(node[1]))
+    return (kind, node[1].split(".", 1)[1]) + tuple(node[2:])
+
+
+def _combine(nodes: List[tuple]):
+    result = None
+    for node in nodes:
+        result = node if result is None else ("and", result, node)
+    return result
+
+
+def split_where(
+    node, tables: Iterable[str]
+) -> Tuple[Dict[str, Optional[tuple]], Optional[tuple]]:
+    """
+    Делит условие (с полными именами) на части по таблицам: условия "and",
+    которые касаются одной таблицы, проверяются до соединения (для неё
+    работают поиск по ID и индексы), остальные - на соединённых строках.
+    Возвращает (таблица -> условие без имени таблицы или None, остаток).
+    """
+    own: Dict[str, List[tuple]] = {table: [] for table in tables}
+    rest = []
+    for conjunct in conjuncts(node) if node else []:
+        used = _tables(conjunct)
+        if len(used) == 1:
+            own[used.pop()].append(_unqualified(conjunct))
+        else:
+            rest.append(conjunct)
+    return {table: _combine(nodes) for table, nodes in own.items()}, _combine(rest)
+
+
+def build_hash(rows: Iterable[dict],
+               key: Callable[[dict], object]) -> Dict[object, List[dict]]:
+    """Хеш-таблица стороны построения: значение ключа -> строки."""
+    table: Dict[object, List[dict]] = {}
+    for row in rows:
+        value = key(row)
+        if value is not None:
+            table.setdefault(value, []).append(row)
+    return table
+
+
+def join_rows(probe: Iterable[dict], key: Callable[[dict], object],
+              lookup: Callable[[object], Iterable[dict]],
+              combine: Callable[[dict, dict], dict]) -> Iterator[dict]:
+    """
+    Соединённые строки по одной: для каждой строки probe - все строки
+    другой стороны с тем же значением ключа (lookup). Пустые значения
+    (None) ни с чем не соединяются.
+    """
+    for row in probe:
+        value = key(row)
+        if value is None:
+            continue
+        for match in lookup(value):
+            yield combine(row, match)
@@ -0,0 +1,157 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from src.primitive_db.constants import (
+    LOCK_DIR,
+    LOCK_POLL_SECONDS,
+    LOCK_TIMEOUT_SECONDS,
+)
+
+try:
+    import fcntl
+except ImportError:  # на платформах без fcntl блокировки не действуют
+    fcntl = None
+
+# Блокировка метаданных и WAL: берётся только на время сброса изменений.
+META_LOCK = "meta"
+
+
+def data_lock(table_name: str) -> str:
+    """Блокировка файлов таблицы: читатели - на время чтения, писатель - записи."""
+    return f"table.{table_name}"
+
+
+def writer_lock(table_name: str) -> str:
+    """Блокировка писателя таблицы: от первого изменения до их сброса."""
+    return f"write.{table_name}"
+
+
+class LockTimeout(TimeoutError):
+    """Блокировку не удалось получить за отведённое время."""
+
+
+class _Held:
+    __slots__ = ("file", "exclusive", "depth")
+
+    def __init__(self, file, exclusive: bool):
+        self.file = file
+        self.exclusive = exclusive
+        self.depth = 1
+
+
+class LockManager:
+    """
+    Блокировки чтения/записи между процессами на основе fcntl.flock.
+    Каждому ресурсу (таблице, метаданным) соответствует файл в LOCK_DIR:
+    разделяемая блокировка (LOCK_SH) - читатели, исключительная (LOCK_EX) -
+    писатель. Внутри процесса блокировки повторно входимы: вложенный
+    запрос того же ресурса только увеличивает счётчик.
+
+    Ожидание - опрос с LOCK_NB, поэтому оно ограничено LOCK_TIMEOUT_SECONDS:
+    вместо взаимной блокировки двух процессов один из них получит ошибку.
+    По каждому ресурсу считается число захватов, ожиданий и время ожидания.
+    """
+
+    def __init__(self, lock_dir: Path = LOCK_DIR,
+                 timeout: float = LOCK_TIMEOUT_SECONDS,
+                 poll: float = LOCK_POLL_SECONDS):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self.poll = poll
+        self._held: Dict[str, _Held] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def shared(self, name: str) -> Iterator[None]:
+        self.acquire(name, exclusive=False)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    @contextmanager
+    def exclusive(self, name: str) -> Iterator[None]:
+        self.acquire(name, exclusive=True)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def holds(self, name: str, exclusive: bool = False) -> bool:
+        held = self._held.get(name)
+        return held is not None and (held.exclusive or not exclusive)
+
+    def held(self) -> List[str]:
+        return list(self._held)
+
+    def acquire(self, name: str, exclusive: bool) -> None:
+        held = self._held.get(name)
+        if held is not None and (held.exclusive or not exclusive):
+            held.depth += 1
+            return
+        if fcntl is None:
+            self._held[name] = _Held(None, exclusive)
+            return
+
+        # Повышение shared -> exclusive переиспользует уже открытый файл.
+        file = held.file if held else self._open(name)
+        stats = self.stats.setdefault(name, {
+            "shared": 0, "exclusive": 0, "contended": 0,
+            "wait_ms": 0.0, "max_wait_ms": 0.0, "timeouts": 0,
+        })
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        start = time.monotonic()
+        waited = False
+        while True:
+            try:
+                fcntl.flock(file.fileno(), mode | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() - start >= self.timeout:
+                    stats["timeouts"] += 1
+                    if held is None:
+                        file.close()
+                    raise LockTimeout(
+                        f'ресурс "{name}" занят другим процессом '
+                        f"(ожидание {self.timeout:g} с)"
+                    ) from None
+                time.sleep(self.poll)
+
+        wait_ms = (time.monotonic() - start) * 1000
+        stats["exclusive" if exclusive else "shared"] += 1
+        if waited:
+            stats["contended"] += 1
+            stats["wait_ms"] += wait_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+        if held is None:
+            self._held[name] = _Held(file, exclusive)
+        else:
+            held.exclusive = True
+            held.depth += 1
+
+    def release(self, name: str) -> None:
+        held = self._held[name]
+        held.depth -= 1
+        if held.depth > 0:
+            return
+        del self._held[name]
+        if held.file is not None:
+            fcntl.flock(held.file.fileno(), fcntl.LOCK_UN)
+            held.file.close()
+
+    def release_all(self, names: Optional[List[str]] = None) -> None:
+        """Полностью снимает блокировки (все или перечисленные)."""
+        for name in list(self._held if names is None else names):
+            if name in self._held:
+                self._held[name].depth = 1
+                self.release(name)
+
+    def _open(self, name: str):
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        path = self.lock_dir / f"{Path(name).name}.lock"
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        return os.fdopen(fd, "r+b")
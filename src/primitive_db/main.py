@@ -1,9 +1,173 @@
 #!/usr/bin/env python3
-import src.primitive_db.constants  # noqa: F401
-from src.primitive_db.engine import run
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
 
+from src.primitive_db.constants import (
+    META_FILE,
+    MSG,
+    PIPELINE_WINDOW,
+    SERVER_HOST,
+    SERVER_PORT,
+)
+from src.primitive_db.engine import execute, prepare, run, run_batch
+from src.primitive_db.tables import table_manager
 
-def main():
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="project", description="Примитивная база данных."
+    )
+    parser.add_argument("--bench-startup", action="store_true",
+                        help="замерить время запуска и накладные расходы команды")
+    modes = parser.add_subparsers(dest="mode")
+
+    batch = modes.add_parser(
+        "exec", help="выполнить команды из файла без подсказок и подтверждений"
+    )
+    batch.add_argument("file", nargs="?", default="-",
+                       help="файл с командами (- или без аргумента - stdin)")
+
+    serve = modes.add_parser("serve", help="запустить сервер базы данных")
+    serve.add_argument("--host", default=SERVER_HOST)
+    serve.add_argument("--port", type=int, default=SERVER_PORT)
+    serve.add_argument("--unix", metavar="PATH", help="слушать Unix-сокет")
+
+    load = modes.add_parser("load", help="нагрузочный тест запущенного сервера")
+    load.add_argument("--host", default=SERVER_HOST)
+    load.add_argument("--port", type=int, default=SERVER_PORT)
+    load.add_argument("--unix", metavar="PATH", help="подключиться к Unix-сокету")
+    load.add_argument("--clients", type=int, default=4)
+    load.add_argument("--requests", type=int, default=1000,
+                      help="число запросов на клиента")
+    load.add_argument("--pipeline", type=int, default=PIPELINE_WINDOW,
+                      help="сколько запросов отправлять, не дожидаясь ответов")
+    load.add_argument("--command", default="list_tables",
+                      help="команда; {i} - номер запроса, {client} - номер клиента")
+    return parser.parse_args(argv)
+
+
+# --- замер запуска ---
+
+# Модули, которые загружаются только при первом использовании.
+LAZY_MODULES = ("prettytable", "numpy", "multiprocessing", "cProfile")
+# Команды для замера разбора (не выполняются).
+BENCH_COMMANDS = (
+    "select from users where ID = 1",
+    'insert into users values ("Ann", 28, true)',
+    'update users set age = age + 1 where name = "Ann"',
+    "count users where age > 30 group by active",
+)
+BENCH_STARTUP_RUNS = 5
+BENCH_REPEAT = 1000
+
+
+def _median(values: list) -> float:
+    return sorted(values)[len(values) // 2]
+
+
+def _bench_startup() -> None:
+    """
+    Время запуска и накладные расходы одной команды.
+    Запуск меряется в отдельных процессах (интерпретатор и импорт модулей
+    базы), накладные расходы - в этом: загрузка метаданных, разбор команды
+    без кэша и из кэша, полный цикл команды list_tables. Данные не меняются.
+    """
+    root = Path(__file__).resolve().parents[2]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(root), os.environ.get("PYTHONPATH")])
+    )
+    probe = (
+        "import sys, time; started = time.perf_counter(); "
+        "import src.primitive_db.main; "
+        "print(time.perf_counter() - started, *(m for m in "
+        f"{LAZY_MODULES!r} if m in sys.modules))"
+    )
+    process, imports = [], []
+    for _ in range(BENCH_STARTUP_RUNS):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", probe], env=env, check=True,
+                                capture_output=True, text=True).stdout.split()
+        process.append(time.perf_counter() - started)
+        imports.append(float(output[0]))
+    loaded = output[1:]
+
+    started = time.perf_counter()
+    table_manager.metadata(META_FILE)
+    meta_load = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(BENCH_REPEAT):
+        table_manager.metadata(META_FILE)
+    meta_cached = (time.perf_counter() - started) / BENCH_REPEAT
+
+    misses = []
+    for command in BENCH_COMMANDS:
+        started = time.perf_counter()
+        prepare(command)
+        misses.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    for _ in range(BENCH_REPEAT):
+        for command in BENCH_COMMANDS:
+            prepare(command)
+    hit = (time.perf_counter() - started) / BENCH_REPEAT / len(BENCH_COMMANDS)
+
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for _ in range(BENCH_REPEAT):
+            execute("list_tables")
+        command = (time.perf_counter() - started) / BENCH_REPEAT
+
+    print(
+        f"Запуск (медиана из {BENCH_STARTUP_RUNS}): процесс "
+        f"{_median(process) * 1000:.1f} мс, "
+        f"импорт модулей базы {_median(imports) * 1000:.1f} мс\n"
+        f"Загружены при запуске: {', '.join(loaded) or 'нет'} "
+        f"(отложенные: {', '.join(LAZY_MODULES)})\n"
+        f"Метаданные: загрузка {meta_load * 1000:.2f} мс, "
+        f"из кэша {meta_cached * 1e6:.1f} мкс\n"
+        f"Разбор команды: без кэша {_median(misses) * 1e6:.0f} мкс, "
+        f"из кэша {hit * 1e6:.1f} мкс\n"
+        f"Команда list_tables целиком: {command * 1e6:.0f} мкс"
+    )
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.bench_startup:
+        _bench_startup()
+        return
+    if args.mode == "load":
+        from src.primitive_db.client import load_test
+
+        load_test(args.command, max(args.clients, 1), max(args.requests, 1),
+                  max(args.pipeline, 1), args.host, args.port, args.unix)
+        return
+
+    recovered = table_manager.recover(META_FILE)
+    if recovered:
+        print(MSG["wal_recovered"].format(count=recovered))
+    if args.mode == "serve":
+        from src.primitive_db.server import serve
+
+        serve(args.host, args.port, args.unix)
+        return
+    if args.mode == "exec":
+        if args.file == "-":
+            run_batch(sys.stdin)
+        else:
+            with open(args.file, encoding="utf-8") as file:
+                run_batch(file)
+        return
+    # Команды, переданные через конвейер, выполняются пакетно.
+    if not sys.stdin.isatty():
+        run_batch(sys.stdin)
+        return
     run()
 
 
@@ -0,0 +1,167 @@
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, List, Optional
+
+from src.primitive_db.constants import METRICS_SAMPLES, PROFILE_TOP
+
+if TYPE_CHECKING:
+    import cProfile
+
+# Счётчик -> подпись в выводе stats.
+COUNTERS = {
+    "rows_scanned": "Просмотрено строк",
+    "rows_returned": "Подошло строк",
+    "storage_bytes_read": "Прочитано байт из файлов таблиц",
+    "storage_bytes_written": "Записано байт в файлы таблиц",
+    "wal_bytes_written": "Записано байт в WAL",
+    "json_decode_seconds": "Разбор JSON, с",
+    "json_encode_seconds": "Сериализация JSON, с",
+    "parse_cache_hits": "Кэш разбора: попаданий",
+    "parse_cache_misses": "Кэш разбора: промахов",
+}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Latency:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, size: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def quantile(self, share: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+class Metrics:
+    """
+    Метрики процесса: время выполнения по командам и счётчики
+    (строки, байты хранилища, время JSON, кэш разбора).
+
+    Квантили задержки считаются по последним METRICS_SAMPLES замерам
+    каждой команды, количество, сумма и максимум - по всем.
+    Замеры не печатаются во время работы, их показывает команда stats
+    и выгружают to_jsonl/to_prometheus.
+    """
+
+    def __init__(self, samples: int = METRICS_SAMPLES):
+        self.samples = samples
+        self.reset()
+        self.profiler: Optional["cProfile.Profile"] = None
+
+    def reset(self) -> None:
+        self.latency: Dict[str, _Latency] = {}
+        self.counters: Dict[str, float] = dict.fromkeys(COUNTERS, 0)
+        self.started = time.time()
+
+    def observe(self, command: str, seconds: float) -> None:
+        latency = self.latency.get(command)
+        if latency is None:
+            latency = self.latency[command] = _Latency(self.samples)
+        latency.add(seconds)
+
+    def add(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Добавляет длительность блока (в секундах) к счётчику name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def commands(self) -> List[dict]:
+        """Задержки по командам (в мс), самые затратные первыми."""
+        result = []
+        for command, latency in self.latency.items():
+            entry = {"command": command, "count": latency.count,
+                     "total_ms": latency.total * 1000, "max_ms": latency.max * 1000}
+            for share in QUANTILES:
+                entry[f"p{int(share * 100)}_ms"] = latency.quantile(share) * 1000
+            result.append(entry)
+        return sorted(result, key=lambda entry: -entry["total_ms"])
+
+    # --- выгрузка ---
+
+    def to_jsonl(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """Одна строка JSON со снимком всех метрик (файл можно дописывать)."""
+        record = {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "commands": self.commands(),
+            "counters": {**self.counters, **(extra or {})},
+        }
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def to_prometheus(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """Текстовый формат Prometheus: summary по командам и счётчики."""
+        lines = [
+            "# HELP primitive_db_command_seconds Время выполнения команд.",
+            "# TYPE primitive_db_command_seconds summary",
+        ]
+        for command, latency in self.latency.items():
+            label = f'command="{command}"'
+            for share in QUANTILES:
+                lines.append(
+                    f'primitive_db_command_seconds{{{label},quantile="{share}"}} '
+                    f"{latency.quantile(share):.6f}"
+                )
+            lines.append(
+                f"primitive_db_command_seconds_sum{{{label}}} {latency.total:.6f}"
+            )
+            lines.append(
+                f"primitive_db_command_seconds_count{{{label}}} {latency.count}"
+            )
+        for name, value in {**self.counters, **(extra or {})}.items():
+            lines.append(f"# TYPE primitive_db_{name} counter")
+            lines.append(f"primitive_db_{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    # --- профилирование ---
+
+    def profile_start(self) -> None:
+        if self.profiler is None:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+
+    def profile_stop(self, filepath: Optional[str] = None) -> str:
+        """
+        Останавливает профилирование и возвращает PROFILE_TOP самых
+        затратных функций (по суммарному времени с вложенными вызовами).
+        filepath - сохранить полный профиль для pstats/snakeviz.
+        """
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return ""
+        # Построение отчёта (и загрузка pstats) в профиль не попадает.
+        profiler.disable()
+        import io
+        import pstats
+
+        if filepath:
+            profiler.dump_stats(filepath)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(
+            PROFILE_TOP
+        )
+        return out.getvalue()
+
+
+metrics = Metrics()
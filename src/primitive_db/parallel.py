@@ -0,0 +1,100 @@
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from src.primitive_db.constants import (
+    PARALLEL_SCAN_CHUNK_ROWS,
+    PARALLEL_SCAN_EXECUTOR,
+    PARALLEL_SCAN_MIN_ROWS,
+    PARALLEL_SCAN_WORKERS,
+)
+from src.primitive_db.query import compile_where
+from src.primitive_db.schema import SchemaChanges
+from src.primitive_db.storage import BACKENDS
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+# Пул и модули concurrent.futures/multiprocessing загружаются только
+# при первом параллельном просмотре.
+_pool: Dict[str, Optional["Executor"]] = {"executor": None}
+
+
+def _scan_chunk(path: str, offsets: array, layouts: list, where,
+                col_types: dict, changes: Optional[SchemaChanges]) -> List[dict]:
+    """Строки диапазона, подходящие под условие. Выполняется в рабочем процессе."""
+    predicate = compile_where(where, col_types)
+    rows = BACKENDS["binary"].read_at(Path(path), offsets, layouts)
+    if changes is not None:
+        rows = map(changes.upgrade, rows)
+    return [row for row in rows if predicate(row)]
+
+
+def _executor() -> "Executor":
+    """
+    Пул создаётся при первом параллельном просмотре и живёт до выхода.
+    Процессы запускаются через spawn: fork скопировал бы в них
+    открытые файлы блокировок и потоки сервера.
+    Без поддержки процессов (нет sem_open и т.п.) используются потоки.
+    """
+    if _pool["executor"] is None:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        from multiprocessing import get_context
+
+        executor: Optional["Executor"] = None
+        if PARALLEL_SCAN_EXECUTOR == "process":
+            try:
+                executor = ProcessPoolExecutor(
+                    PARALLEL_SCAN_WORKERS, mp_context=get_context("spawn")
+                )
+            except (ImportError, NotImplementedError, OSError):
+                executor = None
+        _pool["executor"] = executor or ThreadPoolExecutor(PARALLEL_SCAN_WORKERS)
+    return _pool["executor"]
+
+
+def shutdown() -> None:
+    if _pool["executor"] is not None:
+        _pool["executor"].shutdown(cancel_futures=True)
+        _pool["executor"] = None
+
+
+def _chunks(offsets: List[int]) -> Iterator[array]:
+    size = min(PARALLEL_SCAN_CHUNK_ROWS,
+               -(-len(offsets) // max(PARALLEL_SCAN_WORKERS, 1)))
+    for start in range(0, len(offsets), size):
+        yield array("q", offsets[start:start + size])
+
+
+def scan(path: Path, offsets: List[int], layouts: list, where, col_types: dict,
+         changes: Optional[SchemaChanges] = None) -> Iterator[dict]:
+    """
+    Строки двоичной таблицы, подходящие под условие, в порядке ID.
+    offsets и layouts - из BinaryStorage.offsets, changes - несброшенные
+    изменения схемы (alter_table). offsets делятся на диапазоны, каждый
+    разбирается и фильтруется отдельным рабочим; в главный процесс
+    возвращаются только подходящие строки. Диапазоны отправляются
+    окном в два раза больше числа рабочих, а результаты выдаются
+    по порядку диапазонов, поэтому select с limit не ждёт всей таблицы.
+    """
+    if len(offsets) < PARALLEL_SCAN_MIN_ROWS or PARALLEL_SCAN_WORKERS <= 1:
+        yield from _scan_chunk(str(path), offsets, layouts, where, col_types, changes)
+        return
+
+    executor = _executor()
+    chunks = _chunks(offsets)
+    window = deque()
+    try:
+        for chunk in chunks:
+            window.append(
+                executor.submit(_scan_chunk, str(path), chunk, layouts, where,
+                                col_types, changes)
+            )
+            if len(window) >= 2 * PARALLEL_SCAN_WORKERS:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
+    finally:
+        for future in window:
+            future.cancel()
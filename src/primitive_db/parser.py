@@ -1,25 +1,225 @@
-from typing import Optional, Sequence, Tuple
+import re
+from typing import List, Optional, Tuple
 
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<str>"[^"]*"|'[^']*')
+      | (?P<op><=|>=|!=|<>|=|<|>|\(|\)|,)
+      | (?P<word>[^\s=<>!(),"']+)
+    )""",
+    re.VERBOSE,
+)
 
-def _parse_binary(tokens: Sequence[str]) -> Optional[Tuple[str, str]]:
+COMPARISONS = {"=", "!=", "<", "<=", ">", ">="}
+# Слова, на которых условие WHERE заканчивается (дальше limit/offset/group by).
+_STOP_WORDS = {"limit", "offset", "group"}
+# Операторы выражений в SET: "age = age + 1".
+ARITHMETIC = ("+", "-", "*")
+# "age+1" без пробелов - одно слово для tokenize.
+_ARITHMETIC_RE = re.compile(r"^([A-Za-z_]\w*)([+*-])(\S+)$")
+
+
+def tokenize(text: str) -> Optional[List[Tuple[str, str, int]]]:
     """
-    Общий парсер для "<column> = <value>".
-    Возвращает (column, value) или None при ошибке.
+    Разбивает текст на лексемы (вид, значение, позиция).
+    Вид: "str" - строка в кавычках (без кавычек), "op" - оператор или скобка,
+    "word" - имя столбца, ключевое слово или значение без кавычек.
+    Возвращает None, если встретился непарный символ.
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            return None
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "str":
+            value = value[1:-1]
+        elif value == "<>":
+            value = "!="
+        tokens.append((kind, value, match.start(kind)))
+        pos = match.end()
+    return tokens
+
+
+def find_keyword(text: str, keyword: str) -> int:
+    """Позиция ключевого слова вне кавычек или -1."""
+    for kind, value, pos in tokenize(text) or []:
+        if kind == "word" and value.lower() == keyword:
+            return pos
+    return -1
+
+
+class _ExpressionParser:
     """
-    if len(tokens) != 3:
+    Рекурсивный спуск для условий WHERE:
+
+        expr      := and_expr (OR and_expr)*
+        and_expr  := not_expr (AND not_expr)*
+        not_expr  := NOT not_expr | "(" expr ")" | condition
+        condition := column [NOT] (op value | IN (value, ...)
+                     | BETWEEN value AND value | LIKE value)
+
+    Результат - дерево из кортежей:
+        ("cmp", column, op, value), ("in", column, [values]),
+        ("between", column, low, high), ("like", column, pattern),
+        ("and", left, right), ("or", left, right), ("not", node).
+    Значения остаются строками: типы приводятся при компиляции условия.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self):
+        node = self._or()
+        if not self._at_end():
+            raise ValueError("лишние символы в условии")
+        return node
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
         return None
-    col, op, val = tokens
-    if op != "=":
+
+    def _at_end(self) -> bool:
+        token = self._peek()
+        return token is None or (
+            token[0] == "word" and token[1].lower() in _STOP_WORDS
+        )
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("неожиданный конец условия")
+        self.pos += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token and token[0] == "word" and token[1].lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_op(self, op: str) -> None:
+        kind, value, _ = self._next()
+        if kind != "op" or value != op:
+            raise ValueError(f'ожидалось "{op}"')
+
+    def _value(self) -> str:
+        kind, value, _ = self._next()
+        if kind == "op":
+            raise ValueError(f'ожидалось значение, а не "{value}"')
+        return value
+
+    def _or(self):
+        node = self._and()
+        while self._keyword("or"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._keyword("and"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._keyword("not"):
+            return ("not", self._not())
+        token = self._peek()
+        if token and token[0] == "op" and token[1] == "(":
+            self.pos += 1
+            node = self._or()
+            self._expect_op(")")
+            return node
+        return self._condition()
+
+    def _condition(self):
+        kind, column, _ = self._next()
+        if kind != "word":
+            raise ValueError("ожидалось имя столбца")
+        negate = self._keyword("not")
+        if self._keyword("in"):
+            self._expect_op("(")
+            values = [self._value()]
+            while self._peek() and self._peek()[:2] == ("op", ","):
+                self.pos += 1
+                values.append(self._value())
+            self._expect_op(")")
+            node = ("in", column, values)
+        elif self._keyword("between"):
+            low = self._value()
+            if not self._keyword("and"):
+                raise ValueError('ожидалось "and" в between')
+            node = ("between", column, low, self._value())
+        elif self._keyword("like"):
+            node = ("like", column, self._value())
+        else:
+            if negate:
+                raise ValueError('после "not" ожидалось in, between или like')
+            kind, op, _ = self._next()
+            if kind != "op" or op not in COMPARISONS:
+                raise ValueError("ожидался оператор сравнения")
+            return ("cmp", column, op, self._value())
+        return ("not", node) if negate else node
+
+
+def parse_where(text: str):
+    """
+    Парсер WHERE. Принимает текст условия (после слова where),
+    возвращает дерево условия или None при синтаксической ошибке.
+    Разбор останавливается на limit/offset/group.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    try:
+        return _ExpressionParser(tokens).parse()
+    except ValueError:
         return None
-    val = val.strip('"').strip("'")
-    return col, val
 
 
-def parse_where(tokens: Sequence[str]) -> Optional[Tuple[str, str]]:
-    """Парсер WHERE."""
-    return _parse_binary(tokens)
+def _set_value(tokens: List[Tuple[str, str, int]]) -> Optional[tuple]:
+    """Правая часть присваивания SET или None при ошибке."""
+    if len(tokens) == 1 and tokens[0][0] in ("word", "str"):
+        return ("value", tokens[0][1])
+    if (
+        len(tokens) == 3 and tokens[0][0] == "word" and tokens[2][0] == "word"
+        and tokens[1][1] in ARITHMETIC
+    ):
+        return ("arith", tokens[0][1], tokens[1][1], tokens[2][1])
+    return None
 
 
-def parse_set(tokens: Sequence[str]) -> Optional[Tuple[str, str]]:
-    """Парсер SET."""
-    return _parse_binary(tokens)
\ No newline at end of file
+def parse_set(text: str) -> Optional[List[Tuple[str, tuple]]]:
+    """
+    Парсер SET: "<столбец> = <значение>[, <столбец> = <значение> ...]".
+    Значение - литерал или выражение "<столбец> +|-|* <число>".
+    Возвращает [(столбец, ("value", литерал)), (столбец, ("arith", столбец,
+    оператор, число)), ...] или None при ошибке. Типы приводятся при выполнении.
+    """
+    tokens = []
+    for kind, value, pos in tokenize(text) or []:
+        match = _ARITHMETIC_RE.match(value) if kind == "word" else None
+        if match:
+            tokens += [("word", part, pos) for part in match.groups()]
+        else:
+            tokens.append((kind, value, pos))
+    assignments = []
+    part: List[Tuple[str, str, int]] = []
+    for token in tokens + [("op", ",", len(text))]:
+        if token[:2] != ("op", ","):
+            part.append(token)
+            continue
+        if len(part) < 3 or part[0][0] != "word" or part[1][:2] != ("op", "="):
+            return None
+        value = _set_value(part[2:])
+        if value is None:
+            return None
+        assignments.append((part[0][1], value))
+        part = []
+    return assignments
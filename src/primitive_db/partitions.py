@@ -0,0 +1,158 @@
+import zlib
+from typing import Iterable, List, Optional, Set, Tuple
+
+from src.primitive_db.constants import ID_FIELD
+from src.primitive_db.query import coerce_literal, native_value
+
+# Сегмент таблицы хранится как отдельная таблица с именем "<таблица>@<номер>".
+SEPARATOR = "@"
+PARTITION_KINDS = ("range", "hash")
+
+
+def segment_name(table_name: str, number: int) -> str:
+    return f"{table_name}{SEPARATOR}{number}"
+
+
+def base_table(name: str) -> str:
+    """Таблица, которой принадлежит сегмент (для несекционированной - она сама)."""
+    return name.split(SEPARATOR, 1)[0]
+
+
+def partition_spec(kind: str, column: str, size: int,
+                   columns: List[Tuple[str, str]]) -> dict:
+    """
+    Карта секций для metadata[таблица]["partition"]:
+        {"kind": "range", "column": "ID", "size": 1000, "segments": [0, 3]}
+        {"kind": "hash", "column": "name", "size": 4, "segments": [0, 1, 2, 3]}
+    range(ID, N) - сегмент номер ID // N, сегменты появляются по мере роста ID;
+    hash(столбец, K) - K сегментов, номер - хеш значения по модулю K.
+    Ошибка - ValueError с текстом для пользователя.
+    """
+    if kind not in PARTITION_KINDS:
+        raise ValueError(f"секционирование {kind} не поддерживается (range, hash)")
+    if size < 1:
+        raise ValueError("число строк или сегментов должно быть больше нуля")
+    if kind == "range" and column != ID_FIELD:
+        raise ValueError(f"секционирование range возможно только по {ID_FIELD}")
+    if column not in dict(columns):
+        raise ValueError(f'столбца "{column}" нет в таблице')
+    segments = [0] if kind == "range" else list(range(size))
+    return {"kind": kind, "column": column, "size": size, "segments": segments}
+
+
+def _hash(value) -> int:
+    # Встроенный hash() строк меняется от запуска к запуску, crc32 - нет.
+    if value is None:
+        return 0
+    if isinstance(value, (bool, int)):
+        return int(value)
+    return zlib.crc32(str(value).encode("utf-8"))
+
+
+class Partitioning:
+    """
+    Раскладка строк секционированной таблицы по сегментам.
+    Каждый сегмент - отдельный файл в формате таблицы, поэтому запись
+    затрагивает только сегменты изменённых строк, а условие по ключу
+    секционирования (prune) позволяет не читать остальные.
+    """
+
+    def __init__(self, table_name: str, spec: dict, col_type: str):
+        self.table_name = table_name
+        self.spec = spec
+        self.kind: str = spec["kind"]
+        self.column: str = spec["column"]
+        self.size: int = spec["size"]
+        self.col_type = col_type
+
+    @property
+    def numbers(self) -> List[int]:
+        return self.spec["segments"]
+
+    @property
+    def movable(self) -> bool:
+        """Может ли строка при update перейти в другой сегмент."""
+        return self.column != ID_FIELD
+
+    def describe(self) -> str:
+        return f"{self.kind}({self.column}, {self.size})"
+
+    def segments(self, numbers: Optional[Iterable[int]] = None) -> List[str]:
+        """Имена сегментов (по умолчанию - всех существующих) по порядку."""
+        numbers = self.numbers if numbers is None else sorted(numbers)
+        return [segment_name(self.table_name, n) for n in numbers]
+
+    def number(self, value) -> int:
+        """Номер сегмента для значения ключа."""
+        value = native_value(value, self.col_type)
+        if self.kind == "range":
+            return (value or 0) // self.size
+        return _hash(value) % self.size
+
+    def of_row(self, row: dict) -> int:
+        return self.number(row.get(self.column))
+
+    def register(self, numbers: Iterable[int]) -> List[int]:
+        """Добавляет в карту новые сегменты range и возвращает их номера."""
+        new = sorted(set(numbers) - set(self.numbers))
+        if new:
+            self.spec["segments"] = sorted(self.numbers + new)
+        return new
+
+    # --- отсечение сегментов ---
+
+    def prune(self, where) -> List[str]:
+        """Сегменты, в которых могут быть строки под условием where."""
+        numbers = self._prune(where) if where else None
+        if numbers is None:
+            return self.segments()
+        return self.segments(numbers & set(self.numbers))
+
+    def _prune(self, node) -> Optional[Set[int]]:
+        """Номера подходящих сегментов или None, если условие их не ограничивает."""
+        kind = node[0]
+        if kind in ("and", "or"):
+            left, right = self._prune(node[1]), self._prune(node[2])
+            if kind == "or":
+                return None if left is None or right is None else left | right
+            if left is None or right is None:
+                return right if left is None else left
+            return left & right
+        if kind == "not" or node[1] != self.column:
+            return None
+        try:
+            return self._prune_condition(node)
+        except (TypeError, ValueError):
+            # Некорректный литерал: ошибку покажет компиляция условия.
+            return None
+
+    def _literal(self, literal: str) -> int:
+        """Номер сегмента для литерала условия."""
+        return self.number(coerce_literal(self.column, literal, self.col_type))
+
+    def _prune_condition(self, node) -> Optional[Set[int]]:
+        kind = node[0]
+        if kind == "in":
+            return {self._literal(v) for v in node[2]}
+        if kind == "cmp" and node[2] == "=":
+            return {self._literal(node[3])}
+        if self.kind != "range":
+            return None
+        if kind == "between":
+            low, high = self._literal(node[2]), self._literal(node[3])
+            return {n for n in self.numbers if low <= n <= high}
+        if kind == "cmp" and node[2] in ("<", "<="):
+            bound = self._literal(node[3])
+            return {n for n in self.numbers if n <= bound}
+        if kind == "cmp" and node[2] in (">", ">="):
+            bound = self._literal(node[3])
+            return {n for n in self.numbers if n >= bound}
+        return None
+
+
+def partitioning(table_name: str, table_meta: dict) -> Optional[Partitioning]:
+    """Раскладка по сегментам или None, если таблица не секционирована."""
+    spec = table_meta.get("partition")
+    if spec is None:
+        return None
+    return Partitioning(table_name, spec, dict(table_meta["columns"])[spec["column"]])
@@ -0,0 +1,315 @@
+import operator
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from src.primitive_db.constants import ID_FIELD
+
+_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_ARITHMETIC = {"+": operator.add, "-": operator.sub, "*": operator.mul}
+
+
+def convert_value(value: str, type_name: str):
+    """
+    Приводит текстовое значение к типу столбца (int, str, bool).
+    Общий для значений insert и литералов условий; ошибка - ValueError.
+    """
+    if type_name == "int":
+        return int(value)
+    if type_name == "str":
+        return value
+    if type_name == "bool":
+        val = value.lower()
+        if val in ("true", "1"):
+            return True
+        if val in ("false", "0"):
+            return False
+        raise ValueError(f"значение {value} не является bool")
+    raise ValueError(f"неподдерживаемый тип {type_name}")
+
+
+def coerce_literal(column: str, value: str, col_type: str):
+    """Приводит литерал условия к типу столбца с понятным сообщением об ошибке."""
+    try:
+        return convert_value(value, col_type)
+    except ValueError:
+        raise ValueError(
+            f'значение "{value}" не подходит для столбца {column}:{col_type}'
+        ) from None
+
+
+def native_value(value, col_type: str):
+    """
+    Значение столбца в родном типе. Строки в нетекстовых столбцах
+    (остались от старых версий update) приводятся к типу столбца,
+    непреобразуемые значения превращаются в None.
+    """
+    if isinstance(value, str) and col_type != "str":
+        try:
+            return convert_value(value, col_type)
+        except ValueError:
+            return None
+    return value
+
+
+def _getter(column: str, col_type: str) -> Callable[[dict], object]:
+    """Достаёт значение столбца из строки в родном типе."""
+    if col_type == "str":
+        return lambda row: row.get(column)
+    return lambda row: native_value(row.get(column), col_type)
+
+
+def _like_regex(pattern: str) -> re.Pattern:
+    parts = []
+    for ch in pattern:
+        if ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def compile_value_test(node, col_type: str) -> Callable[[object], bool]:
+    """
+    Проверка для одного условия над столбцом ("cmp", "in", "between", "like"):
+    функция значение -> bool. Используется и для строк, и для колонок.
+    like допустим только для str-столбцов, иначе ValueError.
+    """
+    kind, column = node[0], node[1]
+    if kind == "in":
+        values = {coerce_literal(column, v, col_type) for v in node[2]}
+        return lambda value: value in values
+    if kind == "like":
+        if col_type != "str":
+            raise ValueError(
+                f"like применим только к столбцам str, а не к {column}:{col_type}"
+            )
+        regex = _like_regex(node[2])
+        return lambda value: (
+            value is not None and regex.fullmatch(str(value)) is not None
+        )
+
+    if kind == "between":
+        low = coerce_literal(column, node[2], col_type)
+        high = coerce_literal(column, node[3], col_type)
+        def between(value):
+            try:
+                return low <= value <= high
+            except TypeError:
+                return False
+        return between
+
+    compare = _OPERATORS[node[2]]
+    literal = coerce_literal(column, node[3], col_type)
+    def cmp(value):
+        try:
+            return compare(value, literal)
+        except TypeError:
+            return False
+    return cmp
+
+
+def compile_where(node, columns: Dict[str, str]) -> Callable[[dict], bool]:
+    """
+    Компилирует дерево условия в функцию row -> bool один раз на запрос.
+    Литералы приводятся к типам столбцов заранее, при проверке строк
+    сравниваются родные значения, а не их строковые представления.
+    """
+    kind = node[0]
+    if kind == "and":
+        left, right = compile_where(node[1], columns), compile_where(node[2], columns)
+        return lambda row: left(row) and right(row)
+    if kind == "or":
+        left, right = compile_where(node[1], columns), compile_where(node[2], columns)
+        return lambda row: left(row) or right(row)
+    if kind == "not":
+        inner = compile_where(node[1], columns)
+        return lambda row: not inner(row)
+
+    column = node[1]
+    if column not in columns:
+        raise ValueError(f'столбца "{column}" нет в таблице')
+    test = compile_value_test(node, columns[column])
+    if kind == "like":
+        return lambda row: test(row.get(column))
+    get = _getter(column, columns[column])
+    return lambda row: test(get(row))
+
+
+def compile_set(assignments, columns: Dict[str, str]) -> Callable[[dict], dict]:
+    """
+    Компилирует присваивания SET в функцию row -> {столбец: новое значение}.
+    Литералы приводятся к типам столбцов один раз на запрос; выражения
+    "<столбец> +|-|* <число>" считаются по значениям строки до изменения.
+    """
+    values: Dict[str, object] = {}
+    computed = []
+    assigned = set()
+    for column, expr in assignments:
+        if column == ID_FIELD:
+            raise ValueError(f"столбец {ID_FIELD} изменять нельзя")
+        if column not in columns:
+            raise ValueError(f'столбца "{column}" нет в таблице')
+        if column in assigned:
+            raise ValueError(f'столбец "{column}" указан в set дважды')
+        assigned.add(column)
+        if expr[0] == "value":
+            values[column] = coerce_literal(column, expr[1], columns[column])
+            continue
+        _, source, op, operand = expr
+        if source not in columns:
+            raise ValueError(f'столбца "{source}" нет в таблице')
+        if columns[column] != "int" or columns[source] != "int":
+            raise ValueError(
+                f"выражение {source} {op} {operand} допустимо только "
+                "для столбцов int"
+            )
+        computed.append((column, _getter(source, "int"), _ARITHMETIC[op],
+                         coerce_literal(source, operand, "int")))
+
+    def assign(row: dict) -> dict:
+        changes = dict(values)
+        for column, get, func, operand in computed:
+            value = get(row)
+            changes[column] = None if value is None else func(value, operand)
+        return changes
+
+    return assign
+
+
+# --- планировщик ---
+
+def _bounds(node) -> Optional[Tuple[str, Optional[str], Optional[str], bool, bool]]:
+    """Диапазон (столбец, от, до, от включительно, до включительно) или None."""
+    if node[0] == "between":
+        return node[1], node[2], node[3], True, True
+    if node[0] == "cmp" and node[2] in ("<", "<=", ">", ">="):
+        _, column, op, value = node
+        if op in (">", ">="):
+            return column, value, None, op == ">=", True
+        return column, None, value, True, op == "<="
+    return None
+
+
+def conjuncts(node) -> list:
+    """Условия, соединённые верхними AND: a and (b and c) -> [a, b, c]."""
+    if node[0] == "and":
+        return conjuncts(node[1]) + conjuncts(node[2])
+    return [node]
+
+
+# Способы доступа от лучшего к худшему.
+_PATH_ORDER = ("id", "index", "id_range", "index_range", "scan")
+
+
+def plan(node, columns: Dict[str, str], indexes: Dict[str, str],
+         table_len: Callable[[], int],
+         max_id: Optional[Callable[[], int]] = None) -> Tuple[str, Optional[tuple]]:
+    """
+    Выбирает способ доступа к строкам для условия:
+        ("id", [ids])            - точечный поиск по ID;
+        ("id_range", (lo, hi))   - перебор диапазона ID;
+        ("index", (column, [values]))      - поиск по индексу;
+        ("index_range", (column, bounds))  - диапазон по sorted-индексу;
+        ("scan", None)           - полный просмотр.
+    Значения для индекса приводятся к типу столбца, как и в compile_where.
+    Условие целиком всё равно проверяется на каждой найденной строке,
+    поэтому план влияет только на то, сколько строк будет просмотрено.
+    Для AND выбирается лучший из планов подвыражений, а сравнения
+    <, <=, >, >= и between по ID или столбцу с sorted-индексом сводятся
+    в один диапазон: ID > 10 and ID < 20 -> перебор ID 11..19.
+    table_len вызывается, только если нужно сравнить диапазон ID с размером
+    таблицы, max_id - чтобы ограничить открытый сверху диапазон ID
+    (без него такой диапазон просматривается целиком).
+    """
+    if node is None:
+        return "scan", None
+    parts = conjuncts(node)
+    candidates = [_plan_lookup(part, columns, indexes) for part in parts]
+    ranges: Dict[str, list] = {}
+    for part in parts:
+        bounds = _bounds(part)
+        if bounds is None:
+            continue
+        column = bounds[0]
+        if column != ID_FIELD and indexes.get(column) != "sorted":
+            continue
+        try:
+            low, high = (None if value is None
+                         else coerce_literal(column, value, columns[column])
+                         for value in bounds[1:3])
+        except ValueError:
+            return "scan", None
+        _narrow(ranges.setdefault(column, [None, None, True, True]),
+                low, high, *bounds[3:])
+    for column, (low, high, include_low, include_high) in ranges.items():
+        if column == ID_FIELD:
+            candidates.append(_id_range(low, high, include_low, include_high,
+                                        table_len, max_id))
+        else:
+            candidates.append(
+                ("index_range", (column, (low, high, include_low, include_high)))
+            )
+    return min(candidates, key=lambda p: _PATH_ORDER.index(p[0]))
+
+
+def _plan_lookup(node, columns: Dict[str, str],
+                 indexes: Dict[str, str]) -> Tuple[str, Optional[tuple]]:
+    """Точечный поиск для "=" и in по ID или индексу, иначе полный просмотр."""
+    if node[0] == "cmp" and node[2] == "=":
+        values = [node[3]]
+    elif node[0] == "in":
+        values = node[2]
+    else:
+        return "scan", None
+    column = node[1]
+    try:
+        if column == ID_FIELD:
+            return "id", [int(v) for v in values]
+        if column in indexes:
+            return "index", (column, [coerce_literal(column, v, columns[column])
+                                      for v in values])
+    except ValueError:
+        pass
+    return "scan", None
+
+
+def _narrow(bounds: list, low, high, include_low: bool, include_high: bool) -> None:
+    """Сужает [от, до, от включительно, до включительно] ещё одним диапазоном."""
+    if low is not None:
+        if bounds[0] is None or low > bounds[0]:
+            bounds[0], bounds[2] = low, include_low
+        elif low == bounds[0]:
+            bounds[2] = bounds[2] and include_low
+    if high is not None:
+        if bounds[1] is None or high < bounds[1]:
+            bounds[1], bounds[3] = high, include_high
+        elif high == bounds[1]:
+            bounds[3] = bounds[3] and include_high
+
+
+def _id_range(low, high, include_low: bool, include_high: bool,
+              table_len: Callable[[], int],
+              max_id: Optional[Callable[[], int]]) -> Tuple[str, Optional[tuple]]:
+    lo = 1 if low is None else low + (0 if include_low else 1)
+    if high is None:
+        if max_id is None:
+            return "scan", None
+        hi = max_id()
+    else:
+        hi = high - (0 if include_high else 1)
+    lo = max(lo, 1)
+    if hi < lo:
+        return "id", []
+    if hi - lo < table_len():
+        return "id_range", (lo, hi)
+    return "scan", None
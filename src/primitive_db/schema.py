@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional, Set
+
+from src.primitive_db.constants import ID_FIELD
+
+
+class SchemaChanges:
+    """
+    Изменения схемы таблицы (alter_table), ещё не применённые к её файлам.
+
+    metadata[таблица]["columns"] - текущая схема, "schema_version" - её номер,
+    "schema_changes" - изменения по порядку:
+        {"version": 2, "op": "add", "column": "email", "default": None}
+        {"version": 3, "op": "rename", "column": "name", "to": "full_name"}
+        {"version": 4, "op": "drop", "column": "age"}
+
+    Строки, записанные до изменений, переписываются не сразу, а при чтении
+    (upgrade): переименованные столбцы получают новые имена, удалённые
+    скрываются, добавленные заполняются значением по умолчанию.
+    compact переписывает файл таблицы в текущей схеме и очищает список.
+
+    Пока изменение не применено к файлу, старые имена (удалённые столбцы
+    и прежние имена переименованных) заняты: иначе старые строки
+    выдали бы свои значения за значения нового столбца.
+    """
+
+    def __init__(self, table_meta: dict):
+        self.version: int = table_meta.get("schema_version", 1)
+        self.changes: List[dict] = table_meta.get("schema_changes", [])
+        self.names = [name for name, _ in table_meta["columns"]]
+        self.renames = []
+        self.defaults: Dict[str, object] = {}
+        for change in self.changes:
+            column = change["column"]
+            if change["op"] == "add":
+                self.defaults[column] = change.get("default")
+            elif change["op"] == "rename":
+                self.renames.append((column, change["to"]))
+                if column in self.defaults:
+                    self.defaults[change["to"]] = self.defaults.pop(column)
+            else:
+                self.defaults.pop(column, None)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def upgrade(self, row: dict) -> dict:
+        """Строка в текущей схеме таблицы."""
+        for old, new in self.renames:
+            if old in row:
+                row[new] = row.pop(old)
+        return {
+            name: row[name] if name in row else self.defaults.get(name)
+            for name in self.names
+        }
+
+    def reserved(self) -> Set[str]:
+        """Имена, которые нельзя занять до compact."""
+        return {
+            change["column"] for change in self.changes
+            if change["op"] in ("drop", "rename")
+        }
+
+
+def schema_changes(table_meta: dict) -> Optional[SchemaChanges]:
+    """Несброшенные изменения схемы таблицы или None, если их нет."""
+    changes = SchemaChanges(table_meta)
+    return changes if changes else None
+
+
+def alter_columns(table_meta: dict, op: str, column: str,
+                  col_type: Optional[str] = None, new_name: Optional[str] = None,
+                  default=None) -> List[List[str]]:
+    """
+    Проверяет изменение и вносит его в метаданные таблицы.
+    Возвращает новую схему. Ошибка - ValueError с текстом для пользователя.
+    """
+    columns = [list(c) for c in table_meta["columns"]]
+    names = [name for name, _ in columns]
+    reserved = SchemaChanges(table_meta).reserved()
+    partition = table_meta.get("partition", {})
+    if column == ID_FIELD or new_name == ID_FIELD:
+        raise ValueError(f"столбец {ID_FIELD} изменять нельзя")
+
+    if op == "add":
+        if column in names:
+            raise ValueError(f'столбец "{column}" уже есть в таблице')
+        taken = column
+        columns.append([column, col_type])
+    elif column not in names:
+        raise ValueError(f'столбца "{column}" нет в таблице')
+    elif op == "drop" and column == partition.get("column"):
+        raise ValueError(f'по столбцу "{column}" строки разложены по сегментам')
+    elif op == "drop":
+        taken = None
+        columns = [c for c in columns if c[0] != column]
+    else:
+        if new_name in names:
+            raise ValueError(f'столбец "{new_name}" уже есть в таблице')
+        taken = new_name
+        columns = [[new_name, t] if name == column else [name, t]
+                   for name, t in columns]
+    if taken in reserved:
+        raise ValueError(
+            f'имя "{taken}" освободится после compact (его ещё носят старые строки)'
+        )
+
+    version = table_meta.get("schema_version", 1) + 1
+    change = {"version": version, "op": op, "column": column}
+    if op == "add":
+        change["default"] = default
+    elif op == "rename":
+        change["to"] = new_name
+    if op == "rename" and column == partition.get("column"):
+        partition["column"] = new_name
+    table_meta["columns"] = columns
+    table_meta["schema_version"] = version
+    table_meta.setdefault("schema_changes", []).append(change)
+    return columns
+
+
+def schema_applied(table_meta: dict) -> None:
+    """Файл таблицы переписан в текущей схеме: изменения больше не нужны."""
+    table_meta.pop("schema_changes", None)
@@ -0,0 +1,168 @@
+import asyncio
+import io
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from typing import List, Optional, Tuple
+
+from src.primitive_db.constants import (
+    MSG,
+    SERVER_HOST,
+    SERVER_LOCK_TIMEOUT_SECONDS,
+    SERVER_PORT,
+    SERVER_READ_CHUNK,
+)
+from src.primitive_db.decorators import set_assume_yes
+from src.primitive_db.engine import end_command, execute
+from src.primitive_db.tables import table_manager
+
+# Транзакция и постраничный вывод - состояние одного пользователя,
+# а пул таблиц в сервере общий для всех клиентов.
+UNSUPPORTED_COMMANDS = {"begin", "commit", "rollback", "paging"}
+
+
+def run_command(line: str) -> Tuple[str, bool]:
+    """
+    Выполняет одну команду и возвращает её вывод.
+    Второе значение - False, если клиент завершил сеанс (exit).
+    Любая ошибка команды становится текстом ответа: соединение и
+    остальные запросы клиента продолжают работать.
+    """
+    buffer = io.StringIO()
+    keep_open = True
+    with redirect_stdout(buffer):
+        words = line.split(maxsplit=1)
+        command = words[0].lower() if words else ""
+        try:
+            if command in UNSUPPORTED_COMMANDS:
+                print(MSG["server_unsupported"].format(command=command))
+            else:
+                keep_open = execute(line)
+        except Exception as exc:
+            print(MSG["server_command_failed"].format(error=exc))
+    return buffer.getvalue(), keep_open
+
+
+def run_commands(lines: List[bytes]) -> Tuple[List[str], bool]:
+    """
+    Команды, пришедшие от клиента одним чтением, и один сброс после них.
+    Возвращает выводы команд и False, если клиент завершил сеанс (exit).
+    """
+    outputs: List[str] = []
+    keep_open = True
+    for raw in lines:
+        text, keep_open = run_command(raw.decode("utf-8", "replace"))
+        outputs.append(text)
+        if not keep_open:
+            break
+    flushed = io.StringIO()
+    with redirect_stdout(flushed):
+        try:
+            end_command()
+        except Exception as exc:
+            print(MSG["server_command_failed"].format(error=exc))
+    outputs[-1] += flushed.getvalue()
+    return outputs, keep_open
+
+
+def encode_response(text: str) -> bytes:
+    """Ответ: "<длина в байтах>\\n" и вывод команды."""
+    data = text.encode("utf-8")
+    return f"{len(data)}\n".encode("ascii") + data
+
+
+class DatabaseServer:
+    """
+    Сервер базы на asyncio (TCP или Unix-сокет).
+
+    Протокол строковый: запрос - одна команда в строке, в той же грамматике,
+    что и в консоли; ответ - длина вывода и сам вывод. Клиент может
+    отправлять запросы конвейером, не дожидаясь ответов: они выполняются
+    и возвращаются строго по порядку.
+
+    Таблицы остаются в пуле между запросами всех клиентов. Команды
+    выполняются по одной в отдельном потоке, поэтому не перемешиваются,
+    а цикл событий не стоит, пока команда ждёт блокировку другого процесса:
+    соединения и запросы продолжают приниматься. Ожидание ограничено
+    SERVER_LOCK_TIMEOUT_SECONDS, чтобы занятая таблица не задерживала
+    команды остальных клиентов.
+    Все запросы, пришедшие от клиента одним чтением, сбрасываются на диск
+    одним сбросом, и ответы отправляются только после него.
+    """
+
+    def __init__(self):
+        self.stats = {"connections": 0, "active": 0, "requests": 0, "batches": 0}
+        self.started = time.monotonic()
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="db-command")
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self.stats["active"] += 1
+        pending = b""
+        keep_open = True
+        loop = asyncio.get_running_loop()
+        try:
+            while keep_open:
+                chunk = await reader.read(SERVER_READ_CHUNK)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b"\n")
+                if not lines:
+                    continue
+                outputs, keep_open = await loop.run_in_executor(
+                    self.executor, run_commands, lines
+                )
+                self.stats["requests"] += len(outputs)
+                self.stats["batches"] += 1
+                writer.write(b"".join(encode_response(text) for text in outputs))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.stats["active"] -= 1
+            writer.close()
+
+    async def serve(self, host: str, port: int,
+                    unix_path: Optional[str] = None) -> None:
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            address = unix_path
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            address = f"{host}:{port}"
+        print(MSG["server_started"].format(address=address))
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+        async with server:
+            await stop.wait()
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return MSG["server_stopped"].format(
+            requests=self.stats["requests"],
+            connections=self.stats["connections"],
+            rate=self.stats["requests"] / elapsed,
+        )
+
+
+def serve(host: str = SERVER_HOST, port: int = SERVER_PORT,
+          unix_path: Optional[str] = None) -> None:
+    """Запускает сервер до SIGINT/SIGTERM, затем сбрасывает таблицы на диск."""
+    set_assume_yes(True)
+    table_manager.locks.timeout = SERVER_LOCK_TIMEOUT_SECONDS
+    server = DatabaseServer()
+    try:
+        asyncio.run(server.serve(host, port, unix_path))
+    finally:
+        # Сначала дожидаемся команды, которая ещё выполняется.
+        server.executor.shutdown()
+        table_manager.close()
+        print(server.summary())
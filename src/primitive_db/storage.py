@@ -0,0 +1,540 @@
+import json
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.primitive_db.constants import ID_FIELD, MSG
+from src.primitive_db.metrics import metrics
+
+
+def atomic_write(path: Path, write: Callable, binary: bool = False) -> int:
+    """
+    Записывает файл целиком без риска оставить его обрезанным:
+    данные пишутся во временный файл рядом, сбрасываются на диск (fsync)
+    и атомарно подменяют старый файл. Возвращает размер файла.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    mode = {"mode": "wb"} if binary else {"mode": "w", "encoding": "utf-8"}
+    try:
+        file = tmp_path.open(**mode)
+    except FileNotFoundError:
+        # Каталог данных создаётся при первой записи, а не при запуске.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file = tmp_path.open(**mode)
+    with file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+        size = os.fstat(file.fileno()).st_size
+    os.replace(tmp_path, path)
+    sync_dir(path.parent)
+    return size
+
+
+def _write_table_file(path: Path, data: bytes) -> None:
+    metrics.add("storage_bytes_written", atomic_write(
+        path, lambda file: file.write(data), binary=True
+    ))
+
+
+def sync_file(path: Path) -> None:
+    """Сбрасывает на диск ранее дописанные в файл данные."""
+    if path.exists():
+        with path.open("rb") as file:
+            os.fsync(file.fileno())
+
+
+def sync_dir(path: Path) -> None:
+    """fsync каталога, чтобы переименования и новые файлы пережили сбой."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JsonStorage:
+    """
+    Исходный формат: вся таблица - один JSON-массив.
+    Любая запись переписывает файл целиком.
+    """
+    name = "json"
+    suffix = ".json"
+
+    def load(self, path: Path, table_name: str) -> list:
+        data = path.read_bytes()
+        metrics.add("storage_bytes_read", len(data))
+        try:
+            with metrics.timed("json_decode_seconds"):
+                return json.loads(data)
+        except json.JSONDecodeError:
+            # Пустая таблица вместо ошибки привела бы к перезаписи данных.
+            raise ValueError(MSG["table_file_invalid"].format(name=table_name))
+
+    def save(self, path: Path, rows: list, columns: Optional[list] = None) -> None:
+        _write_table_file(path, self.encode(rows, columns))
+
+    def encode(self, rows: list, columns: Optional[list] = None) -> bytes:
+        with metrics.timed("json_encode_seconds"):
+            return json.dumps(rows, indent=4, ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data: bytes) -> list:
+        return json.loads(data)
+
+    def iter_rows(self, path: Path, table_name: str) -> Iterator[dict]:
+        # JSON-массив нельзя читать частями, файл разбирается целиком.
+        yield from self.load(path, table_name)
+
+    def append(self, path: Path, rows: Iterable[dict], table_name: str) -> None:
+        # Строка с уже существующим ID заменяет старую, как и в журнале:
+        # повторное применение тех же изменений ничего не портит.
+        data = self.load(path, table_name) if path.exists() else []
+        by_id = {row.get(ID_FIELD): row for row in data}
+        for row in rows:
+            by_id[row.get(ID_FIELD)] = row
+        self.save(path, list(by_id.values()))
+
+    def delete(self, path: Path, ids: Iterable[int], table_name: str) -> None:
+        ids = set(ids)
+        data = self.load(path, table_name) if path.exists() else []
+        self.save(path, [r for r in data if r.get(ID_FIELD) not in ids])
+
+
+class LogStorage:
+    """
+    Журнал строк: по одной JSON-записи на строку файла.
+    Вставка и обновление дописывают {"op": "put", "row": {...}},
+    удаление - надгробие {"op": "del", "id": N}.
+    Актуальное состояние получается проигрыванием журнала.
+    """
+    name = "log"
+    suffix = ".jsonl"
+
+    def load(self, path: Path, table_name: str) -> list:
+        rows = {}
+        for _, record in self._records(path, table_name):
+            if record.get("op") == "del":
+                rows.pop(record.get("id"), None)
+            else:
+                row = record["row"]
+                rows[row.get(ID_FIELD)] = row
+        return list(rows.values())
+
+    def save(self, path: Path, rows: list, columns: Optional[list] = None) -> None:
+        _write_table_file(path, self.encode(rows, columns))
+
+    def encode(self, rows: list, columns: Optional[list] = None) -> bytes:
+        with metrics.timed("json_encode_seconds"):
+            return "".join(self._put(r) for r in rows).encode("utf-8")
+
+    def decode(self, data: bytes) -> list:
+        rows = {}
+        for line in data.decode("utf-8").splitlines():
+            record = json.loads(line)
+            if record.get("op") == "del":
+                rows.pop(record.get("id"), None)
+            else:
+                rows[record["row"].get(ID_FIELD)] = record["row"]
+        return list(rows.values())
+
+    def iter_rows(self, path: Path, table_name: str) -> Iterator[dict]:
+        """
+        Потоковое чтение живых строк в два прохода по файлу.
+        Первый проход запоминает только номер строки журнала с последней
+        версией каждого ID, второй - выдаёт эти версии. В памяти держатся
+        номера строк, а не сами записи.
+        """
+        latest = {}
+        for line_no, record in self._records(path, table_name):
+            if record.get("op") == "del":
+                latest.pop(record.get("id"), None)
+            else:
+                latest[record["row"].get(ID_FIELD)] = line_no
+        live = set(latest.values())
+        del latest
+        for line_no, record in self._records(path, table_name, report=False):
+            if line_no in live:
+                yield record["row"]
+
+    def _records(self, path: Path, table_name: str,
+                 report: bool = True) -> Iterator[tuple]:
+        broken = False
+        decoding = 0.0
+        clock = time.perf_counter
+        with path.open("r", encoding="utf-8") as file:
+            metrics.add("storage_bytes_read", os.fstat(file.fileno()).st_size)
+            try:
+                for line_no, line in enumerate(file):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    started = clock()
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        broken = True
+                        continue
+                    finally:
+                        decoding += clock() - started
+                    yield line_no, record
+            finally:
+                metrics.add("json_decode_seconds", decoding)
+        if broken and report:
+            print(MSG["table_file_invalid"].format(name=table_name))
+
+    def append(self, path: Path, rows: Iterable[dict], table_name: str) -> None:
+        self._append(path, self.encode(list(rows)))
+
+    def delete(self, path: Path, ids: Iterable[int], table_name: str) -> None:
+        with metrics.timed("json_encode_seconds"):
+            data = "".join(json.dumps({"op": "del", "id": i}) + "\n" for i in ids)
+        self._append(path, data.encode("utf-8"))
+
+    @staticmethod
+    def _append(path: Path, data: bytes) -> None:
+        with path.open("ab") as file:
+            file.write(data)
+        metrics.add("storage_bytes_written", len(data))
+
+    @staticmethod
+    def _put(row: dict) -> str:
+        return json.dumps({"op": "put", "row": row}, ensure_ascii=False) + "\n"
+
+
+_MAGIC = b"PDBT1"
+_U32 = struct.Struct("<I")
+_RECORD = struct.Struct("<cI")
+_ID = struct.Struct("<q")
+_PUT, _DEL, _LAYOUT = b"P", b"D", b"S"
+_STRUCT_CODES = {"int": "q", "bool": "?", "str": "I"}
+
+
+def _typed(value, col_type: str):
+    """Значение в типе столбца; непреобразуемое превращается в None."""
+    if value is None:
+        return None
+    if col_type == "str":
+        return value if isinstance(value, str) else str(value)
+    if col_type == "bool":
+        if isinstance(value, bool):
+            return value
+        text = str(value).lower()
+        if text in ("true", "1"):
+            return True
+        return False if text in ("false", "0") else None
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Schema:
+    """
+    Раскладка строки для схемы [[столбец, тип], ...]:
+    битовая маска пустых значений, затем одним struct все int (8 байт),
+    bool (1 байт) и длины строк (4 байта), затем байты строк в UTF-8.
+    Так разбор строки - один вызов struct.unpack_from и срезы для строк.
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        if not columns or tuple(columns[0]) != (ID_FIELD, "int"):
+            raise ValueError(
+                f"первым столбцом двоичной таблицы должен быть {ID_FIELD}:int"
+            )
+        self.columns = [tuple(c) for c in columns]
+        self.names = [name for name, _ in self.columns]
+        self.null_bytes = (len(columns) + 7) // 8
+        codes = "".join(_STRUCT_CODES[t] for _, t in self.columns)
+        self.fixed = struct.Struct(f"<{self.null_bytes}s{codes}")
+        self.id_offset = self.null_bytes
+        self.strings = [i for i, (_, t) in enumerate(self.columns) if t == "str"]
+
+    def encode(self, row: dict) -> bytes:
+        nulls = 0
+        fixed = []
+        tail = []
+        for i, (name, col_type) in enumerate(self.columns):
+            value = _typed(row.get(name), col_type)
+            if value is None:
+                nulls |= 1 << i
+                fixed.append(False if col_type == "bool" else 0)
+            elif col_type == "str":
+                data = value.encode("utf-8")
+                fixed.append(len(data))
+                tail.append(data)
+            else:
+                fixed.append(value)
+        if nulls & 1:
+            raise ValueError(f"строка без {ID_FIELD}")
+        try:
+            head = self.fixed.pack(nulls.to_bytes(self.null_bytes, "little"), *fixed)
+        except struct.error:
+            raise ValueError("число не помещается в 64 бита") from None
+        return head + b"".join(tail)
+
+    def decode(self, buf, pos: int, wanted: Optional[set] = None) -> dict:
+        values = list(self.fixed.unpack_from(buf, pos))
+        nulls = int.from_bytes(values.pop(0), "little")
+        pos += self.fixed.size
+        for i in self.strings:
+            length = values[i]
+            if wanted is None or self.names[i] in wanted:
+                values[i] = str(buf[pos:pos + length], "utf-8")
+            pos += length
+        if nulls:
+            for i in range(len(values)):
+                if nulls >> i & 1:
+                    values[i] = None
+        row = dict(zip(self.names, values))
+        if wanted is not None:
+            row = {name: row[name] for name in self.names if name in wanted}
+        return row
+
+
+class _Layouts:
+    """
+    Раскладки строк файла по смещениям: заголовок действует с начала,
+    каждая запись схемы (S) - со следующей за ней записи.
+    """
+
+    def __init__(self, layouts: List[Tuple[int, List[Tuple[str, str]]]]):
+        self.starts = [start for start, _ in layouts]
+        self.schemas = [_Schema(columns) for _, columns in layouts]
+
+    def at(self, pos: int) -> _Schema:
+        if len(self.schemas) == 1:
+            return self.schemas[0]
+        return self.schemas[bisect_right(self.starts, pos) - 1]
+
+    def spec(self) -> List[Tuple[int, List[Tuple[str, str]]]]:
+        """Описание для передачи в другой процесс."""
+        return [(start, schema.columns) for start, schema in
+                zip(self.starts, self.schemas)]
+
+
+class BinaryStorage:
+    """
+    Типизированный двоичный журнал строк.
+    Заголовок: сигнатура, длина и JSON со схемой [[столбец, тип], ...].
+    Далее записи: байт операции (P - строка, D - удаление), длина и данные.
+    Имена столбцов в строках не повторяются, значения хранятся в типах
+    столбцов (см. _Schema).
+
+    Файл читается через mmap: ID лежит по постоянному смещению, поэтому
+    последние версии строк находятся без разбора, а разбираются только
+    живые строки (и только нужные столбцы).
+    Недописанная последняя запись (сбой) отрезается перед следующей записью.
+
+    Смена схемы (alter_table) не переписывает файл: дописывается запись
+    S с новой раскладкой, и следующие строки кодируются уже по ней.
+    Строки читаются по раскладке, действовавшей при их записи.
+    """
+    name = "binary"
+    suffix = ".bin"
+
+    def __init__(self):
+        # Путь -> (inode, конец проверенной части файла, текущая раскладка).
+        self._tails: Dict[Path, Tuple[int, int, List[Tuple[str, str]]]] = {}
+
+    def columns(self, path: Path) -> List[Tuple[str, str]]:
+        """Раскладка, по которой будут записаны следующие строки."""
+        with path.open("rb") as file:
+            return self._tail(path, file)[1]
+
+    def set_columns(self, path: Path, columns: List[Tuple[str, str]]) -> None:
+        """Новая раскладка для следующих строк: одна запись в конце файла."""
+        schema = _Schema(columns)
+        payload = json.dumps([list(c) for c in schema.columns]).encode("utf-8")
+        self._write(path, lambda _: (self._record(_LAYOUT, payload), schema.columns))
+
+    def load(self, path: Path, table_name: str) -> list:
+        return list(self.iter_rows(path, table_name))
+
+    def iter_rows(self, path: Path, table_name: str,
+                  ids: Optional[Iterable[int]] = None,
+                  columns: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """
+        Живые строки в порядке первой вставки. ids - только эти строки,
+        columns - только эти столбцы (остальные не разбираются).
+        """
+        with path.open("rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            metrics.add("storage_bytes_read", size)
+            if size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield from self._read(buf, ids, columns)
+
+    def offsets(self, path: Path) -> Tuple[List[int], list]:
+        """
+        Смещения последних версий живых строк в порядке ID и раскладки файла.
+        По ним строки можно читать частями (read_at), в том числе
+        из разных процессов: файл только дописывается.
+        """
+        with path.open("rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            metrics.add("storage_bytes_read", size)
+            if size == 0:
+                return [], []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                latest, layouts = self._latest(buf)
+        return [latest[i] for i in sorted(latest)], layouts.spec()
+
+    def read_at(self, path: Path, offsets: Iterable[int],
+                layouts: list) -> Iterator[dict]:
+        """Строки по смещениям и раскладкам, полученным из offsets."""
+        layouts = _Layouts(layouts)
+        with path.open("rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                for pos in offsets:
+                    yield layouts.at(pos).decode(buf, pos)
+
+    def save(self, path: Path, rows: list, columns: Optional[list] = None) -> None:
+        if columns is None:
+            columns = self.columns(path)
+        _write_table_file(path, self.encode(rows, columns))
+        self._tails.pop(path, None)
+
+    def append(self, path: Path, rows: Iterable[dict], table_name: str) -> None:
+        def build(columns):
+            schema = _Schema(columns)
+            return b"".join(
+                self._record(_PUT, schema.encode(row)) for row in rows
+            ), columns
+        self._write(path, build)
+
+    def delete(self, path: Path, ids: Iterable[int], table_name: str) -> None:
+        data = b"".join(self._record(_DEL, _ID.pack(i)) for i in ids)
+        self._write(path, lambda columns: (data, columns))
+
+    def encode(self, rows: list, columns: list) -> bytes:
+        schema = _Schema(columns)
+        header = json.dumps([list(c) for c in schema.columns]).encode("utf-8")
+        parts = [_MAGIC, _U32.pack(len(header)), header]
+        parts.extend(self._record(_PUT, schema.encode(row)) for row in rows)
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> list:
+        return list(self._read(memoryview(data)))
+
+    # --- разбор ---
+
+    @staticmethod
+    def _record(op: bytes, payload: bytes) -> bytes:
+        return _RECORD.pack(op, len(payload)) + payload
+
+    @staticmethod
+    def _check_magic(head: bytes, path) -> None:
+        if head[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"файл {path} не является двоичной таблицей")
+
+    def _header(self, buf) -> Tuple[_Schema, int]:
+        self._check_magic(bytes(buf[:len(_MAGIC)]), "")
+        (size,) = _U32.unpack_from(buf, len(_MAGIC))
+        start = len(_MAGIC) + _U32.size
+        columns = json.loads(bytes(buf[start:start + size]))
+        return _Schema(columns), start + size
+
+    @staticmethod
+    def _records(buf, pos: int) -> Iterator[Tuple[bytes, int, int]]:
+        """(операция, начало данных, конец записи) до первой недописанной записи."""
+        end = len(buf)
+        while pos + _RECORD.size <= end:
+            op, length = _RECORD.unpack_from(buf, pos)
+            data = pos + _RECORD.size
+            if data + length > end or op not in (_PUT, _DEL, _LAYOUT):
+                return
+            yield op, data, data + length
+            pos = data + length
+
+    def _latest(self, buf) -> Tuple[Dict[int, int], _Layouts]:
+        """ID -> смещение последней версии строки (без разбора строк) и раскладки."""
+        schema, start = self._header(buf)
+        layouts = [(start, schema.columns)]
+        id_offset = schema.id_offset
+        latest: Dict[int, int] = {}
+        for op, data, end in self._records(buf, start):
+            if op == _PUT:
+                (row_id,) = _ID.unpack_from(buf, data + id_offset)
+                latest[row_id] = data
+            elif op == _DEL:
+                (row_id,) = _ID.unpack_from(buf, data)
+                latest.pop(row_id, None)
+            else:
+                schema = _Schema(json.loads(bytes(buf[data:end])))
+                id_offset = schema.id_offset
+                layouts.append((end, schema.columns))
+        return latest, _Layouts(layouts)
+
+    def _read(self, buf, ids=None, columns=None) -> Iterator[dict]:
+        latest, layouts = self._latest(buf)
+        wanted = None if columns is None else set(columns) | {ID_FIELD}
+        if ids is not None:
+            ids = [i for i in ids if i in latest]
+        for row_id in (latest if ids is None else ids):
+            pos = latest[row_id]
+            yield layouts.at(pos).decode(buf, pos, wanted)
+
+    def _write(self, path: Path,
+               build: Callable[[list], Tuple[bytes, list]]) -> None:
+        """
+        Дописывает в конец файла данные build(текущая раскладка), которая
+        возвращает байты и раскладку после них.
+        """
+        with path.open("r+b") as file:
+            end, columns = self._tail(path, file)
+            data, columns = build(columns)
+            if not data:
+                return
+            file.seek(end)
+            file.truncate()
+            file.write(data)
+            metrics.add("storage_bytes_written", len(data))
+            inode = os.fstat(file.fileno()).st_ino
+            self._tails[path] = (inode, end + len(data), columns)
+
+    def _tail(self, path: Path, file) -> Tuple[int, List[Tuple[str, str]]]:
+        """
+        Конец последней целой записи и текущая раскладка. Проверка идёт
+        с места, докуда файл уже проверен этим процессом, поэтому
+        дописывание не читает файл заново.
+        """
+        stat = os.fstat(file.fileno())
+        inode, known, columns = self._tails.get(path, (None, None, None))
+        if inode != stat.st_ino or known > stat.st_size:
+            known = None
+        if known == stat.st_size:
+            return known, columns
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if known is None:
+                schema, known = self._header(buf)
+                columns = schema.columns
+            for op, data, end in self._records(buf, known):
+                if op == _LAYOUT:
+                    columns = [tuple(c) for c in json.loads(bytes(buf[data:end]))]
+                known = end
+        self._tails[path] = (stat.st_ino, known, columns)
+        return known, columns
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (JsonStorage(), LogStorage(), BinaryStorage())
+}
+
+
+def table_files(data_dir: Path, table_name: str) -> List[Path]:
+    """Все файлы, в которых может лежать таблица (во всех форматах)."""
+    safe_name = Path(table_name).name
+    return [
+        (data_dir / safe_name).with_suffix(backend.suffix)
+        for backend in BACKENDS.values()
+    ]
@@ -0,0 +1,152 @@
+import math
+import zlib
+from typing import Iterable, List, Tuple
+
+from src.primitive_db.constants import ID_FIELD, STATS_SKETCH_REGISTERS
+from src.primitive_db.query import coerce_literal, native_value
+
+# Статистика таблицы хранится в metadata[таблица]["stats"]:
+#     {"rows": 1200,
+#      "columns": {"ID": {"min": 1, "max": 1250},
+#                  "age": {"sketch": "0502...", "min": 18, "max": 90},
+#                  "name": {"sketch": "0301..."}}}
+# Скетч и min/max дополняются при каждой записи. Удаление уменьшает только
+# число строк: скетч и min/max остаются верхними оценками, точные значения
+# пересчитывает analyze.
+
+_RANK_BITS = 32 - (STATS_SKETCH_REGISTERS.bit_length() - 1)
+_RANK_MASK = (1 << _RANK_BITS) - 1
+# Поправочный коэффициент HyperLogLog для числа регистров.
+_ALPHA = 0.7213 / (1 + 1.079 / STATS_SKETCH_REGISTERS)
+
+# Доля строк под условием, для которого статистика ничего не говорит.
+DEFAULT_SELECTIVITY = 1 / 3
+LIKE_SELECTIVITY = 0.1
+
+
+def _hash(value) -> int:
+    # Умножение на 2^32/φ (фибоначчиево хеширование) перемешивает биты crc32,
+    # старшие биты выбирают регистр.
+    return (zlib.crc32(str(value).encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+
+
+def new_stats(columns: List[Tuple[str, str]]) -> dict:
+    """Статистика пустой таблицы."""
+    registers = bytes(STATS_SKETCH_REGISTERS).hex()
+    return {
+        "rows": 0,
+        "columns": {
+            name: {} if name == ID_FIELD else {"sketch": registers}
+            for name, _ in columns
+        },
+    }
+
+
+def build_stats(columns: List[Tuple[str, str]], rows: Iterable[dict]) -> dict:
+    """Точная (кроме оценки различных значений) статистика по строкам."""
+    stats = new_stats(columns)
+    rows = list(rows)
+    stats["rows"] = len(rows)
+    observe(stats, columns, rows)
+    return stats
+
+
+def observe(stats: dict, columns: List[Tuple[str, str]], rows: List[dict]) -> bool:
+    """
+    Учитывает значения новых или изменённых строк (число строк не меняется).
+    Возвращает True, если статистика изменилась.
+    """
+    changed = False
+    for name, col_type in columns:
+        column = stats["columns"].setdefault(name, {})
+        values = [row.get(name) for row in rows]
+        if col_type == "int":
+            values = [v if type(v) is int else native_value(v, "int") for v in values]
+        values = [v for v in values if v is not None]
+        if not values:
+            continue
+        if col_type == "int":
+            low, high = min(values), max(values)
+            if low < column.get("min", low + 1):
+                column["min"], changed = low, True
+            if high > column.get("max", high - 1):
+                column["max"], changed = high, True
+        if "sketch" in column:
+            registers = bytearray.fromhex(column["sketch"])
+            raised = False
+            for value in set(values):
+                h = _hash(value)
+                rank = _RANK_BITS - (h & _RANK_MASK).bit_length() + 1
+                index = h >> _RANK_BITS
+                if rank > registers[index]:
+                    registers[index], raised = rank, True
+            if raised:
+                column["sketch"], changed = registers.hex(), True
+    return changed
+
+
+def distinct(stats: dict, column: str) -> int:
+    """Оценка числа различных значений столбца."""
+    rows = stats["rows"]
+    if column == ID_FIELD:
+        return rows
+    sketch = stats["columns"].get(column, {}).get("sketch")
+    if sketch is None:
+        return rows
+    registers = bytes.fromhex(sketch)
+    size = len(registers)
+    estimate = _ALPHA * size * size / sum(2.0 ** -r for r in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * size and zeros:
+        # Для малых чисел точнее линейный подсчёт по пустым регистрам.
+        estimate = size * math.log(size / zeros)
+    return min(round(estimate), rows)
+
+
+def estimate_rows(stats: dict, node, col_types: dict) -> int:
+    """Оценка числа строк, подходящих под условие (None - все строки)."""
+    if node is None:
+        return stats["rows"]
+    return round(stats["rows"] * _selectivity(stats, node, col_types))
+
+
+def _selectivity(stats: dict, node, col_types: dict) -> float:
+    kind = node[0]
+    if kind in ("and", "or"):
+        left = _selectivity(stats, node[1], col_types)
+        right = _selectivity(stats, node[2], col_types)
+        return left * right if kind == "and" else left + right - left * right
+    if kind == "not":
+        return 1 - _selectivity(stats, node[1], col_types)
+    column = node[1]
+    share = 1 / max(distinct(stats, column), 1)
+    if kind == "cmp" and node[2] == "=":
+        return share
+    if kind == "cmp" and node[2] == "!=":
+        return 1 - share
+    if kind == "in":
+        return min(len(node[2]) * share, 1.0)
+    if kind == "like":
+        return LIKE_SELECTIVITY
+    try:
+        return _range_share(stats, node, col_types.get(column))
+    except ValueError:
+        return DEFAULT_SELECTIVITY
+
+
+def _range_share(stats: dict, node, col_type: str) -> float:
+    """Доля строк в диапазоне по min/max int-столбца (равномерное распределение)."""
+    column = stats["columns"].get(node[1], {})
+    if col_type != "int" or "min" not in column:
+        return DEFAULT_SELECTIVITY
+    low, high = column["min"], column["max"]
+    if node[0] == "between":
+        start = coerce_literal(node[1], node[2], col_type)
+        end = coerce_literal(node[1], node[3], col_type)
+    else:
+        value = coerce_literal(node[1], node[3], col_type)
+        start, end = (low, value) if node[2] in ("<", "<=") else (value, high)
+    start, end = max(start, low), min(end, high)
+    if end < start:
+        return 0.0
+    return (end - start + 1) / (high - low + 1)
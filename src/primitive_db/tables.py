@@ -0,0 +1,649 @@
+import heapq
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, ValuesView
+
+from src.primitive_db import parallel
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.constants import (
+    FLUSH_INTERVAL_MS,
+    FLUSH_POLICIES,
+    FLUSH_POLICY,
+    ID_FIELD,
+    STREAM_THRESHOLD_BYTES,
+)
+from src.primitive_db.indexes import INDEX_KINDS, HashIndex
+from src.primitive_db.locks import META_LOCK, LockManager, data_lock, writer_lock
+from src.primitive_db.metrics import metrics
+from src.primitive_db.partitions import (
+    Partitioning,
+    base_table,
+    partitioning,
+    segment_name,
+)
+from src.primitive_db.schema import SchemaChanges, schema_changes
+from src.primitive_db.table_stats import build_stats, observe
+from src.primitive_db.utils import (
+    apply_table_ops,
+    create_segment_file,
+    file_signature,
+    iter_table_data,
+    load_metadata,
+    load_table_data,
+    read_table_rows,
+    save_metadata,
+    supports_partial_read,
+    table_offsets,
+    table_signature,
+    table_size,
+)
+from src.primitive_db.wal import WriteAheadLog
+
+
+class TableManager:
+    """
+    Пул таблиц процесса: хранит разобранные таблицы в памяти и
+    отложенно (write-back) сбрасывает изменения на диск.
+
+    Строки таблицы хранятся в словаре ID -> строка, который сохраняет
+    порядок вставки, поэтому поиск строки по ID не требует просмотра.
+
+    Изменения файла другим процессом определяются по mtime и размеру:
+    в этом случае таблица перечитывается, а несброшенные изменения
+    применяются к ней повторно.
+
+    Политики сброса:
+        command  - после каждой команды;
+        interval - не чаще, чем раз в FLUSH_INTERVAL_MS миллисекунд;
+        exit     - только при выходе из программы.
+
+    Внутри транзакции (begin ... commit) сброс откладывается при любой
+    политике: все изменения пишутся одной транзакцией WAL при commit,
+    а rollback выбрасывает их и перечитывает затронутые таблицы с диска.
+
+    Несколько процессов могут работать с одной базой:
+        - писатель берёт блокировку писателя таблицы (lock_for_write) до
+          первого изменения и держит её до сброса, поэтому изменения двух
+          процессов в одной таблице не перемешиваются и ID не повторяются;
+        - сброс идёт под блокировкой метаданных и WAL, а файлы таблицы
+          дописываются под её исключительной блокировкой;
+        - читатель загружает таблицу под разделяемой блокировкой и дальше
+          работает со снимком в памяти, не мешая писателю;
+        - метаданные, изменённые другим процессом, сливаются с локальными:
+          записи таблиц, которые держит этот процесс, остаются своими.
+    """
+
+    def __init__(self, policy: str = FLUSH_POLICY,
+                 interval_ms: int = FLUSH_INTERVAL_MS):
+        self.set_policy(policy, interval_ms)
+        self._rows: Dict[str, Dict[int, dict]] = {}
+        self._signatures: Dict[str, tuple] = {}
+        self._pending: Dict[str, List[Tuple[str, object]]] = {}
+        self._indexes: Dict[str, Dict[str, HashIndex]] = {}
+        self._columnar: Dict[str, ColumnarTable] = {}
+        self._generations: Dict[str, int] = {}
+        # Таблица hash -> ID -> номер сегмента, в файле которого лежит строка.
+        self._placement: Dict[str, Dict[int, int]] = {}
+        self._meta: Optional[dict] = None
+        self._meta_signature: Optional[tuple] = None
+        self._meta_file: Optional[Path] = None
+        self._meta_dirty = False
+        self._last_flush = time.monotonic()
+        self._in_transaction = False
+        self._writing: Set[str] = set()
+        self.locks = LockManager()
+        self.wal = WriteAheadLog()
+
+    def set_policy(self, policy: str, interval_ms: int = FLUSH_INTERVAL_MS) -> None:
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"неизвестная политика сброса {policy}")
+        self.policy = policy
+        self.interval_ms = interval_ms
+
+    # --- метаданные ---
+
+    def metadata(self, meta_file: Path) -> dict:
+        """Метаданные из кэша; файл перечитывается, только если он изменился."""
+        self._meta_file = meta_file
+        self._refresh_metadata()
+        return self._meta
+
+    def _refresh_metadata(self) -> None:
+        """
+        Перечитывает файл метаданных, если его изменил другой процесс.
+        Словарь обновляется на месте; записи таблиц под блокировкой писателя
+        этого процесса сохраняются (их изменения ещё не сброшены).
+        """
+        if self._meta_file is None:
+            return
+        signature = file_signature(self._meta_file)
+        if self._meta is not None and signature == self._meta_signature:
+            return
+        disk = load_metadata(self._meta_file)
+        if self._meta is None:
+            self._meta = disk
+        else:
+            for name in self._writing:
+                if name in self._meta:
+                    disk[name] = self._meta[name]
+                else:
+                    disk.pop(name, None)
+            self._meta.clear()
+            self._meta.update(disk)
+        self._meta_signature = signature
+        if not self._writing:
+            self._meta_dirty = False
+
+    def save_metadata(self, meta_file: Path, metadata: dict) -> None:
+        """Сохраняет метаданные сразу (после DDL) вместе с накопленными изменениями."""
+        self._meta = metadata
+        self._meta_file = meta_file
+        self._meta_dirty = True
+        self.flush()
+
+    def _write_metadata(self) -> None:
+        save_metadata(self._meta_file, self._meta)
+        self._meta_signature = file_signature(self._meta_file)
+        self._meta_dirty = False
+
+    def touch_metadata(self) -> None:
+        """
+        Отмечает, что кэшированные метаданные изменились (например, счётчик ID).
+        Они будут записаны вместе со сбросом таблиц.
+        """
+        self._meta_dirty = True
+
+    # --- статистика ---
+
+    def statistics(self, table_name: str) -> dict:
+        """
+        Статистика таблицы (table_stats). Для таблицы без неё (созданной до
+        появления статистики или после alter_table) строится по строкам;
+        записана она будет вместе со следующим изменением таблицы.
+        """
+        table_meta = self._meta[table_name]
+        if "stats" not in table_meta:
+            table_meta["stats"] = build_stats(
+                table_meta["columns"], self.iter_rows(table_name)
+            )
+        return table_meta["stats"]
+
+    def analyze(self, table_name: str) -> dict:
+        """Пересчитывает статистику по строкам таблицы (нужна блокировка писателя)."""
+        table_meta = self._meta[table_name]
+        table_meta["stats"] = build_stats(
+            table_meta["columns"], self.iter_rows(table_name)
+        )
+        self._meta_dirty = True
+        return table_meta["stats"]
+
+    def _track_stats(self, table_name: str, rows: Optional[List[dict]] = None,
+                     added: int = 0) -> None:
+        """
+        Дополняет статистику записью: rows - новые или изменённые строки,
+        added - на сколько изменилось число строк. Метаданные помечаются
+        к записи, только если статистика изменилась.
+        """
+        table_meta = (self._meta or {}).get(table_name)
+        if table_meta is None or "stats" not in table_meta:
+            return
+        stats = table_meta["stats"]
+        if added:
+            stats["rows"] = max(stats["rows"] + added, 0)
+            self._meta_dirty = True
+        if rows and observe(stats, table_meta["columns"], rows):
+            self._meta_dirty = True
+
+    # --- строки таблиц ---
+
+    def rows(self, table_name: str) -> ValuesView[dict]:
+        """Живые строки таблицы в порядке вставки (представление, не копия)."""
+        return self._table(table_name).values()
+
+    def iter_rows(self, table_name: str, where=None) -> Iterator[dict]:
+        """
+        Строки таблицы для потоковой обработки. Если таблица уже в пуле
+        или невелика, отдаются строки из памяти (с несброшенными
+        изменениями). Большая таблица, которой нет в пуле, читается
+        с диска по одной строке и в пул не попадает; у секционированной
+        таблицы читаются только сегменты, которые может затронуть where.
+        """
+        if self.streams(table_name):
+            return self._stream(table_name, where)
+        return iter(list(self.rows(table_name)))
+
+    def _stream(self, table_name: str, where=None) -> Iterator[dict]:
+        # Блокировка держится до конца чтения: писатель не допишет файл
+        # посреди просмотра, и читатель увидит согласованное состояние.
+        changes = self._changes(table_name)
+        with self.locks.shared(data_lock(table_name)):
+            rows = self._merge(table_name, [
+                iter_table_data(segment)
+                for segment in self.segments(table_name, where)
+            ])
+            yield from rows if changes is None else map(changes.upgrade, rows)
+
+    def scan(self, table_name: str, where, col_types: dict) -> Iterator[dict]:
+        """
+        Полный просмотр с условием большой двоичной таблицы прямо с диска:
+        диапазоны строк проверяются параллельно (см. parallel.scan),
+        строки выдаются в порядке ID. Таблица в пул не загружается.
+        """
+        changes = self._changes(table_name)
+        with self.locks.shared(data_lock(table_name)):
+            scans = []
+            for segment in self.segments(table_name, where):
+                path, offsets, layouts = table_offsets(segment)
+                metrics.add("rows_scanned", len(offsets))
+                scans.append(
+                    parallel.scan(path, offsets, layouts, where, col_types, changes)
+                )
+            for row in self._merge(table_name, scans):
+                metrics.add("rows_returned")
+                yield row
+
+    def streams(self, table_name: str) -> bool:
+        """Будет ли полный просмотр таблицы читаться с диска потоком."""
+        return table_name not in self._rows and (
+            self.size(table_name) > STREAM_THRESHOLD_BYTES
+        )
+
+    def size(self, table_name: str) -> int:
+        """Размер файлов таблицы (всех её сегментов) в байтах."""
+        return sum(table_size(segment) for segment in self.segments(table_name))
+
+    def supports_partial_read(self, table_name: str) -> bool:
+        return supports_partial_read(self.segments(table_name)[0])
+
+    def row(self, table_name: str, row_id: int) -> Optional[dict]:
+        """Строка по ID без просмотра таблицы."""
+        return self._table(table_name).get(row_id)
+
+    def rows_by_id(self, table_name: str, ids: List[int]) -> List[dict]:
+        """
+        Строки по списку ID. Большая двоичная таблица, которой нет в пуле,
+        читается с диска выборочно: разбираются только эти строки.
+        """
+        if self.streams(table_name) and self.supports_partial_read(table_name):
+            changes = self._changes(table_name)
+            segments = self.segments(table_name, ("in", ID_FIELD, ids))
+            with self.locks.shared(data_lock(table_name)):
+                rows = [row for segment in segments
+                        for row in read_table_rows(segment, ids)]
+            if len(segments) > 1:
+                rows.sort(key=lambda row: row[ID_FIELD])
+            return rows if changes is None else [changes.upgrade(r) for r in rows]
+        table = self._table(table_name)
+        return [table[i] for i in ids if i in table]
+
+    def max_id(self, table_name: str) -> int:
+        return max(self._table(table_name), default=0)
+
+    def _changes(self, table_name: str) -> Optional[SchemaChanges]:
+        """Изменения схемы таблицы, ещё не применённые к её файлу."""
+        if self._meta is None or table_name not in self._meta:
+            return None
+        return schema_changes(self._meta[table_name])
+
+    def _signature(self, table_name: str) -> tuple:
+        # Смена схемы (alter_table) тоже требует перечитать строки.
+        version = (self._meta or {}).get(table_name, {}).get("schema_version", 1)
+        files = tuple(table_signature(s) for s in self.segments(table_name))
+        return files, version
+
+    # --- сегменты ---
+
+    def partitioning(self, table_name: str) -> Optional[Partitioning]:
+        """Раскладка секционированной таблицы по сегментам или None."""
+        if self._meta is None or table_name not in self._meta:
+            return None
+        return partitioning(table_name, self._meta[table_name])
+
+    def segments(self, table_name: str, where=None) -> List[str]:
+        """
+        Таблицы-сегменты, в файлах которых лежат строки таблицы (у
+        несекционированной - она сама). where отсекает сегменты, в которых
+        не может быть подходящих строк.
+        """
+        part = self.partitioning(table_name)
+        return [table_name] if part is None else part.prune(where)
+
+    def _merge(self, table_name: str,
+               parts: List[Iterator[dict]]) -> Iterator[dict]:
+        """Строки сегментов одним потоком в порядке ID."""
+        if len(parts) == 1:
+            return parts[0]
+        part = self.partitioning(table_name)
+        if part is not None and part.kind == "hash":
+            return heapq.merge(*parts, key=lambda row: row[ID_FIELD])
+        # Сегменты range идут по возрастанию ID.
+        return chain.from_iterable(parts)
+
+    def _load(self, table_name: str) -> List[dict]:
+        """Все строки таблицы с диска (со всех сегментов)."""
+        part = self.partitioning(table_name)
+        if part is None:
+            return load_table_data(table_name)
+        rows: List[dict] = []
+        placement: Dict[int, int] = {}
+        for number, segment in zip(part.numbers, part.segments()):
+            segment_rows = load_table_data(segment)
+            placement.update((row[ID_FIELD], number) for row in segment_rows)
+            rows.extend(segment_rows)
+        if part.movable:
+            self._placement[table_name] = placement
+        if part.kind == "hash":
+            rows.sort(key=lambda row: row[ID_FIELD])
+        return rows
+
+    def _segment_ops(self, table_name: str,
+                     ops: List[Tuple[str, list]]) -> List[Tuple[str, list]]:
+        """
+        Раскладывает изменения таблицы по сегментам: (сегмент, изменения).
+        Строка, у которой изменился ключ hash, удаляется из прежнего
+        сегмента. Для новых сегментов range создаются файлы, а сами
+        сегменты заносятся в карту секций (метаданные).
+        """
+        part = self.partitioning(table_name)
+        if part is None:
+            return [(table_name, ops)]
+        placement = self._placement.setdefault(table_name, {})
+        by_segment: Dict[int, List[Tuple[str, list]]] = {}
+
+        def add(number: int, kind: str, item) -> None:
+            segment_ops = by_segment.setdefault(number, [])
+            if segment_ops and segment_ops[-1][0] == kind:
+                segment_ops[-1][1].append(item)
+            else:
+                segment_ops.append((kind, [item]))
+
+        for kind, items in ops:
+            for item in items:
+                if kind == "delete":
+                    number = (placement.pop(item, None) if part.movable
+                              else part.number(item))
+                    if number is not None:
+                        add(number, "delete", item)
+                    continue
+                row_id, number = item[ID_FIELD], part.of_row(item)
+                if part.movable:
+                    old = placement.get(row_id)
+                    if old is not None and old != number:
+                        add(old, "delete", row_id)
+                    placement[row_id] = number
+                add(number, "put", item)
+
+        like = part.segments()[0]
+        for number in part.register(by_segment):
+            create_segment_file(segment_name(table_name, number), like,
+                                self._meta[table_name]["columns"])
+            self._meta_dirty = True
+        return [(segment_name(table_name, number), segment_ops)
+                for number, segment_ops in sorted(by_segment.items())]
+
+    def _table(self, table_name: str) -> Dict[int, dict]:
+        signature = self._signature(table_name)
+        if table_name not in self._rows or signature != self._signatures[table_name]:
+            changes = self._changes(table_name)
+            with self.locks.shared(data_lock(table_name)):
+                signature = self._signature(table_name)
+                rows = self._load(table_name)
+            if changes is not None:
+                rows = map(changes.upgrade, rows)
+            rows = {r.get(ID_FIELD): r for r in rows}
+            self._replay(rows, self._pending.get(table_name, []))
+            self._rows[table_name] = rows
+            self._signatures[table_name] = signature
+            self._indexes.pop(table_name, None)
+            self._columnar.pop(table_name, None)
+            self._generations[table_name] = self._generations.get(table_name, 0) + 1
+        return self._rows[table_name]
+
+    def version(self, table_name: str) -> object:
+        """
+        Метка данных таблицы для ключа кэша результатов. Таблица, которая
+        читается потоком, не загружается: метка - подпись её файлов и версия
+        схемы. Остальные таблицы select всё равно загрузит в пул, и метка -
+        номер загрузки с диска: свои записи кэш сбрасывает сам, а чужие
+        приводят к перечитыванию и новому номеру.
+        """
+        if self.streams(table_name):
+            return self._signature(table_name)
+        self._table(table_name)
+        return self._generations[table_name]
+
+    def index(self, table_name: str, column: str, kind: str,
+              col_type: str) -> HashIndex:
+        """
+        Индекс по столбцу. Строится при первом обращении
+        и дальше поддерживается при каждой записи в таблицу.
+        """
+        rows = self.rows(table_name)
+        indexes = self._indexes.setdefault(table_name, {})
+        index = indexes.get(column)
+        if index is None or index.kind != kind:
+            index = indexes[column] = INDEX_KINDS[kind](column, col_type).build(rows)
+        return index
+
+    def columnar(self, table_name: str,
+                 columns: List[Tuple[str, str]]) -> ColumnarTable:
+        """
+        Колоночный снимок таблицы для просмотров и агрегатов.
+        Строится при первом обращении и сбрасывается любой записью в таблицу.
+        """
+        table = self._table(table_name)
+        snapshot = self._columnar.get(table_name)
+        if snapshot is None or snapshot.types != dict(columns):
+            snapshot = ColumnarTable(columns, table.values())
+            self._columnar[table_name] = snapshot
+        return snapshot
+
+    def insert(self, table_name: str, rows: Iterable[dict]) -> None:
+        """Добавляет новые строки."""
+        rows = list(rows)
+        table = self._table(table_name)
+        for row in rows:
+            table[row[ID_FIELD]] = row
+        for index in self._indexes.get(table_name, {}).values():
+            for row in rows:
+                index.add(row)
+        self._track_stats(table_name, rows, len(rows))
+        self._columnar.pop(table_name, None)
+        self._pending.setdefault(table_name, []).append(("insert", rows))
+
+    def update(self, table_name: str, rows: Iterable[dict]) -> None:
+        """Фиксирует изменение строк, уже изменённых на месте."""
+        rows = list(rows)
+        table = self._table(table_name)
+        # Строки, прочитанные с диска мимо пула, заменяют версии в пуле.
+        for row in rows:
+            if row[ID_FIELD] in table:
+                table[row[ID_FIELD]] = row
+        for index in self._indexes.get(table_name, {}).values():
+            for row in rows:
+                index.update(row)
+        self._track_stats(table_name, rows)
+        self._columnar.pop(table_name, None)
+        self._pending.setdefault(table_name, []).append(("update", rows))
+
+    def delete(self, table_name: str, ids: Iterable[int]) -> None:
+        ids = list(ids)
+        table = self._table(table_name)
+        removed = sum(table.pop(row_id, None) is not None for row_id in ids)
+        for index in self._indexes.get(table_name, {}).values():
+            for row_id in ids:
+                index.remove(row_id)
+        self._track_stats(table_name, added=-removed)
+        self._columnar.pop(table_name, None)
+        self._pending.setdefault(table_name, []).append(("delete", ids))
+
+    def forget(self, table_name: str) -> None:
+        """Убирает таблицу из пула без записи (например, после drop_table)."""
+        self._rows.pop(table_name, None)
+        self._signatures.pop(table_name, None)
+        self._pending.pop(table_name, None)
+        self._indexes.pop(table_name, None)
+        self._columnar.pop(table_name, None)
+        self._placement.pop(table_name, None)
+
+    def is_dirty(self, table_name: str) -> bool:
+        return bool(self._pending.get(table_name))
+
+    # --- блокировки ---
+
+    def lock_for_write(self, table_name: str) -> None:
+        """
+        Берёт блокировку писателя таблицы (или ждёт, пока её отпустит другой
+        процесс) и обновляет метаданные. Вызывается до чтения данных, на
+        которых основано изменение. Блокировка держится до сброса изменений:
+        до конца команды, а в транзакции - до commit или rollback.
+        """
+        if table_name in self._writing:
+            return
+        self.locks.acquire(writer_lock(table_name), exclusive=True)
+        self._writing.add(table_name)
+        self._refresh_metadata()
+
+    def _release_writers(self) -> None:
+        for table_name in self._writing:
+            self.locks.release(writer_lock(table_name))
+        self._writing.clear()
+
+    # --- транзакции ---
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._in_transaction
+
+    def begin(self) -> None:
+        """
+        Начинает транзакцию. Накопленные до неё изменения сбрасываются,
+        чтобы при откате состояние на диске совпадало с моментом begin.
+        """
+        if self._in_transaction:
+            raise ValueError("транзакция уже начата")
+        self.flush()
+        self._in_transaction = True
+
+    def commit(self) -> int:
+        """Записывает изменения транзакции одним сбросом. Возвращает число операций."""
+        if not self._in_transaction:
+            raise ValueError("транзакция не начата")
+        count = sum(len(ops) for ops in self._pending.values())
+        self._in_transaction = False
+        self.flush()
+        self._release_writers()
+        return count
+
+    def rollback(self) -> List[str]:
+        """
+        Отменяет транзакцию: несброшенные изменения выбрасываются,
+        затронутые таблицы и метаданные будут перечитаны с диска.
+        Возвращает имена затронутых таблиц.
+        """
+        if not self._in_transaction:
+            raise ValueError("транзакция не начата")
+        tables = [name for name, ops in self._pending.items() if ops]
+        self._in_transaction = False
+        for name in tables:
+            self.forget(name)
+        self._pending.clear()
+        self._meta = None
+        self._meta_dirty = False
+        self._release_writers()
+        return tables
+
+    # --- сброс на диск ---
+
+    def flush(self, table_name: Optional[str] = None) -> None:
+        """
+        Записывает накопленные изменения одной или всех таблиц.
+        Сначала все изменения одной транзакцией фиксируются в WAL,
+        затем применяются к файлам таблиц и метаданных.
+        Внутри транзакции ничего не делает: запись произойдёт при commit.
+        """
+        if self._in_transaction:
+            return
+        names = [table_name] if table_name else list(self._pending)
+        batch = []
+        for name in names:
+            ops = self._pending.pop(name, [])
+            if ops:
+                batch.extend(self._segment_ops(name, self._storage_ops(ops)))
+        write_meta = self._meta_dirty and self._meta_file is not None
+        if batch or write_meta:
+            with self.locks.exclusive(META_LOCK):
+                if write_meta:
+                    self._refresh_metadata()
+                txn_id = self.wal.commit(batch, self._meta if write_meta else None)
+                for name, ops in batch:
+                    table = base_table(name)
+                    with self.locks.exclusive(data_lock(table)):
+                        apply_table_ops(name, ops)
+                        if table in self._rows:
+                            self._signatures[table] = self._signature(table)
+                if write_meta:
+                    self._write_metadata()
+                self.wal.mark_applied(txn_id)
+                self.wal.maybe_checkpoint(self._meta_file)
+        if table_name is None:
+            self._last_flush = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """Сбрасывает всё на диск и очищает WAL."""
+        self.flush()
+        with self.locks.exclusive(META_LOCK):
+            self.wal.checkpoint()
+
+    def recover(self, meta_file: Path) -> int:
+        """Восстановление по WAL при запуске (см. WriteAheadLog.recover)."""
+        with self.locks.exclusive(META_LOCK):
+            return self.wal.recover(meta_file)
+
+    def end_command(self) -> None:
+        """
+        Вызывается движком после каждой команды и сбрасывает данные по политике.
+        Блокировки писателя отпускаются, когда все изменения сброшены.
+        """
+        if self.policy == "command":
+            self.flush()
+        elif self.policy == "interval":
+            elapsed_ms = (time.monotonic() - self._last_flush) * 1000
+            if elapsed_ms >= self.interval_ms:
+                self.flush()
+        if not (self._in_transaction or self._pending or self._meta_dirty):
+            self._release_writers()
+
+    def close(self) -> None:
+        """Незавершённая транзакция при выходе откатывается."""
+        if self._in_transaction:
+            self.rollback()
+        self.checkpoint()
+        self._release_writers()
+
+    @staticmethod
+    def _storage_ops(ops: List[Tuple[str, list]]) -> List[Tuple[str, list]]:
+        """Склеивает подряд идущие вставки и изменения в одну запись "put"."""
+        result: List[Tuple[str, list]] = []
+        for op, arg in ops:
+            kind = "delete" if op == "delete" else "put"
+            if result and result[-1][0] == kind:
+                result[-1][1].extend(arg)
+            else:
+                result.append((kind, list(arg)))
+        return result
+
+    @staticmethod
+    def _replay(rows: Dict[int, dict], ops: List[Tuple[str, list]]) -> None:
+        """Повторно применяет несброшенные изменения к перечитанной таблице."""
+        for op, arg in ops:
+            if op == "delete":
+                for row_id in arg:
+                    rows.pop(row_id, None)
+                continue
+            for row in arg:
+                rows[row.get(ID_FIELD)] = row
+
+
+table_manager = TableManager()
@@ -1,8 +1,12 @@
+import csv
 import json
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
 
-from src.primitive_db.constants import DATA_DIR, FILE_EXT
+from src.primitive_db.constants import DATA_DIR, FILE_EXT, ID_FIELD, STORAGE_BACKEND
+from src.primitive_db.metrics import metrics
+from src.primitive_db.storage import BACKENDS, atomic_write, sync_file, table_files
 
 
 def _ensure_path(path: Path) -> Path:
@@ -16,35 +20,260 @@ def load_metadata(filepath: Path | str) -> dict:
     if not path.exists():
         return {}
     try:
-        with path.open("r", encoding="utf-8") as file:
-            return json.load(file)
+        text = path.read_text(encoding="utf-8")
+        with metrics.timed("json_decode_seconds"):
+            return _upgrade_metadata(json.loads(text))
     except json.JSONDecodeError:
         print(f"Ошибка: файл {path} поврежден или не является корректным JSON.")
         return {}
 
+def _upgrade_metadata(metadata: dict) -> dict:
+    """
+    Старый формат хранил для таблицы только список столбцов.
+    Приводит его к {"columns": [...], "indexes": {...}}.
+    """
+    for name, table_meta in metadata.items():
+        if isinstance(table_meta, list):
+            metadata[name] = {"columns": table_meta}
+        metadata[name].setdefault("indexes", {})
+    return metadata
+
 def save_metadata(filepath: Path | str, data: Any) -> None:
     path = Path(filepath)
     path = _ensure_path(path)
-    with path.open("w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4, ensure_ascii=False)
+    with metrics.timed("json_encode_seconds"):
+        text = json.dumps(data, indent=4, ensure_ascii=False)
+    atomic_write(path, lambda file: file.write(text))
 
-def _table_path(table_name: str) -> Path:
+def _table_path(table_name: str, backend_name: str = STORAGE_BACKEND) -> Path:
     safe_name = Path(table_name).name
-    return (DATA_DIR / safe_name).with_suffix(FILE_EXT)
+    return (DATA_DIR / safe_name).with_suffix(BACKENDS[backend_name].suffix)
+
+def _resolve_storage(table_name: str) -> Tuple[Any, Path]:
+    """
+    Определяет формат хранения таблицы по существующему файлу.
+    Двоичный формат и журнал имеют приоритет над старым JSON
+    (таблица уже переведена). Для новой таблицы используется STORAGE_BACKEND.
+    """
+    for name in ("binary", "log", "json"):
+        path = _table_path(table_name, name)
+        if path.exists():
+            return BACKENDS[name], path
+    return BACKENDS[STORAGE_BACKEND], _table_path(table_name)
 
 def load_table_data(table_name: str) -> list:
-    path = _table_path(table_name)
+    backend, path = _resolve_storage(table_name)
     if not path.exists():
         return []
+    return backend.load(path, table_name)
 
-    try:
-        with path.open("r", encoding="utf-8") as file:
-            return json.load(file)
-    except json.JSONDecodeError:
-        print(f"Ошибка: файл данных таблицы {table_name} поврежден.")
+def iter_table_data(table_name: str) -> Iterator[dict]:
+    """Живые строки таблицы прямо с диска, без загрузки всей таблицы в память."""
+    backend, path = _resolve_storage(table_name)
+    if path.exists():
+        yield from backend.iter_rows(path, table_name)
+
+def table_format(table_name: str) -> Tuple[str, Path]:
+    """Формат хранения таблицы и её файл."""
+    backend, path = _resolve_storage(table_name)
+    return backend.name, path
+
+def supports_partial_read(table_name: str) -> bool:
+    """Можно ли прочитать отдельные строки, не разбирая всю таблицу."""
+    return table_format(table_name)[0] == "binary"
+
+def read_table_rows(table_name: str, ids: Iterable[int]) -> List[dict]:
+    """Строки с указанными ID с диска; двоичная таблица разбирает только их."""
+    backend, path = _resolve_storage(table_name)
+    if not path.exists():
         return []
+    if backend.name == "binary":
+        return list(backend.iter_rows(path, table_name, ids=ids))
+    wanted = set(ids)
+    return [r for r in backend.iter_rows(path, table_name) if r.get(ID_FIELD) in wanted]
+
+def table_offsets(table_name: str) -> Tuple[Path, List[int], list]:
+    """Файл двоичной таблицы, смещения её живых строк в порядке ID и раскладки."""
+    backend, path = _resolve_storage(table_name)
+    if backend.name != "binary" or not path.exists():
+        return path, [], []
+    return (path, *backend.offsets(path))
+
+def set_table_columns(table_name: str, columns: List[Tuple[str, str]]) -> None:
+    """
+    Схема таблицы изменилась. Двоичной таблице дописывается новая раскладка
+    строк; журнал и JSON хранят имена столбцов в строках, им ничего не нужно.
+    """
+    backend, path = _resolve_storage(table_name)
+    if backend.name == "binary" and path.exists():
+        backend.set_columns(path, columns)
+
+def create_table_file(table_name: str, columns: List[Tuple[str, str]]) -> None:
+    """Двоичной таблице файл со схемой нужен до первой записи."""
+    if STORAGE_BACKEND == "binary":
+        BACKENDS["binary"].save(_table_path(table_name), [], columns)
+
+def create_segment_file(segment: str, like: str,
+                        columns: List[Tuple[str, str]]) -> None:
+    """
+    Пустой файл нового сегмента секционированной таблицы в формате
+    сегмента like, чтобы все сегменты таблицы хранились одинаково.
+    """
+    backend, _ = _resolve_storage(like)
+    backend.save(_table_path(segment, backend.name), [], columns)
 
 def save_table_data(table_name: str, data: list) -> None:
-    path = _table_path(table_name)
-    with path.open("w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4, ensure_ascii=False)
+    backend, path = _resolve_storage(table_name)
+    backend.save(path, data)
+
+def append_table_rows(table_name: str, rows: Iterable[dict]) -> None:
+    """Дописывает новые или изменённые строки, не переписывая таблицу."""
+    backend, path = _resolve_storage(table_name)
+    backend.append(path, rows, table_name)
+
+def delete_table_rows(table_name: str, ids: Iterable[int]) -> None:
+    """Помечает строки с указанными ID удалёнными."""
+    backend, path = _resolve_storage(table_name)
+    backend.delete(path, ids, table_name)
+
+def apply_table_ops(table_name: str, ops: Iterable[Tuple[str, list]]) -> None:
+    """
+    Применяет к файлу таблицы последовательность изменений
+    ("put", [строки]) и ("delete", [ID]). Повторное применение безопасно.
+    """
+    for op, arg in ops:
+        if op == "put":
+            append_table_rows(table_name, arg)
+        else:
+            delete_table_rows(table_name, arg)
+
+def sync_table_files(table_name: str) -> None:
+    for path in table_files(DATA_DIR, table_name):
+        sync_file(path)
+
+def file_signature(path: Path) -> tuple | None:
+    """(mtime, размер) файла или None, если его нет - для поиска чужих изменений."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def table_signature(table_name: str) -> tuple:
+    return tuple(file_signature(p) for p in table_files(DATA_DIR, table_name))
+
+def table_size(table_name: str) -> int:
+    """Суммарный размер файлов таблицы на диске в байтах."""
+    return sum(p.stat().st_size for p in table_files(DATA_DIR, table_name)
+               if p.exists())
+
+def compact_table(table_name: str, columns: List[Tuple[str, str]],
+                  upgrade: Callable[[dict], dict] | None = None) -> Tuple[int, int]:
+    """
+    Переписывает таблицу, оставляя только живые строки. Двоичная таблица
+    остаётся двоичной, остальные переводятся в формат STORAGE_BACKEND.
+    Возвращает размер до и после в байтах.
+    """
+    backend, _ = _resolve_storage(table_name)
+    target = "binary" if backend.name == "binary" else STORAGE_BACKEND
+    return convert_table(table_name, target, columns, upgrade)
+
+def convert_table(table_name: str, backend_name: str,
+                  columns: List[Tuple[str, str]],
+                  upgrade: Callable[[dict], dict] | None = None) -> Tuple[int, int]:
+    """
+    Переписывает живые строки таблицы в указанном формате и схеме columns
+    и удаляет файлы других форматов. upgrade приводит строки, записанные
+    до alter_table, к схеме columns.
+    Возвращает размер до и после в байтах.
+    """
+    before = table_size(table_name)
+    data = load_table_data(table_name)
+    if upgrade is not None:
+        data = [upgrade(row) for row in data]
+    target = _table_path(table_name, backend_name)
+    BACKENDS[backend_name].save(target, data, columns)
+    for path in table_files(DATA_DIR, table_name):
+        if path != target:
+            path.unlink(missing_ok=True)
+    return before, table_size(table_name)
+
+def storage_report(rows: List[dict],
+                   columns: List[Tuple[str, str]]) -> List[Tuple[str, int, float]]:
+    """
+    Сравнение форматов на строках таблицы: для каждого формата
+    (имя, размер в байтах, время чтения в мс). Строки кодируются в памяти.
+    """
+    report = []
+    for name in ("json", "log", "binary"):
+        backend = BACKENDS[name]
+        data = backend.encode(rows, columns)
+        start = time.perf_counter()
+        backend.decode(data)
+        report.append((name, len(data), (time.perf_counter() - start) * 1000))
+    return report
+
+def remove_table_files(table_name: str) -> None:
+    for path in table_files(DATA_DIR, table_name):
+        path.unlink(missing_ok=True)
+
+def read_import_rows(filepath: Path | str,
+                     columns: List[str]) -> Iterator[Tuple[int, list]]:
+    """
+    Читает строки для импорта из CSV или JSONL по одной, не загружая файл целиком.
+    Выдаёт (номер строки файла, значения в порядке columns).
+
+    CSV: если первая строка состоит из имён столбцов, она считается
+    заголовком и задаёт порядок значений. JSONL: объект {столбец: значение}
+    или массив значений в порядке столбцов.
+    """
+    path = Path(filepath)
+    suffix = path.suffix.lower()
+    if suffix not in (".csv", ".jsonl"):
+        raise ValueError(f"неподдерживаемый формат файла {path.name}")
+
+    with path.open("r", encoding="utf-8", newline="") as file:
+        if suffix == ".jsonl":
+            for line_no, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    yield line_no, [item.get(c) for c in columns]
+                else:
+                    yield line_no, list(item)
+            return
+
+        reader = csv.reader(file)
+        order = None
+        for line_no, values in enumerate(reader, 1):
+            if not values:
+                continue
+            if line_no == 1 and set(columns) <= set(values):
+                order = [values.index(c) for c in columns]
+                continue
+            if order is not None:
+                values = [values[i] if i < len(values) else "" for i in order]
+            yield line_no, values
+
+
+def write_export_rows(filepath: Path | str, fmt: str, columns: List[str],
+                      rows: Iterable[dict]) -> int:
+    """
+    Пишет строки в CSV (с заголовком) или JSONL по мере их поступления.
+    Возвращает количество записанных строк.
+    """
+    count = 0
+    with Path(filepath).open("w", encoding="utf-8", newline="") as file:
+        if fmt == "csv":
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([row.get(c) for c in columns])
+                count += 1
+        else:
+            for row in rows:
+                item = {c: row.get(c) for c in columns}
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+                count += 1
+    return count
@@ -0,0 +1,172 @@
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+from src.primitive_db.constants import META_FILE, WAL_CHECKPOINT_BYTES, WAL_FILE
+from src.primitive_db.metrics import metrics
+from src.primitive_db.partitions import base_table
+from src.primitive_db.storage import sync_dir
+from src.primitive_db.utils import (
+    apply_table_ops,
+    load_metadata,
+    save_metadata,
+    sync_table_files,
+)
+
+TableOps = List[Tuple[str, list]]
+
+
+class WriteAheadLog:
+    """
+    Журнал упреждающей записи.
+
+    Каждый сброс изменений - одна транзакция: одна JSON-строка со всеми
+    изменёнными таблицами (и метаданными), которая дописывается в журнал
+    и сбрасывается на диск одним fsync до того, как изменения попадут
+    в файлы таблиц. Поэтому много мелких команд, накопленных пулом таблиц,
+    стоят одного fsync (групповая фиксация).
+
+    Файлы таблиц при этом на диск не сбрасываются. Это делает контрольная
+    точка, когда журнал вырастает больше WAL_CHECKPOINT_BYTES или при выходе:
+    fsync всех таблиц из журнала, после чего журнал очищается.
+    Недописанная последняя строка (сбой во время записи) при восстановлении
+    отбрасывается: такая транзакция не была зафиксирована.
+
+    Журнал общий для всех процессов, работающих с базой, и пишется под
+    блокировкой метаданных. Номер транзакции включает метку процесса, а
+    после применения транзакции дописывается отметка {"applied": номер} -
+    восстановление повторяет только транзакции без такой отметки.
+    """
+
+    def __init__(self, path: Path = WAL_FILE,
+                 checkpoint_bytes: int = WAL_CHECKPOINT_BYTES):
+        self.path = path
+        self.checkpoint_bytes = checkpoint_bytes
+        self._touched: Set[str] = set()
+        self._session = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self._txn = 0
+
+    def commit(self, tables: List[Tuple[str, TableOps]],
+               metadata: Optional[dict] = None) -> str:
+        """Фиксирует транзакцию в журнале (write + fsync). Возвращает её номер."""
+        self._txn += 1
+        txn_id = f"{self._session}.{self._txn}"
+        record = {"txn": txn_id, "tables": tables}
+        if metadata is not None:
+            record["meta"] = metadata
+        with metrics.timed("json_encode_seconds"):
+            data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        new_file = not self.path.exists()
+        if new_file:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._append(data, sync=True)
+        metrics.add("wal_bytes_written", len(data))
+        if new_file:
+            sync_dir(self.path.parent)
+        self._touched.update(name for name, _ in tables)
+        return txn_id
+
+    def mark_applied(self, txn_id: str) -> None:
+        """
+        Отмечает транзакцию применённой. Без fsync: если отметка потеряется,
+        транзакция просто будет применена повторно.
+        """
+        self._append((json.dumps({"applied": txn_id}) + "\n").encode("utf-8"))
+
+    def _append(self, data: bytes, sync: bool = False) -> None:
+        """
+        Дописывает записи в конец журнала. Недописанная последняя строка
+        (процесс упал посреди записи) сначала отрезается: иначе новая запись
+        продолжила бы её, и восстановление отбросило бы обе.
+        """
+        with self.path.open("a+b") as file:
+            end = file.seek(0, os.SEEK_END)
+            complete = _complete_length(file, end)
+            if complete < end:
+                file.truncate(complete)
+            file.write(data)
+            file.flush()
+            if sync:
+                os.fsync(file.fileno())
+
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def maybe_checkpoint(self, meta_file: Path = META_FILE) -> None:
+        if self.size() >= self.checkpoint_bytes:
+            self.recover(meta_file)
+
+    def checkpoint(self) -> None:
+        """
+        Сбрасывает на диск файлы таблиц из журнала и очищает его.
+        Все транзакции журнала к этому моменту должны быть применены.
+        """
+        tables = set(self._touched)
+        for txn in self.transactions():
+            tables.update(name for name, _ in txn.get("tables", []))
+        for name in tables:
+            sync_table_files(name)
+        self._touched.clear()
+        if self.path.exists():
+            with self.path.open("w", encoding="utf-8") as file:
+                file.flush()
+                os.fsync(file.fileno())
+
+    def transactions(self) -> Iterator[dict]:
+        """Зафиксированные транзакции журнала по порядку."""
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+
+    def recover(self, meta_file: Path = META_FILE) -> int:
+        """
+        Повторно применяет транзакции без отметки о применении (процесс
+        упал во время сброса) и выполняет контрольную точку.
+        Вызывается под блокировкой метаданных, когда ни один живой процесс
+        не применяет свою транзакцию. Изменения идемпотентны.
+        Возвращает число восстановленных транзакций.
+        """
+        records = list(self.transactions())
+        applied = {r["applied"] for r in records if "applied" in r}
+        committed = [r for r in records if "tables" in r]
+        pending = [r for r in committed if r["txn"] not in applied]
+        if not pending:
+            self.checkpoint()
+            return 0
+
+        metadata = load_metadata(meta_file)
+        for txn in committed:
+            if "meta" in txn:
+                metadata = txn["meta"]
+        for txn in pending:
+            for name, ops in txn["tables"]:
+                # Таблицу могли удалить после транзакции - не воскрешаем её.
+                if base_table(name) in metadata:
+                    apply_table_ops(name, ops)
+        save_metadata(meta_file, metadata)
+        self.checkpoint()
+        return len(pending)
+
+
+def _complete_length(file, end: int, chunk: int = 64 * 1024) -> int:
+    """Длина журнала до конца последней целой строки."""
+    if end == 0:
+        return 0
+    file.seek(end - 1)
+    if file.read(1) == b"\n":
+        return end
+    position = end
+    while position > 0:
+        start = max(position - chunk, 0)
+        file.seek(start)
+        newline = file.read(position - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
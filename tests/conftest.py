@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class Database:
+    """
+    База во временном каталоге. Пути к данным (constants.DATA_DIR и др.)
+    вычисляются от текущего каталога при импорте, поэтому, как и в
+    benchmarks.bench, всё выполняется в отдельных процессах в этом каталоге.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def execute(self, *commands: str) -> str:
+        """Выполняет команды в пакетном режиме (main exec -), возвращает вывод."""
+        return self._run(["-m", "src.primitive_db.main", "exec", "-"],
+                         "\n".join(commands) + "\n")
+
+    def call(self, function, *args, returncode: int = 0) -> str:
+        """Вызывает функцию модуля тестов в отдельном процессе, возвращает вывод."""
+        code = (f"from {function.__module__} import {function.__name__} as f; "
+                f"f(*{args!r})")
+        return self._run(["-c", code], returncode=returncode)
+
+    def _run(self, args, stdin: str = None, returncode: int = 0) -> str:
+        env = dict(os.environ, PYTHONPATH=str(ROOT))
+        result = subprocess.run(
+            [sys.executable, *args], cwd=self.path, env=env, input=stdin,
+            capture_output=True, text=True, timeout=120,
+        )
+        assert result.returncode == returncode, result.stdout + result.stderr
+        return result.stdout
+
+
+@pytest.fixture
+def db(tmp_path) -> Database:
+    return Database(tmp_path)
@@ -0,0 +1,63 @@
+import pytest
+
+
+def _other_process(*commands: str) -> None:
+    import subprocess
+    import sys
+
+    subprocess.run(
+        [sys.executable, "-m", "src.primitive_db.main", "exec", "-"],
+        input="\n".join(commands) + "\n", capture_output=True, text=True,
+        check=True, timeout=60,
+    )
+
+
+def _reader(stream: bool) -> None:
+    """
+    Процесс-читатель: select повторяется из кэша, пока другой процесс
+    меняет таблицу, и каждое чужое изменение должно быть видно.
+    """
+    import io
+    from contextlib import redirect_stdout
+
+    from src.primitive_db import tables
+    from src.primitive_db.core import query_cache
+    from src.primitive_db.engine import end_command, execute
+    from src.primitive_db.tables import table_manager
+
+    if stream:
+        tables.STREAM_THRESHOLD_BYTES = 0
+
+    def select() -> str:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            execute("select from users where age > 30")
+            end_command()
+        return output.getvalue()
+
+    assert "Bob" in select() and "Eve" not in select()
+    assert query_cache.stats["hits"] == 1
+
+    _other_process('insert into users values ("Ann", 40)')
+    assert "Ann" in select()
+    _other_process('update users set age = 20 where name = "Bob"')
+    assert "Bob" not in select()
+    _other_process('delete from users where name = "Ann"')
+    result = select()
+    assert "Ann" not in result and "Bob" not in result
+    assert query_cache.stats["hits"] == 1
+
+    # Большая таблица читается потоком и в пул не попадает.
+    assert ("users" in table_manager._rows) is not stream
+
+
+@pytest.mark.parametrize("fmt, stream", [
+    ("log", False), ("json", False), ("binary", False), ("binary", True),
+])
+def test_cache_sees_writes_from_other_process(db, fmt, stream):
+    db.execute(
+        "create_table users name:str age:int",
+        f"convert_table users {fmt}",
+        'insert into users values ("Bob", 35), ("Eve", 25)',
+    )
+    db.call(_reader, stream)
@@ -0,0 +1,76 @@
+import pytest
+
+from src.primitive_db.indexes import INDEX_KINDS
+
+# Одни и те же данные в двух таблицах: у indexed есть индексы, у plain нет.
+# Любой запрос обязан вернуть в обеих одинаковые строки.
+ROWS = [(f"u{i}", 20 + i * 7 % 31, i % 3 == 0) for i in range(1, 31)]
+
+QUERIES = [
+    "select from {table} where age = 27",
+    "select from {table} where age = 027",
+    "select from {table} where age = +27",
+    "select from {table} where age in (20, 34, 99)",
+    "select from {table} where age > 28 and age <= 40",
+    "select from {table} where age >= 30 and age < 30",
+    "select from {table} where age between 25 and 35 and active = true",
+    "select from {table} where age < 25 or age > 45",
+    'select from {table} where name = "u7"',
+    "select from {table} where active = true and age < 30",
+    "select from {table} where ID > 3 and ID < 9",
+    "select from {table} where ID >= 25 and age > 30",
+    "select from {table} where ID > 5 and ID <= 5",
+]
+
+WRITES = [
+    "update {table} set age = 28 where age = 27",
+    "update {table} set active = false where age between 30 and 35",
+    "delete from {table} where age in (34, 41)",
+    'insert into {table} values ("new", 27, true)',
+]
+
+
+def _commands(table: str, templates) -> list:
+    return [template.format(table=table) for template in templates]
+
+
+def _create(table: str) -> list:
+    values = ", ".join(f'("{name}", {age}, {str(active).lower()})'
+                       for name, age, active in ROWS)
+    return [f"create_table {table} name:str age:int active:bool",
+            f"insert into {table} values {values}"]
+
+
+@pytest.mark.parametrize("kind", sorted(INDEX_KINDS))
+def test_index_matches_scan(db, kind):
+    db.execute(
+        *_create("indexed"),
+        *_create("plain"),
+        f"create_index indexed age {kind}",
+        "create_index indexed name hash",
+        "create_index indexed active hash",
+    )
+    # Запросы, изменения (через индекс, который уже построен в памяти)
+    # и снова запросы - одним пакетом в одном процессе.
+    batch = QUERIES + WRITES + QUERIES
+    indexed = db.execute(*_commands("indexed", batch))
+    plain = db.execute(*_commands("plain", batch))
+    assert indexed.replace('"indexed"', '"plain"') == plain
+    assert "u7" in plain
+
+
+def test_index_is_used(db):
+    db.execute(
+        *_create("users"),
+        "create_index users age sorted",
+    )
+    output = db.execute(
+        "explain select from users where age = 027",
+        "explain select from users where age > 28 and age <= 40",
+        "explain select from users where ID > 3 and ID < 9",
+        "explain select from users where ID >= 25",
+    )
+    assert 'индекс sorted по "age" (1 значений)' in output
+    assert 'диапазон по индексу sorted "age"' in output
+    assert "перебор диапазона ID 4..8" in output
+    assert "перебор диапазона ID 25..30" in output
@@ -0,0 +1,64 @@
+import pytest
+
+# o - 3 строки, h - 6: хеш-таблица строится по o, поток идёт по правой h.
+ORDERS = [(1, "x"), (2, "y"), (1, "z")]
+HOMES = [(2, 10), (1, 20), (3, 30), (1, 40), (2, 50), (1, 60)]
+
+
+def _rows(output: str) -> list:
+    return [[cell.strip() for cell in line.strip("|").split("|")]
+            for line in output.splitlines()
+            if line.startswith("| ") and ".ID " not in line]
+
+
+def _expected(where=lambda order, home: True) -> list:
+    """Пары с равным ключом по порядку ID левой таблицы, затем правой."""
+    return [
+        [str(o_id), str(uid), tag, str(h_id), str(grp), str(n)]
+        for o_id, (uid, tag) in enumerate(ORDERS, 1)
+        for h_id, (grp, n) in enumerate(HOMES, 1)
+        if uid == grp and where((uid, tag), (grp, n))
+    ]
+
+
+@pytest.fixture(params=["hash", "index"])
+def tables(db, request):
+    orders = ", ".join(f'({uid}, "{tag}")' for uid, tag in ORDERS)
+    homes = ", ".join(f"({grp}, {n})" for grp, n in HOMES)
+    db.execute("create_table o uid:int tag:str",
+               "create_table h grp:int n:int",
+               f"insert into o values {orders}",
+               f"insert into h values {homes}")
+    if request.param == "index":
+        # Строки h ищутся через индекс, поток идёт по левой o.
+        db.execute("create_index h grp hash")
+    return db
+
+
+def test_duplicate_keys_in_left_table_order(tables):
+    output = tables.execute("select from o join h on o.uid = h.grp")
+    assert _rows(output) == _expected()
+    # Та же таблица пар с другой стороны соединения, порядок по её ID.
+    output = tables.execute("select from h join o on h.grp = o.uid")
+    assert _rows(output) == sorted(
+        [row[3:] + row[:3] for row in _expected()], key=lambda row: int(row[0])
+    )
+
+
+def test_where_on_joined_rows(tables):
+    output = tables.execute(
+        'select from o join h on o.uid = h.grp where tag = "z" or n > 40'
+    )
+    assert _rows(output) == _expected(lambda order, home: order[1] == "z"
+                                      or home[1] > 40)
+    output = tables.execute(
+        "select from o join h on o.uid = h.grp where n > 40 limit 1 offset 1"
+    )
+    assert _rows(output) == _expected(lambda order, home: home[1] > 40)[1:2]
+
+
+def test_no_matches(tables):
+    output = tables.execute("select from o join h on o.uid = h.grp where n = 30",
+                            'select from o join h on o.uid = h.n')
+    assert _rows(output) == []
+    assert output.count("| o.ID ") == 2
@@ -0,0 +1,13 @@
+def test_export_to_bad_path_keeps_session(db):
+    output = db.execute(
+        "stats export /nonexistent/dir/metrics.jsonl",
+        "stats export /nonexistent/dir/metrics.prom",
+        "profile on",
+        "list_tables",
+        "profile off /nonexistent/dir/profile.prof",
+        "create_table users name:str",
+        "list_tables",
+    )
+    assert output.count("Произошла непредвиденная ошибка") == 3
+    assert "No such file or directory" in output
+    assert "users" in output.rsplit("Произошла непредвиденная ошибка", 1)[1]
@@ -0,0 +1,48 @@
+ROWS = 40
+MIN_ROWS = 10
+
+
+def _parallel_select() -> None:
+    """
+    select с условием по большой двоичной таблице вне пула проходит через
+    parallel.scan с пулом рабочих и возвращает те же строки.
+    """
+    import io
+    from contextlib import redirect_stdout
+
+    from src.primitive_db import parallel, tables
+    from src.primitive_db.engine import end_command, execute
+    from src.primitive_db.tables import table_manager
+
+    tables.STREAM_THRESHOLD_BYTES = 0
+    parallel.PARALLEL_SCAN_MIN_ROWS = MIN_ROWS
+    parallel.PARALLEL_SCAN_WORKERS = 2
+    parallel.PARALLEL_SCAN_EXECUTOR = "thread"
+    scans = []
+    scan = parallel.scan
+
+    def counted(path, offsets, *args):
+        scans.append(len(offsets))
+        return scan(path, offsets, *args)
+
+    parallel.scan = counted
+    output = io.StringIO()
+    with redirect_stdout(output):
+        execute("select from users where age >= 50")
+        end_command()
+
+    assert scans == [ROWS] and ROWS > MIN_ROWS
+    assert parallel._pool["executor"] is not None
+    assert "users" not in table_manager._rows
+    found = [line.split("|")[2].strip() for line in output.getvalue().splitlines()
+             if line.startswith("| ") and "name" not in line]
+    assert found == [f"u{i}" for i in range(1, ROWS + 1) if i + 20 >= 50]
+    parallel.shutdown()
+
+
+def test_select_uses_parallel_scan(db):
+    values = ", ".join(f'("u{i}", {i + 20})' for i in range(1, ROWS + 1))
+    db.execute("create_table users name:str age:int",
+               "convert_table users binary",
+               f"insert into users values {values}")
+    db.call(_parallel_select)
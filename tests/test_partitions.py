@@ -0,0 +1,76 @@
+import re
+
+# crc32 % 4: Oslo - сегмент 0, Moscow и Rome - 1, Paris - 2, сегмент 3 пуст.
+USERS = [("a", "Moscow"), ("b", "Paris"), ("c", "Rome"), ("d", "Oslo"),
+         ("e", "Moscow")]
+
+
+def _segments(output: str) -> list:
+    """Число записей в каждом сегменте по выводу каждого вызова info."""
+    counts = []
+    for line in output.splitlines():
+        if line.startswith("Секционирование:"):
+            counts.append([])
+        match = re.match(r"- \w+@\d+: (\d+) записей", line)
+        if match:
+            counts[-1].append(int(match.group(1)))
+    return counts
+
+
+def _names(output: str) -> list:
+    return [line.split("|")[2].strip() for line in output.splitlines()
+            if line.startswith("| ") and not line.startswith("| ID ")]
+
+
+def _hash_table(db) -> None:
+    values = ", ".join(f'("{name}", "{city}")' for name, city in USERS)
+    db.execute(
+        "create_table users name:str city:str partition by hash(city, 4)",
+        f"insert into users values {values}",
+    )
+
+
+def test_hash_segment_counts(db):
+    _hash_table(db)
+    output = db.execute("info users")
+    assert "Секционирование: hash(city, 4)" in output
+    assert "Количество записей: 5" in output
+    assert _segments(output) == [[1, 3, 1, 0]]
+
+
+def test_update_moves_row_between_segments(db):
+    _hash_table(db)
+    output = db.execute('update users set city = "Paris" where name = "a"',
+                        "info users")
+    assert "Количество записей: 5" in output
+    assert _segments(output) == [[1, 2, 2, 0]]
+    # Условие по ключу читает только свой сегмент: строка должна быть в новом.
+    assert _names(db.execute('select from users where city = "Paris"')) == ["a", "b"]
+    assert _names(db.execute('select from users where city = "Moscow"')) == ["e"]
+    assert _names(db.execute("select from users")) == ["a", "b", "c", "d", "e"]
+
+
+def test_delete_across_segments(db):
+    _hash_table(db)
+    output = db.execute('delete from users where name != "c" and name != "e"',
+                        "info users")
+    assert "Количество записей: 2" in output
+    assert _segments(output) == [[0, 2, 0, 0]]
+    assert _names(db.execute("select from users")) == ["c", "e"]
+    assert _names(db.execute('select from users where city = "Oslo"')) == []
+
+
+def test_range_segments(db):
+    values = ", ".join(f'("u{i}")' for i in range(1, 6))
+    output = db.execute(
+        "create_table users name:str partition by range(ID, 2)",
+        f"insert into users values {values}",
+        "info users",
+        "delete from users where ID >= 2 and ID <= 4",
+        "info users",
+        "select from users",
+    )
+    assert "Секционирование: range(ID, 2)" in output
+    # Сегмент номер ID // 2: {1}, {2, 3}, {4, 5}.
+    assert _segments(output) == [[1, 2, 2], [1, 0, 1]]
+    assert _names(output) == ["u1", "u5"]
@@ -0,0 +1,74 @@
+import pytest
+
+FORMATS = ["log", "binary"]
+
+ALTER = [
+    "alter_table users add email:str",
+    "alter_table users add vip:bool default true",
+    "alter_table users rename name full_name",
+    "alter_table users drop age",
+]
+
+QUERIES = [
+    "select from users",
+    'select from users where email != "a@x"',
+    'select from users where email = "a@x"',
+    "select from users where vip = true",
+    'select from users where full_name = "Bob"',
+    "count users where vip = true",
+]
+
+
+def _rows(output: str) -> list:
+    """Строки таблиц вывода select как списки значений (без заголовков)."""
+    return [[cell.strip() for cell in line.strip("|").split("|")]
+            for line in output.splitlines()
+            if line.startswith("| ") and not line.startswith("| ID ")]
+
+
+@pytest.fixture(params=FORMATS)
+def users(db, request):
+    db.execute(
+        "create_table users name:str age:int",
+        f"convert_table users {request.param}",
+        'insert into users values ("Bob", 35), ("Eve", 25)',
+        *ALTER,
+        'insert into users values ("Ann", "a@x", false)',
+    )
+    return db
+
+
+def test_alter_columns(users):
+    output = users.execute("info users", "select from users")
+    assert "Столбцы: ID:int, full_name:str, email:str, vip:bool" in output
+    assert _rows(output) == [
+        ["1", "Bob", "None", "True"],
+        ["2", "Eve", "None", "True"],
+        ["3", "Ann", "a@x", "False"],
+    ]
+
+
+def test_reads_match_after_compact(users):
+    before = users.execute(*QUERIES)
+    # Добавленный столбец без default пуст у старых строк и подходит под "!=".
+    assert _rows(users.execute(QUERIES[1])) == [
+        ["1", "Bob", "None", "True"], ["2", "Eve", "None", "True"],
+    ]
+    assert "count(*) = 2" in before
+
+    assert "сжата" in users.execute("compact users")
+    assert users.execute(*QUERIES) == before
+
+
+def test_dropped_column_is_gone(users):
+    output = users.execute("select from users where age = 35",
+                           "alter_table users add age:int")
+    assert 'столбца "age" нет в таблице' in output
+    assert "освободится после compact" in output
+
+    # После compact имя свободно, а старые значения не возвращаются.
+    output = users.execute("compact users", "alter_table users add age:int",
+                           "select from users where age = 35",
+                           "select from users")
+    assert "age:int" in output
+    assert [row[-1] for row in _rows(output)] == ["None", "None", "None"]
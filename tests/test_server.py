@@ -0,0 +1,23 @@
+def _failing_command() -> None:
+    """Ошибка вне обработчиков команд не обрывает ответы клиенту."""
+    from src.primitive_db import server
+
+    execute = server.execute
+
+    def broken(line):
+        if line == "boom":
+            raise RuntimeError("сбой команды")
+        return execute(line)
+
+    server.execute = broken
+    outputs, keep_open = server.run_commands(
+        [b"create_table users name:str", b"boom", b"list_tables"]
+    )
+    assert keep_open
+    assert len(outputs) == 3
+    assert outputs[1] == "Произошла непредвиденная ошибка: сбой команды\n"
+    assert "users" in outputs[2]
+
+
+def test_command_error_becomes_response(db):
+    db.call(_failing_command)
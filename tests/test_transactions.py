@@ -0,0 +1,50 @@
+from src.primitive_db.constants import MSG
+
+
+def _setup(db) -> None:
+    db.execute("create_table users name:str age:int",
+               'insert into users values ("Bob", 35), ("Eve", 25)',
+               "create_index users age hash")
+
+
+def test_rollback_discards_changes(db):
+    _setup(db)
+    queries = ["select from users where age > 30",
+               "select from users where age = 25",
+               "select from users"]
+    before = db.execute(*queries)
+    output = db.execute(
+        *queries,
+        "begin",
+        'insert into users values ("Ann", 40)',
+        'update users set age = 50 where name = "Bob"',
+        'delete from users where name = "Eve"',
+        *queries,
+        "rollback",
+        *queries,
+    )
+    inside, after = output.split(MSG["txn_begin"])[1].split(MSG["txn_rollback"])
+    # Внутри транзакции изменения видны, в том числе через индекс и кэш.
+    assert "Ann" in inside and "50" in inside and "Eve" not in inside
+    assert after.lstrip("\n") == before
+    assert db.execute(*queries) == before
+
+
+def test_commit_keeps_changes(db):
+    _setup(db)
+    db.execute(
+        "begin",
+        'insert into users values ("Ann", 40)',
+        'delete from users where name = "Eve"',
+        "commit",
+    )
+    output = db.execute("select from users where age > 30",
+                        "select from users where age = 25")
+    assert "Ann" in output and "Bob" in output and "Eve" not in output
+
+
+def test_unfinished_transaction_is_rolled_back_on_exit(db):
+    _setup(db)
+    before = db.execute("select from users")
+    db.execute("begin", 'insert into users values ("Ann", 40)')
+    assert db.execute("select from users") == before
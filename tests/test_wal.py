@@ -0,0 +1,77 @@
+import json
+
+from src.primitive_db.constants import MSG
+
+CRASH_CODE = 3
+
+
+def _crash_after_wal_commit(command: str) -> None:
+    """Процесс падает после записи транзакции в WAL, до изменения файлов таблиц."""
+    import os
+
+    from src.primitive_db import tables
+    from src.primitive_db.engine import end_command, execute
+
+    def crash(*args):
+        os._exit(CRASH_CODE)
+
+    tables.apply_table_ops = crash
+    execute(command)
+    end_command()
+
+
+def _torn_write(db) -> None:
+    """Недописанная строка WAL: процесс упал посреди записи транзакции."""
+    record = {"txn": "dead.1",
+              "tables": [["users", [["put", [{"ID": 9, "name": "Torn", "age": 1}]]]]]}
+    with (db.path / "data" / "db_wal.log").open("a", encoding="utf-8") as file:
+        file.write(json.dumps(record)[:60])
+
+
+def _setup(db) -> None:
+    db.execute("create_table users name:str age:int",
+               'insert into users values ("Bob", 35)')
+
+
+def test_replay_committed_transaction_before_torn_write(db):
+    _setup(db)
+    db.call(_crash_after_wal_commit, 'insert into users values ("Ann", 28)',
+            returncode=CRASH_CODE)
+    _torn_write(db)
+
+    output = db.execute("select from users")
+    assert MSG["wal_recovered"].format(count=1) in output
+    assert "Bob" in output and "Ann" in output
+    assert "Torn" not in output
+    assert (db.path / "data" / "db_wal.log").stat().st_size == 0
+
+    output = db.execute("select from users")
+    assert MSG["wal_recovered"].split(":")[0] not in output
+    assert "Ann" in output
+
+
+def test_torn_write_does_not_hide_later_transactions(db):
+    _setup(db)
+    _torn_write(db)
+    output = db.execute("select from users")
+    assert "Bob" in output and "Torn" not in output
+
+    db.call(_crash_after_wal_commit, 'update users set age = 36 where name = "Bob"',
+            returncode=CRASH_CODE)
+    output = db.execute("select from users where age = 36")
+    assert MSG["wal_recovered"].format(count=1) in output
+    assert "Bob" in output
+
+
+def test_commit_after_torn_write_starts_new_line(db):
+    _setup(db)
+    _torn_write(db)
+    # Без восстановления между ними: новая транзакция пишется сразу за обрывком.
+    db.call(_crash_after_wal_commit, 'update users set age = 36 where name = "Bob"',
+            returncode=CRASH_CODE)
+    lines = (db.path / "data" / "db_wal.log").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["tables"][0][0] for line in lines] == ["users"]
+
+    output = db.execute("select from users where age = 36")
+    assert MSG["wal_recovered"].format(count=1) in output
+    assert "Bob" in output and "Torn" not in output
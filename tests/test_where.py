@@ -0,0 +1,12 @@
+def test_like_only_on_str_columns(db):
+    db.execute("create_table users name:str age:int vip:bool",
+               'insert into users values ("Tom", 10, true)')
+    output = db.execute('select from users where vip like "T%"',
+                        'count users where age like "1%"',
+                        'delete from users where vip like "True"',
+                        'update users set age = 1 where vip like "T%"')
+    assert output.count("like применим только к столбцам str") == 4
+    assert "age:int" in output and "vip:bool" in output
+
+    output = db.execute('select from users where name like "T%"')
+    assert "| Tom  |  10 | True |" in output